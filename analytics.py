@@ -0,0 +1,124 @@
+"""
+Vectorized statistics over a player count series, for the /api/stats endpoints.
+
+Every function takes aligned NumPy arrays of epoch seconds and counts (sorted by
+time) and works in whole-array passes: samples are grouped by sorting once and
+percentiles are interpolated from group offsets, so no Python loop runs per sample.
+Times are UTC. NumPy is required; AVAILABLE is False when it is not installed.
+"""
+import warnings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+AVAILABLE = np is not None
+
+QUANTILES = (5, 50, 95)
+DAY = 86400
+WEEK = 7 * DAY
+# Epoch 0 was a Thursday; shifting by three days makes buckets and hours of the week start on Monday
+MONDAY_OFFSET = 3 * DAY
+
+def bucket_starts(epochs, unit):
+    """Start (epoch seconds) of the UTC day or Monday-based week holding each sample."""
+    if unit == 'week':
+        return (epochs + MONDAY_OFFSET) // WEEK * WEEK - MONDAY_OFFSET
+    return epochs // DAY * DAY
+
+def grouped(groups, values, quantiles=()):
+    """
+    Groups `values` by `groups` in one sort. Returns (keys, first, last, sizes, sums, q)
+    where first/last index the smallest/largest value of each group in the input
+    arrays and q[i] holds the quantiles[i] percentile of every group (linear interpolation).
+    """
+    order = np.lexsort((values, groups))
+    sorted_groups = groups[order]
+    sorted_values = values[order]
+    keys, offsets, sizes = np.unique(sorted_groups, return_index=True, return_counts=True)
+    sums = np.add.reduceat(sorted_values, offsets) if len(offsets) else np.zeros(0)
+
+    q = []
+    for quantile in quantiles:
+        position = offsets + (sizes - 1) * (quantile / 100)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, offsets + sizes - 1)
+        q.append(sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low))
+    return keys, order[offsets], order[offsets + sizes - 1], sizes, sums, q
+
+def extremes(epochs, counts, unit='day'):
+    """Peak and trough (count and time) plus mean and sample count per UTC day or week."""
+    keys, first, last, sizes, sums, _ = grouped(bucket_starts(epochs, unit), counts)
+    return {
+        "buckets": keys,
+        "peak_times": epochs[last],
+        "peaks": counts[last],
+        "trough_times": epochs[first],
+        "troughs": counts[first],
+        "means": sums / np.maximum(sizes, 1),
+        "samples": sizes,
+    }
+
+def sample_interval(epochs):
+    """The series' typical spacing in seconds (median gap between samples)."""
+    if len(epochs) < 2:
+        return 0
+    return int(np.median(np.diff(epochs)))
+
+def rolling_percentiles(epochs, counts, window, step, quantiles=QUANTILES, block=1024):
+    """
+    Percentiles of the samples in a trailing `window` (seconds), evaluated every `step`
+    seconds. The series is laid on a regular grid of its sampling interval (missed
+    samples are NaN and ignored) and windows are strided views of it, reduced in
+    blocks of `block` windows to bound memory. Returns (window end times, [values per quantile]).
+    """
+    interval = sample_interval(epochs)
+    if interval <= 0:
+        return np.zeros(0, dtype=np.int64), [np.zeros(0) for _ in quantiles]
+    origin = epochs[0] // interval * interval
+    grid = np.full(int((epochs[-1] - origin) // interval) + 1, np.nan)
+    grid[(epochs - origin) // interval] = counts
+
+    width = max(1, window // interval)
+    stride = max(1, step // interval)
+    if width > len(grid):
+        return np.zeros(0, dtype=np.int64), [np.zeros(0) for _ in quantiles]
+    windows = np.lib.stride_tricks.sliding_window_view(grid, width)[::stride]
+
+    results = []
+    with warnings.catch_warnings():
+        # Windows falling entirely in a gap are NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for i in range(0, len(windows), block):
+            results.append(np.nanpercentile(windows[i:i + block], quantiles, axis=1))
+    values = np.concatenate(results, axis=1)
+    ends = origin + (np.arange(len(windows)) * stride + width - 1) * interval
+    return ends, list(values)
+
+def seasonality(epochs, counts, quantiles=QUANTILES):
+    """Mean and percentiles of the counts for each UTC hour of the week (0 = Monday 00:00)."""
+    hour_of_week = (epochs + MONDAY_OFFSET) // 3600 % 168
+    keys, _, _, sizes, sums, q = grouped(hour_of_week, counts, quantiles)
+    return {"hours": keys, "means": sums / sizes, "samples": sizes, "quantiles": q}
+
+def year_over_year(epochs, counts, unit='day'):
+    """
+    Mean count per UTC day or week against the same bucket 52 weeks earlier (so
+    weekdays line up). Returns the buckets, their means, the earlier means (NaN when
+    missing) and the absolute and relative deltas.
+    """
+    keys, _, _, sizes, sums, _ = grouped(bucket_starts(epochs, unit), counts)
+    means = sums / sizes
+    previous_keys = keys - 52 * WEEK
+    position = np.minimum(np.searchsorted(keys, previous_keys), max(len(keys) - 1, 0))
+    found = keys[position] == previous_keys if len(keys) else np.zeros(0, dtype=bool)
+    previous = np.where(found, means[position], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            "buckets": keys,
+            "means": means,
+            "previous": previous,
+            "deltas": means - previous,
+            "ratios": means / previous - 1,
+        }
@@ -0,0 +1,252 @@
+"""
+Streaming anomaly detection for the tracker's samples (see AnomalyDetector).
+
+Every series (the global count, each world and each location total) keeps a fixed
+amount of state however long it runs: an EWMA level with the weekly cycle divided out,
+one multiplicative factor per UTC hour of the week, and an EWMA of the absolute
+relative residual as a robust scale. Each sample is scored against level x factor
+before it is folded in; residuals are clipped to ANOMALY_CLIP scales first (Huber) and
+anomalous samples leave the seasonal factors alone, so an outage neither drags the
+baseline down nor widens the scale while it lasts, nor is expected again a week later.
+Samples scoring at least ANOMALY_Z_THRESHOLD open an event in anomaly_events, which
+closes at the first sample back under ANOMALY_Z_CLEAR.
+"""
+import heapq
+import logging
+import math
+from array import array
+
+from config import (
+    ANOMALY_DIMENSIONS, ANOMALY_LEVEL_HALFLIFE, ANOMALY_SCALE_HALFLIFE, ANOMALY_SEASON_ALPHA, ANOMALY_WARMUP_DAYS,
+    ANOMALY_Z_THRESHOLD, ANOMALY_Z_CLEAR, ANOMALY_MIN_DELTA, ANOMALY_CHECKPOINT_INTERVAL
+)
+from database import world_samples
+
+logger = logging.getLogger(__name__)
+
+# Hours in a week; slot 0 is Monday 00:00 UTC (the epoch was a Thursday)
+WEEK_HOURS = 168
+EPOCH_WEEK_OFFSET = 72
+# Mean absolute deviation -> standard deviation of a normal distribution
+SIGMA_PER_MAD = math.sqrt(math.pi / 2)
+# Residuals are clipped to this many scales before updating the state
+ANOMALY_CLIP = 3.0
+# Floor of the relative scale, so a very steady series (e.g. a full world) is not flagged for noise
+MIN_SCALE = 0.03
+# Relative scale a new series starts from, until it has learned its own
+INITIAL_SCALE = 0.1
+
+def hour_of_week(ts):
+    """Seasonal slot of epoch seconds `ts` (0 = Monday 00:00 UTC)."""
+    return (ts // 3600 + EPOCH_WEEK_OFFSET) % WEEK_HOURS
+
+class SeriesState:
+    """Baseline of one series: O(1) memory and time per sample."""
+    __slots__ = ('tag', 'first_ts', 'last_ts', 'level', 'scale', 'seasonal', 'event_id', 'event_kind')
+
+    def __init__(self, tag=None, first_ts=None, last_ts=None, level=None, scale=INITIAL_SCALE, seasonal=None):
+        self.tag = tag
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+        self.level = level
+        self.scale = scale
+        # 0 marks an hour of the week not seen yet
+        self.seasonal = seasonal if seasonal is not None else array('f', bytes(4 * WEEK_HOURS))
+        self.event_id = None
+        self.event_kind = None
+
+    def update(self, ts, value):
+        """Folds in one sample; returns its (expected, z) before the update, or None for the first sample."""
+        slot = hour_of_week(ts)
+        if self.level is None:
+            self.first_ts = self.last_ts = ts
+            self.level = float(value)
+            self.seasonal[slot] = 1.0
+            return None
+
+        dt = ts - self.last_ts
+        self.last_ts = ts
+        season = self.seasonal[slot] or 1.0
+        expected = self.level * season
+        denom = max(expected, 1.0)
+        residual = (value - expected) / denom
+        sigma = SIGMA_PER_MAD * max(self.scale, MIN_SCALE)
+        z = residual / sigma
+
+        clipped = max(-ANOMALY_CLIP * sigma, min(ANOMALY_CLIP * sigma, residual))
+        fitted = expected + clipped * denom
+        self.level += (1 - 0.5 ** (dt / ANOMALY_LEVEL_HALFLIFE)) * (fitted / season - self.level)
+        if not self.seasonal[slot]:
+            self.seasonal[slot] = fitted / max(self.level, 1.0)
+        elif abs(z) < ANOMALY_Z_THRESHOLD:
+            self.seasonal[slot] += ANOMALY_SEASON_ALPHA * (fitted / max(self.level, 1.0) - self.seasonal[slot])
+        self.scale += (1 - 0.5 ** (dt / ANOMALY_SCALE_HALFLIFE)) * (abs(clipped) - self.scale)
+        return expected, z
+
+    def warmed(self, ts):
+        return ts - self.first_ts >= ANOMALY_WARMUP_DAYS * 86400
+
+def recent_samples(conn, after):
+    """
+    Yields (dimension, key, ts, count, tag) for every ANOMALY_DIMENSIONS sample of the
+    live database after `after` (epoch seconds), in time order. World tags are detail
+    ids; with 'changes' storage worlds are forward-filled.
+    """
+    sources = []
+    if 'global' in ANOMALY_DIMENSIONS:
+        sources.append(conn.execute(
+            "SELECT 'global', 0, ts, count, NULL FROM main.players WHERE ts > ? ORDER BY ts", (after,)))
+    if 'world' in ANOMALY_DIMENSIONS:
+        newest = conn.execute("SELECT MAX(ts) FROM main.scrape_events").fetchone()[0]
+        if newest is not None and newest > after:
+            sources.append(sample for sample in world_samples(conn, after + 1, newest + 1) if sample[3] is not None)
+    if 'location' in ANOMALY_DIMENSIONS:
+        sources.append(conn.execute('''
+            SELECT 'location', ss.key, se.ts, ss.player_count, NULL
+            FROM main.scrape_summaries ss JOIN main.scrape_events se ON ss.scrape_id = se.id
+            WHERE ss.dimension = 'location' AND se.ts > ?
+            ORDER BY se.ts
+        ''', (after,)))
+    return heapq.merge(*sources, key=lambda sample: sample[2])
+
+class AnomalyDetector:
+    """
+    Scores samples as the tracker stores them and records anomalies in anomaly_events,
+    inside the caller's transaction. State is loaded once and kept in memory, then
+    checkpointed to anomaly_state every ANOMALY_CHECKPOINT_INTERVAL seconds of samples;
+    load() replays only what was stored after the checkpoint (or, for a new database,
+    the last ANOMALY_WARMUP_DAYS), so history is never rescanned. Like DimensionCache,
+    reset() must be called after a rolled-back transaction.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.series = None
+        self.saved_ts = None
+
+    def load(self, conn):
+        if self.series is not None:
+            return
+        self.series = {}
+        for dimension, key, tag, first_ts, last_ts, level, scale, seasonal in conn.execute(
+                "SELECT dimension, key, tag, first_ts, last_ts, level, scale, seasonal FROM anomaly_state"):
+            self.series[(dimension, key)] = SeriesState(tag, first_ts, last_ts, level, scale, array('f', seasonal))
+
+        if self.series:
+            self.saved_ts = max(state.last_ts for state in self.series.values())
+            # Samples of the checkpoint's tick may have been scored after it was saved
+            after = self.saved_ts - 1
+        else:
+            newest = conn.execute("SELECT MAX(ts) FROM main.players").fetchone()[0] or 0
+            after = newest - ANOMALY_WARMUP_DAYS * 86400
+        replayed = 0
+        for dimension, key, ts, count, tag in recent_samples(conn, after):
+            self.observe(conn, dimension, key, ts, count, tag, record=False)
+            replayed += 1
+        if replayed:
+            logger.info(f"Anomaly detector caught up on {replayed:,} sample(s) for {len(self.series):,} series.")
+
+        # The events of replayed samples were stored with them
+        for event_id, dimension, key, kind in conn.execute(
+                "SELECT id, dimension, key, kind FROM anomaly_events WHERE end_ts IS NULL"):
+            state = self.series.setdefault((dimension, key), SeriesState())
+            state.event_id, state.event_kind = event_id, kind
+
+    def observe(self, conn, dimension, key, ts, value, tag=None, record=True):
+        """
+        Scores and folds in one sample. A change of `tag` (a world's details) starts the
+        series over. Samples not newer than the series' last one are ignored, so replayed
+        journal entries are not counted twice. Without `record`, events are left alone.
+        """
+        if dimension not in ANOMALY_DIMENSIONS:
+            return
+        self.load(conn)
+        state = self.series.get((dimension, key))
+        if state is None or state.tag != tag:
+            if state is not None and record:
+                self._close(conn, state, ts)
+            state = self.series[(dimension, key)] = SeriesState(tag)
+        elif state.last_ts is not None and ts <= state.last_ts:
+            return
+
+        scored = state.update(ts, value)
+        if record:
+            if scored is not None and state.warmed(ts):
+                self._record(conn, dimension, key, ts, value, *scored, state)
+            if self.saved_ts is None or ts - self.saved_ts >= ANOMALY_CHECKPOINT_INTERVAL:
+                self.checkpoint(conn, ts)
+
+    def _record(self, conn, dimension, key, ts, value, expected, z, state):
+        kind = 'drop' if z < 0 else 'spike'
+        if state.event_id is not None:
+            if state.event_kind == kind and abs(z) >= ANOMALY_Z_CLEAR:
+                conn.execute('''
+                    UPDATE anomaly_events SET last_ts = :ts, samples = samples + 1,
+                        expected = CASE WHEN ABS(:z) > ABS(z) THEN :expected ELSE expected END,
+                        observed = CASE WHEN ABS(:z) > ABS(z) THEN :observed ELSE observed END,
+                        z = CASE WHEN ABS(:z) > ABS(z) THEN :z ELSE z END
+                    WHERE id = :id
+                ''', {'ts': ts, 'z': z, 'expected': round(expected), 'observed': value, 'id': state.event_id})
+                return
+            self._close(conn, state, ts)
+
+        if abs(z) >= ANOMALY_Z_THRESHOLD and abs(value - expected) >= ANOMALY_MIN_DELTA:
+            state.event_id = conn.execute('''
+                INSERT INTO anomaly_events (dimension, key, kind, start_ts, last_ts, expected, observed, z, samples)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+            ''', (dimension, key, kind, ts, ts, round(expected), value, z)).lastrowid
+            state.event_kind = kind
+            logger.warning(f"Anomaly: {dimension} {key} {kind} to {value:,} (expected {expected:,.0f}, z={z:.1f}).")
+
+    def _close(self, conn, state, ts):
+        if state.event_id is not None:
+            conn.execute("UPDATE anomaly_events SET end_ts = ? WHERE id = ?", (ts, state.event_id))
+            state.event_id = state.event_kind = None
+
+    def checkpoint(self, conn, ts):
+        """
+        Saves every series' state. Open events of series without a sample for a whole
+        checkpoint interval (e.g. a world that went offline) are closed at their last sample.
+        """
+        for state in self.series.values():
+            if state.event_id is not None and state.last_ts is not None and ts - state.last_ts >= ANOMALY_CHECKPOINT_INTERVAL:
+                self._close(conn, state, state.last_ts)
+        conn.executemany('''
+            INSERT OR REPLACE INTO anomaly_state (dimension, key, tag, first_ts, last_ts, level, scale, seasonal)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (dimension, key, state.tag, state.first_ts, state.last_ts, state.level, state.scale, state.seasonal.tobytes())
+            for (dimension, key), state in self.series.items() if state.level is not None
+        ])
+        self.saved_ts = ts
+
+def rebuild_anomalies(conn, days):
+    """
+    Starts the detector over from the last `days` of the live database (counted back
+    from the newest sample): its state is cleared, events it can record again (those
+    after the first ANOMALY_WARMUP_DAYS of the replay) are deleted and older open ones
+    closed, and the samples are replayed through a new detector, recording events as the
+    tracker would have. Returns (samples, events).
+    """
+    newest = conn.execute("SELECT MAX(ts) FROM main.players").fetchone()[0]
+    if newest is None:
+        return 0, 0
+    start = newest - days * 86400
+    detector = AnomalyDetector()
+    detector.series = {}
+    # Checkpointed once at the end instead of every interval of the replay
+    detector.saved_ts = newest
+    samples = 0
+    with conn:
+        conn.execute("DELETE FROM anomaly_state")
+        conn.execute("DELETE FROM anomaly_events WHERE start_ts >= ?", (start + ANOMALY_WARMUP_DAYS * 86400,))
+        conn.execute("UPDATE anomaly_events SET end_ts = last_ts WHERE end_ts IS NULL")
+        first_event = conn.execute("SELECT COALESCE(MAX(id), 0) FROM anomaly_events").fetchone()[0]
+        for dimension, key, ts, count, tag in recent_samples(conn, start):
+            detector.observe(conn, dimension, key, ts, count, tag)
+            samples += 1
+        detector.checkpoint(conn, newest)
+        events = conn.execute("SELECT COUNT(*) FROM anomaly_events WHERE id > ?", (first_event,)).fetchone()[0]
+    return samples, events
@@ -0,0 +1,207 @@
+"""
+Offline import of archived homepage and server list (/slu) pages, e.g. our own
+captures or Wayback Machine snapshots, for `manage.py import-pages`.
+
+Pages are timestamped from their path (or mtime) and sorted before anything is
+parsed, parsed in order by a process pool with the tracker's own byte-based parsers,
+and loaded in a single write transaction with the secondary indexes rebuilt once at
+the end, so years of history load at whatever rate the cores can parse.
+"""
+import calendar
+import gzip
+import itertools
+import logging
+import os
+import re
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from config import WORLD_STORAGE
+from database import create_epoch_indexes, backfill_rollups, sealed_partitions, compacted_range, bump_history_version
+from slu_parser import parse_world_data, parse_osrs_count
+
+logger = logging.getLogger(__name__)
+
+# Wayback Machine capture stamp (YYYYMMDDhhmmss, UTC), e.g. web/20190115123456/https://oldschool.runescape.com/slu
+STAMP_RE = re.compile(r"(?<!\d)(\d{14})(?!\d)")
+# Pages handed to a worker process at a time, and batches in flight per worker
+PAGE_BATCH = 32
+BATCHES_PER_WORKER = 4
+# Seconds between progress lines
+PROGRESS_INTERVAL = 10
+# Secondary indexes dropped for the load and rebuilt by create_epoch_indexes
+DEFERRED_INDEXES = ('idx_players_ts_count', 'idx_world_data_covering')
+
+def page_timestamp(name, mtime):
+    """Capture time (epoch seconds) of a saved page: the last Wayback stamp in its path, else its mtime."""
+    for stamp in reversed(STAMP_RE.findall(name)):
+        try:
+            return calendar.timegm(time.strptime(stamp, '%Y%m%d%H%M%S'))
+        except ValueError:
+            continue
+    return int(mtime)
+
+def list_pages(path):
+    """
+    [(ts, name, member)] of every file in directory or tarball `path`, oldest first.
+    `member` is the TarInfo for tarballs and None for files on disk (`name` is their path).
+    """
+    if os.path.isdir(path):
+        pages = []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file in sorted(files):
+                full = os.path.join(root, file)
+                pages.append((page_timestamp(os.path.relpath(full, path), os.path.getmtime(full)), full, None))
+    else:
+        with tarfile.open(path) as tar:
+            pages = [(page_timestamp(m.name, m.mtime), m.name, m) for m in tar if m.isfile()]
+    return sorted(pages, key=lambda page: (page[0], page[1]))
+
+def read_pages(path, pages):
+    """
+    Yields (ts, name, source) for `pages`: tarball members are read here (in the given
+    order, which for a compressed tarball is fastest when it was written oldest first),
+    files on disk are left for the worker to read.
+    """
+    if os.path.isdir(path):
+        for ts, name, _ in pages:
+            yield ts, name, name
+        return
+    with tarfile.open(path) as tar:
+        for ts, name, member in pages:
+            yield ts, name, tar.extractfile(member).read()
+
+def parse_page(content):
+    """('slu', worlds) or ('count', count) for a saved page, or (None, None) if neither parser finds anything."""
+    # Raw Wayback downloads can still be gzip-encoded
+    if content[:2] == b'\x1f\x8b':
+        content = gzip.decompress(content)
+    if b'server-list__row' in content:
+        worlds = parse_world_data(content)
+        return ('slu', worlds) if worlds else (None, None)
+    count = parse_osrs_count(content)
+    return ('count', count) if count else (None, None)
+
+def parse_batch(batch):
+    """Worker: parses a batch of (ts, name, source) pages, reading `source` first when it is a path."""
+    results = []
+    for ts, name, source in batch:
+        try:
+            if not isinstance(source, bytes):
+                with open(source, 'rb') as f:
+                    source = f.read()
+            kind, value = parse_page(source)
+        except Exception as e:
+            logger.warning(f"Could not parse {name}: {e}")
+            kind, value = None, None
+        results.append((ts, name, kind, value))
+    return results
+
+def parse_in_order(pages, workers=None):
+    """
+    Yields parse_batch's (ts, name, kind, value) for (ts, name, source) `pages` in their
+    order, parsed by `workers` processes (default: one per CPU core) with a bounded
+    number of batches in flight, so memory stays flat however large the archive is.
+    """
+    workers = workers or os.cpu_count() or 1
+    pages = iter(pages)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while True:
+            batch = list(itertools.islice(pages, PAGE_BATCH))
+            if batch:
+                pending.append(executor.submit(parse_batch, batch))
+            if pending and (not batch or len(pending) >= workers * BATCHES_PER_WORKER):
+                yield from pending.popleft().result()
+            elif not batch:
+                return
+
+def import_pages(conn, path, workers=None):
+    """
+    Imports every homepage (global count) and server list (world scrape) page in
+    directory or tarball `path` in one transaction and rebuilds the rollups. Pages
+    whose timestamp is already stored, repeated in the archive, inside a sealed
+    partition or in hours already compacted (see compact_history) are skipped, and
+    so are world scrapes not newer than the last stored one with 'compact' or
+    'changes' storage (both assume scrapes arrive in time order).
+    Returns a dict of counts and the elapsed seconds.
+    """
+    # Imported here so rs_tracker's logging setup does not replace the caller's
+    from rs_tracker import DimensionCache, write_world_scrape
+
+    t0 = time.monotonic()
+    pages = list_pages(path)
+    # Hours that must not gain raw rows: sealed partitions and compacted history
+    frozen = [(start, end) for _, start, end in sealed_partitions(conn)]
+    if compacted_range(conn):
+        frozen.append(compacted_range(conn))
+    loadable = [page for page in pages if not any(start <= page[0] < end for start, end in frozen)]
+    stats = {'pages': len(pages), 'counts': 0, 'scrapes': 0, 'duplicates': 0,
+             'skipped': len(pages) - len(loadable), 'unparsed': 0}
+    if not loadable:
+        stats['seconds'] = time.monotonic() - t0
+        return stats
+
+    first, last = loadable[0][0], loadable[-1][0]
+    stored = {
+        'count': {row[0] for row in conn.execute("SELECT ts FROM players WHERE ts BETWEEN ? AND ?", (first, last))},
+        'slu': {row[0] for row in conn.execute("SELECT ts FROM scrape_events WHERE ts BETWEEN ? AND ?", (first, last))}
+    }
+    newest_scrape = None
+    if WORLD_STORAGE != 'rows':
+        newest_scrape = conn.execute("SELECT MAX(ts) FROM scrape_events").fetchone()[0]
+
+    players = []
+    dimensions = DimensionCache()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Load the writer's state while the indexes it is read through still exist
+        dimensions.load(conn)
+        if WORLD_STORAGE == 'compact':
+            dimensions.snapshot_details(conn, None)
+        elif WORLD_STORAGE == 'changes':
+            dimensions.changed_worlds(conn, None)
+        for index in DEFERRED_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+        next_progress = time.monotonic() + PROGRESS_INTERVAL
+        for done, (ts, name, kind, value) in enumerate(parse_in_order(read_pages(path, loadable), workers), 1):
+            if kind is None:
+                stats['unparsed'] += 1
+            elif ts in stored[kind]:
+                stats['duplicates'] += 1
+            elif kind == 'slu' and newest_scrape is not None and ts <= newest_scrape:
+                stats['skipped'] += 1
+            elif kind == 'slu':
+                write_world_scrape(conn, ts, value, dimensions)
+                stats['scrapes'] += 1
+            else:
+                players.append((ts, value))
+                stats['counts'] += 1
+            if kind is not None:
+                stored[kind].add(ts)
+            if time.monotonic() >= next_progress:
+                elapsed = time.monotonic() - t0
+                logger.info(f"Imported {done:,}/{len(loadable):,} pages ({done / elapsed:,.0f} pages/sec)...")
+                next_progress += PROGRESS_INTERVAL
+
+        conn.executemany("INSERT INTO players (ts, count) VALUES (?, ?)", players)
+        logger.info("Rebuilding indexes...")
+        # Commits the import
+        create_epoch_indexes(conn)
+    except BaseException:
+        conn.rollback()
+        raise
+
+    if players:
+        logger.info("Rebuilding rollups...")
+        backfill_rollups(conn)
+    if stats['counts'] or stats['scrapes']:
+        # Closed history chunks may have gained samples; bumped last so none is cached with old rollups
+        with conn:
+            bump_history_version(conn)
+    stats['seconds'] = time.monotonic() - t0
+    return stats
@@ -0,0 +1,70 @@
+"""
+Compares the SLU parser backends on the saved server-list fixtures.
+
+Checks that every backend extracts exactly the same worlds as the BeautifulSoup
+reference, then reports best-of-N parse time and peak traced memory per fixture.
+
+Usage:
+    python -m benchmarks.bench_slu_parser [--repeat 20]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+import slu_parser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def get_backends():
+    backends = {
+        'soup': slu_parser.parse_world_data_soup,
+        'stdlib': slu_parser.parse_world_data_stdlib,
+    }
+    if slu_parser.etree is not None:
+        backends['lxml'] = slu_parser.parse_world_data_lxml
+    return backends
+
+def measure(parse, content, repeat):
+    """Returns (best seconds, peak bytes) for parsing `content`."""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        parse(content)
+        best = min(best, time.perf_counter() - t0)
+
+    tracemalloc.start()
+    parse(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help="Timing runs per backend and fixture.")
+    args = parser.parse_args()
+
+    backends = get_backends()
+    mismatches = 0
+
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'slu*.html'))):
+        with open(path, 'rb') as f:
+            content = f.read()
+        expected = slu_parser.parse_world_data_soup(content)
+        print(f"{os.path.basename(path)} ({len(content):,} bytes, {len(expected)} worlds)")
+
+        for name, parse in backends.items():
+            equal = parse(content) == expected
+            if not equal:
+                mismatches += 1
+            best, peak = measure(parse, content, args.repeat)
+            print(f"  {name:<8} {best * 1000:8.2f} ms  {peak / 1024:9.1f} KiB peak  {'ok' if equal else 'MISMATCH'}")
+
+    if mismatches:
+        print(f"{mismatches} backend/fixture combination(s) differ from the reference parser.")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Checks PageFetcher and run_scheduler against a local stub server.
+
+Serves a homepage and the saved server list fixture over HTTP and asserts that:
+- an unchanged page is answered with 304 to a conditional request and its parsed
+  result is reused without re-parsing, and a changed page is parsed again;
+- failed requests are retried with doubling backoff, and the error is raised once
+  the retries run out;
+- threads sharing a fetcher each get their own session;
+- run_scheduler stamps samples with consecutive wall-clock ticks, scrapes worlds
+  every `world_interval`, and skips the ticks an overrunning fetch missed.
+
+Usage:
+    python -m benchmarks.check_fetcher
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from rs_tracker import PageFetcher, run_scheduler
+from slu_parser import parse_osrs_count, parse_world_data
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+class StubState:
+    """What the stub server serves, and the requests it has seen."""
+
+    def __init__(self):
+        self.count = 12345
+        self.failures = 0  # Requests to /flaky still to answer with 503
+        self.delay = 0.0  # Seconds the homepage takes to respond
+        self.requests = []  # (path, If-None-Match header, status)
+        with open(os.path.join(FIXTURES_DIR, 'slu.html'), 'rb') as f:
+            self.slu = f.read()
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/slu':
+                self.reply(200, state.slu, 'slu-1')
+            elif self.path == '/flaky' and state.failures > 0:
+                state.failures -= 1
+                self.reply(503, b'unavailable')
+            elif self.path in ('/', '/flaky'):
+                time.sleep(state.delay)
+                body = f"There are currently {state.count:,} people playing!".encode()
+                self.reply(200, body, f'home-{state.count}')
+            else:
+                self.reply(404, b'not found')
+
+        def reply(self, status, body, etag=None):
+            if etag and self.headers.get('If-None-Match') == f'"{etag}"':
+                status, body = 304, b''
+            state.requests.append((self.path, self.headers.get('If-None-Match'), status))
+            self.send_response(status)
+            if etag:
+                self.send_header('ETag', f'"{etag}"')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+class CountingParser:
+    """Wraps a parse function and counts its calls."""
+
+    def __init__(self, parse):
+        self.parse = parse
+        self.calls = 0
+
+    def __call__(self, content):
+        self.calls += 1
+        return self.parse(content)
+
+class RecordingWriter:
+    """Stands in for ScrapeWriter and records what run_scheduler submits."""
+
+    def __init__(self):
+        self.samples = []
+
+    def submit(self, ts, count, world_data_list, scrape_worlds):
+        self.samples.append((ts, time.time(), count, len(world_data_list or []), scrape_worlds))
+
+def check_conditional(state, base):
+    fetcher = PageFetcher(retries=0)
+    parse = CountingParser(parse_osrs_count)
+    first = fetcher.fetch(base + '/', parse)
+    second = fetcher.fetch(base + '/', parse)
+    assert first == second == 12345, (first, second)
+    assert parse.calls == 1, f"unchanged page was parsed {parse.calls} times"
+    assert state.requests[-1] == ('/', '"home-12345"', 304), state.requests[-1]
+
+    state.count = 23456
+    third = fetcher.fetch(base + '/', parse)
+    assert third == 23456 and parse.calls == 2, (third, parse.calls)
+    fetcher.close()
+    print("  ok  unchanged page answered with 304 and reused without re-parsing; changed page parsed again")
+
+def check_retries(state, base):
+    backoff = 0.05
+    fetcher = PageFetcher(retries=3, backoff=backoff)
+    state.failures = 2
+    seen = len(state.requests)
+    t0 = time.monotonic()
+    count = fetcher.fetch(base + '/flaky', parse_osrs_count)
+    elapsed = time.monotonic() - t0
+    statuses = [status for _, _, status in state.requests[seen:]]
+    assert count == state.count and statuses == [503, 503, 200], (count, statuses)
+    # Two retries wait backoff and then twice that
+    assert elapsed >= backoff * 3, f"retried after {elapsed:.3f}s"
+
+    state.failures = 10
+    seen = len(state.requests)
+    try:
+        fetcher.fetch(base + '/flaky', parse_osrs_count)
+    except requests.HTTPError:
+        pass
+    else:
+        raise AssertionError("fetch did not raise once its retries ran out")
+    assert len(state.requests) - seen == 4, f"{len(state.requests) - seen} requests for 3 retries"
+    state.failures = 0
+    fetcher.close()
+    print("  ok  failed requests retried with doubling backoff; error raised after the last retry")
+
+def check_threads(state, base):
+    fetcher = PageFetcher(retries=0)
+    idents = set()
+
+    def fetch(_):
+        idents.add(threading.get_ident())
+        return fetcher.fetch(base + '/', parse_osrs_count)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        counts = list(pool.map(fetch, range(16)))
+    threads = len(idents)
+    assert counts == [state.count] * 16, counts
+    assert len({id(session) for session in fetcher._sessions}) == threads, f"{len(fetcher._sessions)} sessions"
+    fetcher.close()
+    print(f"  ok  {threads} threads sharing a fetcher used {threads} separate sessions")
+
+def check_scheduler(state, base):
+    interval, world_interval = 1, 2
+    fetcher = PageFetcher(retries=0)
+    writer = RecordingWriter()
+    asyncio.run(run_scheduler(writer, fetcher, interval, world_interval, base + '/', base + '/slu', max_ticks=4))
+    ticks = [sample[0] for sample in writer.samples]
+    assert all(tick % interval == 0 for tick in ticks), ticks
+    assert ticks == list(range(ticks[0], ticks[0] + 4 * interval, interval)), ticks
+    # Submitted after the tick, and well before the next one
+    assert all(0 <= submitted - tick < interval for tick, submitted, *_ in writer.samples), writer.samples
+    worlds = [scrape_worlds for *_, scrape_worlds in writer.samples]
+    # The first tick scrapes worlds, then every world_interval after it
+    assert worlds == [(tick - ticks[0]) % world_interval == 0 for tick in ticks], (ticks, worlds)
+    assert all(n > 0 for *_, n, scrape_worlds in writer.samples if scrape_worlds), writer.samples
+    print(f"  ok  {len(ticks)} samples on consecutive {interval}s wall-clock ticks, worlds every {world_interval}s")
+
+    # A fetch longer than the interval skips the tick it overran instead of drifting
+    state.delay = 1.3 * interval
+    writer = RecordingWriter()
+    asyncio.run(run_scheduler(writer, fetcher, interval, world_interval, base + '/', base + '/slu', max_ticks=2))
+    state.delay = 0.0
+    ticks = [sample[0] for sample in writer.samples]
+    assert ticks[1] - ticks[0] == 2 * interval, ticks
+    fetcher.close()
+    print("  ok  overrunning fetch skipped the missed tick and stayed on the wall-clock grid")
+
+def main():
+    state = StubState()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    if not parse_world_data(state.slu):
+        print("The server list fixture has no worlds.")
+        sys.exit(1)
+
+    failed = False
+    try:
+        for check in (check_conditional, check_retries, check_threads, check_scheduler):
+            try:
+                check(state, base)
+            except AssertionError as e:
+                failed = True
+                print(f"  FAILED  {check.__name__}: {e}")
+    finally:
+        server.shutdown()
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Checks that sealing partitions does not change what the API returns.
+
+Generates a synthetic database with one world seen only in its oldest month, records
+/api/history, /api/history/series and /api/metadata responses for a set of queries
+(open-ended ones without a row limit included, which must read every partition), seals
+every closed month with `seal_partitions` and compares the responses of the
+partitioned database against the recorded ones.
+
+Usage:
+    python -m benchmarks.check_partitions [--years 0.3] [--worlds 40]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import database
+from benchmarks.generate_db import generate
+
+# A world only the oldest scrape lists, so sealing moves all of its rows out of the live database
+RETIRED_WORLD = 999
+
+QUERIES = [
+    '/api/metadata',
+    '/api/history',
+    '/api/history?limit=50',
+    '/api/history?unit=minute&step=7',
+    '/api/history?unit=hour',
+    '/api/history?world_id=5',
+    '/api/history?world_id=5&limit=50',
+    '/api/history?is_f2p=1',
+    '/api/history?location_id=2',
+    '/api/history?location_id=1&is_f2p=0',
+    '/api/history/series?group_by=location',
+    '/api/history/series?group_by=world&limit=20',
+]
+
+def bounded_queries(now):
+    """
+    A range inside a sealed month, then one in the live month: the pooled connection
+    that routed the first must read the live tables again for the second.
+    """
+    def iso(ts):
+        return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+    old = now - 60 * 86400
+    return [f'/api/history?start={iso(old)}&end={iso(old + 21600)}',
+            f'/api/history?start={iso(now - 21600)}&end={iso(now)}']
+
+def responses(client, queries):
+    """{query: (status, body)} for every query in `queries`, in order."""
+    results = {}
+    for query in queries:
+        response = client.get(query)
+        results[query] = (response.status_code, response.get_data())
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=float, default=0.3, help="Years of history to generate.")
+    parser.add_argument('--worlds', type=int, default=40, help="Number of worlds per scrape.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database.DB_PATH = os.path.join(directory, 'check.db')
+        database.PARTITION_DIR = os.path.join(directory, 'partitions')
+        generate(database.DB_PATH, years=args.years, worlds=args.worlds)
+        conn = database.init_db()
+        with conn:
+            conn.execute('''
+                INSERT INTO world_data (scrape_id, world_number, player_count, detail_id)
+                SELECT scrape_id, ?, player_count, detail_id FROM world_data
+                WHERE scrape_id = (SELECT id FROM scrape_events ORDER BY ts LIMIT 1) LIMIT 1
+            ''', (RETIRED_WORLD,))
+        conn.close()
+
+        # Imported once DB_PATH points at the generated database
+        import osrs_api
+        client = osrs_api.app.test_client()
+        queries = QUERIES + bounded_queries(time.time())
+        expected = responses(client, queries)
+        if RETIRED_WORLD not in json.loads(expected['/api/metadata'][1])['worlds']:
+            print(f"World {RETIRED_WORLD} is missing from /api/metadata before sealing.")
+            sys.exit(1)
+
+        conn = database.init_db()
+        try:
+            sealed = database.seal_partitions(conn, directory=database.PARTITION_DIR)
+        finally:
+            conn.close()
+        database.clear_read_pool()
+        # Sealing leaves data_version as it is, so rebuild what the API cached rather than replay it
+        osrs_api._response_cache.clear()
+        osrs_api._preset_cache.clear()
+        print(f"Sealed {len(sealed)} partition(s): {', '.join(sealed)}")
+        if not sealed:
+            print("Nothing was sealed; generate more history with --years.")
+            sys.exit(1)
+
+        mismatches = 0
+        for query, result in responses(client, queries).items():
+            equal = result == expected[query]
+            mismatches += not equal
+            print(f"  {'ok' if equal else 'MISMATCH':<8} {result[0]} {len(result[1]):>10,} bytes  {query}")
+        database.clear_read_pool()
+
+    if mismatches:
+        print(f"{mismatches} quer{'y differs' if mismatches == 1 else 'ies differ'} after partitioning.")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Writes a synthetic player count database for benchmarking.
+
+The data ends at the current time and spans `--years` of history: a global count
+every 5 minutes (daily and weekly cycles, noise and the odd missed sample) and a
+world scrape every 30 minutes (every 5 with `--storage changes`) across `--worlds`
+worlds, whose activity, location and F2P status occasionally change. Rollups and per-scrape summaries are built the
+same way the tracker builds them, so every API path has data to read.
+
+Usage:
+    python -m benchmarks.generate_db bench.db --years 2 [--worlds 250] [--storage rows|compact|changes]
+"""
+import argparse
+import math
+import os
+import random
+import time
+
+from config import WORLD_STORAGE, WORLD_CHANGE_THRESHOLD
+from database import init_db, backfill_rollups, write_scrape_summary, write_world_snapshot, write_world_changes
+
+SAMPLE_INTERVAL = 300
+WORLD_INTERVAL = 1800
+
+LOCATIONS = ['United States (East)', 'United States (West)', 'United Kingdom', 'Germany', 'Australia']
+ACTIVITIES = [
+    '-', 'Trade - Members', 'Trade - Free', 'PvP World', 'High Risk World', 'Skill total (1500)',
+    'Skill total (2000)', 'Skill total (2200)', 'Deadman', 'Castle Wars', 'Fresh Start World',
+    'LMS Competitive', 'Blast Furnace', 'Wintertodt', 'Group Iron', 'Tempoross',
+]
+
+def global_count(ts, rnd):
+    """Daily and weekly cycles around a slowly growing baseline, plus noise."""
+    days = ts / 86400
+    daily = math.sin(2 * math.pi * (days % 1 - 0.55))
+    weekend = 0.05 if time.gmtime(ts).tm_wday >= 5 else 0.0
+    base = 100000 + 2000 * days / 365
+    return int(base * (1 + 0.22 * daily + weekend) + rnd.gauss(0, 1500))
+
+def generate(path, years=1.0, worlds=250, storage=WORLD_STORAGE, seed=0, batch_days=7, world_interval=None,
+             threshold=WORLD_CHANGE_THRESHOLD):
+    """Writes the database at `path` (replacing it) and returns (players rows, scrapes)."""
+    if world_interval is None:
+        world_interval = SAMPLE_INTERVAL if storage == 'changes' else WORLD_INTERVAL
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    rnd = random.Random(seed)
+    conn = init_db(path)
+    conn.execute("PRAGMA synchronous = OFF")
+
+    location_ids = [conn.execute("INSERT INTO locations (name) VALUES (?)", (name,)).lastrowid for name in LOCATIONS]
+    activity_ids = [conn.execute("INSERT INTO activities (description) VALUES (?)", (desc,)).lastrowid for desc in ACTIVITIES]
+    detail_ids = {}
+    for location_id in location_ids:
+        for is_f2p in (0, 1):
+            for activity_id in activity_ids:
+                detail_ids[(location_id, is_f2p, activity_id)] = conn.execute(
+                    "INSERT INTO world_details (location_id, is_f2p, activity_id) VALUES (?, ?, ?)",
+                    (location_id, is_f2p, activity_id)
+                ).lastrowid
+    conn.commit()
+
+    # Each world: [location_id, is_f2p, activity_id] and a popularity weight
+    world_state = {}
+    weights = {}
+    for world in range(1, worlds + 1):
+        world_state[world] = [rnd.choice(location_ids), int(rnd.random() < 0.2),
+                              activity_ids[0] if rnd.random() < 0.6 else rnd.choice(activity_ids)]
+        weights[world] = rnd.lognormvariate(0, 0.5)
+    total_weight = sum(weights.values())
+    snapshot_details = {}
+    stored_worlds = {}
+
+    end = int(time.time()) // SAMPLE_INTERVAL * SAMPLE_INTERVAL
+    start = end - int(years * 365 * 86400) // world_interval * world_interval
+    batch_seconds = batch_days * 86400
+    players_rows = 0
+    scrapes = 0
+
+    for batch_start in range(start, end + 1, batch_seconds):
+        batch_end = min(batch_start + batch_seconds, end + 1)
+        players = []
+        with conn:
+            for ts in range(batch_start, batch_end, SAMPLE_INTERVAL):
+                # Roughly one sample in 500 is lost to a failed fetch
+                if rnd.random() < 0.002:
+                    continue
+                count = global_count(ts, rnd)
+                players.append((ts, count))
+                if ts % world_interval:
+                    continue
+
+                scrape_id = conn.execute("INSERT INTO scrape_events (ts) VALUES (?)", (ts,)).lastrowid
+                rows = []
+                summary_rows = []
+                for world, state in world_state.items():
+                    if rnd.random() < 0.002:
+                        state[2] = rnd.choice(activity_ids)
+                    if rnd.random() < 0.0002:
+                        state[0] = rnd.choice(location_ids)
+                        state[1] = int(rnd.random() < 0.2)
+                    player_count = min(2000, max(0, int(count * weights[world] / total_weight * rnd.uniform(0.85, 1.15))))
+                    rows.append((world, player_count, detail_ids[tuple(state)]))
+                    summary_rows.append((player_count, state[0], state[1], state[2]))
+
+                if storage == 'compact':
+                    write_world_snapshot(conn, scrape_id, rows, snapshot_details)
+                elif storage == 'changes':
+                    write_world_changes(conn, scrape_id, rows, stored_worlds, threshold)
+                else:
+                    conn.executemany(
+                        "INSERT INTO world_data (scrape_id, world_number, player_count, detail_id) VALUES (?, ?, ?, ?)",
+                        [(scrape_id,) + row for row in rows]
+                    )
+                write_scrape_summary(conn, scrape_id, summary_rows)
+                scrapes += 1
+
+            conn.executemany("INSERT INTO players (ts, count) VALUES (?, ?)", players)
+        players_rows += len(players)
+
+    backfill_rollups(conn)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return players_rows, scrapes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help="Database file to write (replaced if it exists).")
+    parser.add_argument('--years', type=float, default=1.0, help="Years of history to generate.")
+    parser.add_argument('--worlds', type=int, default=250, help="Number of worlds per scrape.")
+    parser.add_argument('--storage', choices=['rows', 'compact', 'changes'], default=WORLD_STORAGE, help="World data layout.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    players_rows, scrapes = generate(args.path, args.years, args.worlds, args.storage, args.seed)
+    print(f"Wrote {players_rows:,} samples and {scrapes:,} world scrapes to {args.path} "
+          f"({os.path.getsize(args.path) / 2**20:,.1f} MiB) in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Small load-test harness for the API's read endpoints.
+
+Hammers /api/latest and /api/history from concurrent client threads for a fixed
+duration and reports requests/sec and latency percentiles per endpoint.
+
+By default it serves osrs_api in-process (threaded werkzeug server) against the
+configured database, once with per-request connections and once with the pooled
+read-only connections, so both are measured on the same data:
+    python -m benchmarks.load_test --duration 10 --concurrency 8
+
+Or point it at an already running server:
+    python -m benchmarks.load_test --url http://127.0.0.1:5000
+
+Or measure how throughput scales across cores by starting gunicorn (gunicorn.conf.py)
+with each worker count in turn; clients then run in as many processes as the
+largest worker count so the load generator is not the bottleneck:
+    python -m benchmarks.load_test --workers 1,2,4,8 --concurrency 32
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+
+DEFAULT_PATHS = [
+    '/api/latest',
+    '/api/history?preset=7d&unit=hour&agg=max&max_points=2000',
+    '/api/history?chunk={month}&v=1&unit=hour&agg=max&max_points=2000',
+    '/api/history?unit=hour&start={day_ago}',
+    '/api/history?start={day_ago}',
+    '/api/history?unit=day&start={year_ago}',
+]
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def collect_latencies(base_url, path, duration, concurrency):
+    """Returns (latencies in seconds, errors) of `concurrency` threads looping GET base_url + path."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        local = []
+        failed = 0
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                if session.get(base_url + path, timeout=30).status_code >= 400:
+                    failed += 1
+            except requests.RequestException:
+                failed += 1
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+def run_load(base_url, path, duration, concurrency, processes=1):
+    """
+    Returns (requests/sec, p50 ms, p95 ms, errors) for GET base_url + path, with the
+    client threads spread over `processes` processes.
+    """
+    if processes <= 1:
+        latencies, errors = collect_latencies(base_url, path, duration, concurrency)
+    else:
+        shares = [concurrency // processes + (i < concurrency % processes) for i in range(processes)]
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(collect_latencies, *zip(*[(base_url, path, duration, n) for n in shares if n])))
+        latencies = [latency for result, _ in results for latency in result]
+        errors = sum(failed for _, failed in results)
+    return len(latencies) / duration, percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000, errors
+
+def report(label, base_url, paths, duration, concurrency, processes=1):
+    print(label)
+    for path in paths:
+        rps, p50, p95, errors = run_load(base_url, path, duration, concurrency, processes)
+        print(f"  {rps:9.1f} req/s  p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  errors {errors:<4} {path}")
+
+def serve_in_process():
+    """Starts osrs_api on a free local port and returns (server, base_url)."""
+    from werkzeug.serving import make_server
+    import osrs_api
+
+    server = make_server('127.0.0.1', 0, osrs_api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def serve_gunicorn(workers):
+    """Starts gunicorn with `workers` processes on a free local port; returns (process, base_url)."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning'],
+        cwd=root
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base_url + '/api/latest', timeout=5)
+            # Let every worker boot and finish its warm-up before measuring
+            time.sleep(2 + workers * 0.5)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="Base URL of a running API (default: serve in-process and compare modes).")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per endpoint.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads.")
+    parser.add_argument('--path', action='append', help="Endpoint path to test (repeatable).")
+    parser.add_argument('--workers', help="Comma-separated gunicorn worker counts to compare, e.g. 1,2,4,8.")
+    args = parser.parse_args()
+
+    now = time.time()
+    fmt = {
+        'day_ago': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now - 86400)),
+        'year_ago': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now - 365 * 86400)),
+        'month': time.strftime('%Y-%m', time.gmtime(now)),
+    }
+    paths = [p.format(**fmt) for p in (args.path or DEFAULT_PATHS)]
+
+    if args.url:
+        report(args.url, args.url.rstrip('/'), paths, args.duration, args.concurrency)
+        return
+
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(',')]
+        processes = max(counts)
+        print(f"{os.cpu_count()} CPU cores, {args.concurrency} client threads in {processes} processes")
+        for workers in counts:
+            process, base_url = serve_gunicorn(workers)
+            try:
+                report(f"gunicorn, {workers} worker(s)", base_url, paths, args.duration, args.concurrency, processes)
+            finally:
+                process.terminate()
+                process.wait()
+        return
+
+    import osrs_api
+    server, base_url = serve_in_process()
+    try:
+        for pooled in (False, True):
+            osrs_api.API_READ_POOL = pooled
+            osrs_api._response_cache.clear()
+            label = "Pooled read-only connections" if pooled else "Per-request connections"
+            report(label, base_url, paths, args.duration, args.concurrency)
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmark cases for the API read paths, the SLU parser and the scrape insert.
+
+Runs every case against a database written by benchmarks.generate_db and reports
+best/median/mean wall time per case. Results are written as JSON so runs can be
+kept and compared over time:
+    python -m benchmarks.generate_db bench.db --years 2
+    python -m benchmarks.suite bench.db --output before.json
+    ... change something ...
+    python -m benchmarks.suite bench.db --output after.json --compare before.json
+
+Pass `-k text` to run only the cases whose name contains `text`.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+
+import database
+import slu_parser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def iso(ts):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+def api_paths(last_ts, first_ts):
+    """(case name, path) for every /api/history mode, relative to the newest sample."""
+    day = iso(last_ts - 86400)
+    week = iso(last_ts - 7 * 86400)
+    year = iso(max(first_ts, last_ts - 365 * 86400))
+    everything = iso(first_ts)
+    return [
+        ('latest', '/api/latest'),
+        ('metadata', '/api/metadata'),
+        ('history.raw.default', '/api/history'),
+        ('history.raw.day', f'/api/history?start={day}'),
+        ('history.raw.week', f'/api/history?start={week}'),
+        ('history.minute.step5.day', f'/api/history?unit=minute&step=5&start={day}'),
+        ('history.minute.step3.day', f'/api/history?unit=minute&step=3&start={day}'),
+        ('history.hour.week', f'/api/history?unit=hour&start={week}'),
+        ('history.hour.avg.week', f'/api/history?unit=hour&agg=avg&start={week}'),
+        ('history.day.year', f'/api/history?unit=day&start={year}'),
+        ('history.week.all', f'/api/history?unit=week&start={everything}'),
+        ('history.month.all', f'/api/history?unit=month&start={everything}'),
+        ('history.world.week', f'/api/history?world_id=5&start={week}'),
+        ('history.location.week', f'/api/history?location_id=1&start={week}'),
+        ('history.f2p.week', f'/api/history?is_f2p=1&start={week}'),
+        ('history.location_f2p.week', f'/api/history?location_id=1&is_f2p=0&start={week}'),
+        ('history.raw.week.max_points', f'/api/history?start={week}&max_points=500'),
+        ('history.raw.week.columnar', f'/api/history?start={week}&format=columnar'),
+        ('history.raw.week.binary', f'/api/history?start={week}&format=binary'),
+        ('series.world.day', f'/api/history/series?group_by=world&start={day}'),
+        ('series.location.week', f'/api/history/series?group_by=location&start={week}'),
+        ('series.activity.week', f'/api/history/series?group_by=activity&start={week}'),
+    ]
+
+def time_case(func, repeat, warmup=1):
+    """Returns timing stats in milliseconds for `repeat` calls of func()."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        'min_ms': min(samples),
+        'median_ms': statistics.median(samples),
+        'mean_ms': statistics.fmean(samples),
+        'stdev_ms': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'repeat': repeat,
+    }
+
+def api_cases(db_path):
+    """Yields (name, func) for the API endpoints; responses are not served from the response cache."""
+    import osrs_api
+
+    database.DB_PATH = db_path
+    database.clear_read_pool()
+    client = osrs_api.app.test_client()
+
+    conn = sqlite3.connect(db_path)
+    first_ts, last_ts = conn.execute("SELECT MIN(ts), MAX(ts) FROM players").fetchone()
+    conn.close()
+
+    for name, path in api_paths(last_ts, first_ts):
+        def request(path=path):
+            osrs_api._response_cache.clear()
+            response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        yield f'api.{name}', request
+
+def parser_cases():
+    """Yields (name, func) parsing each saved server list fixture."""
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'slu*.html'))):
+        with open(path, 'rb') as f:
+            content = f.read()
+        name = os.path.splitext(os.path.basename(path))[0]
+        yield f'parse.{name}', lambda content=content: slu_parser.parse_world_data(content)
+
+def insert_cases(db_path, workdir):
+    """
+    Yields (name, func) for rs_tracker.save_scrape on a copy of the database, so the
+    generated data stays untouched. Every call writes the next 5-minute tick.
+    """
+    from rs_tracker import save_scrape, DimensionCache
+
+    copy_path = os.path.join(workdir, 'insert.db')
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(copy_path)
+    source.backup(target)
+    source.close()
+    target.close()
+
+    conn = database.init_db(copy_path)
+    with open(os.path.join(FIXTURES_DIR, 'slu.html'), 'rb') as f:
+        worlds = slu_parser.parse_world_data(f.read())
+    state = {'ts': conn.execute("SELECT MAX(ts) FROM players").fetchone()[0]}
+    # Kept across calls, as the tracker's writer thread keeps it
+    dimensions = DimensionCache()
+
+    def insert(scrape_worlds):
+        state['ts'] += 300
+        save_scrape(conn, state['ts'], 120000, worlds if scrape_worlds else [], scrape_worlds, dimensions)
+
+    yield 'insert.players', lambda: insert(False)
+    yield 'insert.players_and_worlds', lambda: insert(True)
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(FIXTURES_DIR)).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('db', help="Database written by benchmarks.generate_db.")
+    parser.add_argument('--repeat', type=int, default=10, help="Timed runs per case.")
+    parser.add_argument('-k', dest='filter', help="Only run cases whose name contains this text.")
+    parser.add_argument('--output', help="Write results to this JSON file.")
+    parser.add_argument('--compare', help="Previous results JSON to compare medians against.")
+    args = parser.parse_args()
+
+    # Keep the tracker/API from logging every request and insert
+    logging.disable(logging.INFO)
+
+    conn = sqlite3.connect(args.db)
+    db_info = {
+        'path': os.path.abspath(args.db),
+        'bytes': os.path.getsize(args.db),
+        'players': conn.execute("SELECT COUNT(*) FROM players").fetchone()[0],
+        'scrapes': conn.execute("SELECT COUNT(*) FROM scrape_events").fetchone()[0],
+        'world_rows': conn.execute("SELECT COUNT(*) FROM world_data").fetchone()[0],
+        'snapshots': conn.execute("SELECT COUNT(*) FROM world_snapshots").fetchone()[0],
+    }
+    conn.close()
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)['results']
+
+    workdir = tempfile.mkdtemp(prefix='osrs-bench-')
+    results = {}
+    try:
+        cases = [*api_cases(args.db), *parser_cases(), *insert_cases(args.db, workdir)]
+        for name, func in cases:
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = time_case(func, args.repeat)
+            line = f"{name:<36} {results[name]['median_ms']:10.3f} ms median  {results[name]['min_ms']:10.3f} ms min"
+            if name in previous:
+                ratio = results[name]['median_ms'] / previous[name]['median_ms']
+                line += f"  x{ratio:.2f} vs baseline"
+            print(line)
+    finally:
+        database.clear_read_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': iso(int(time.time())),
+                    'revision': git_revision(),
+                    'python': platform.python_version(),
+                    'sqlite': sqlite3.sqlite_version,
+                    'platform': platform.platform(),
+                    'repeat': args.repeat,
+                    'database': db_info,
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,12 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Database
 DB_NAME = "osrs_data.db"
 DB_PATH = os.path.join(BASE_DIR, DB_NAME)
+# World storage format: 'rows' (one world_data row per world per scrape),
+# 'compact' (one world_snapshots row per scrape, see `manage.py compact-world-data`) or
+# 'changes' (world_data rows only for worlds that changed, sampled every SCRAPE_INTERVAL)
+WORLD_STORAGE = 'rows'
+# With 'changes' storage, players a world's count must move before it is stored again (0 stores every change)
+WORLD_CHANGE_THRESHOLD = 5
 
 # URLs
 OSRS_MAIN_URL = "https://oldschool.runescape.com/"
@@ -13,6 +19,90 @@ OSRS_SLU_URL = "https://oldschool.runescape.com/slu"
 
 # Scraper Settings
 SCRAPE_INTERVAL = 300 # 5 minutes
-WORLD_SCRAPE_INTERVAL = 1800  # 30 minutes
+# 30 minutes, or every tick when only changes are stored
+WORLD_SCRAPE_INTERVAL = SCRAPE_INTERVAL if WORLD_STORAGE == 'changes' else 1800
 REQUEST_TIMEOUT = 15
+SCRAPE_RETRIES = 3 # Extra attempts per page after a failed request
+SCRAPE_BACKOFF = 2 # Seconds before the first retry, doubled on each further attempt
+HTTP_POOL_SIZE = 4 # Keep-alive connections kept open per host
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+WRITE_QUEUE_SIZE = 1000 # Scraped samples buffered for the tracker's writer thread before spilling to the journal
+WRITE_BATCH_SIZE = 50 # Samples group-committed per transaction when the writer has a backlog
+WRITE_RETRY_INTERVAL = 30 # Seconds between journal replay attempts while the database cannot be written
+TRACKER_JOURNAL_PATH = os.path.join(BASE_DIR, "tracker_journal.jsonl") # Samples awaiting a writable database
+
+# API Settings
+API_HOST = "127.0.0.1" # Address the API binds to (`python osrs_api.py` and gunicorn.conf.py)
+API_PORT = 5000
+API_DEBUG = False # Flask debug mode and reloader for `python osrs_api.py` (never in production)
+API_WORKERS = 0 # gunicorn worker processes (0 = one per CPU core)
+API_THREADS = 8 # Request threads per gunicorn worker; every open /api/stream connection holds one
+API_CACHE_TTL = 60 # Seconds a cached /api/latest or /api/metadata response lives without a new scrape
+API_CACHE_MAX_AGE = 60 # Cache-Control max-age sent to browsers/CDNs before they revalidate
+API_READ_POOL = True # Reuse pooled read-only, tuned connections instead of opening one per request
+API_READ_POOL_SIZE = 16 # Idle read connections kept open per API process
+API_DB_CACHE_KB = 65536 # SQLite page cache per read connection
+API_DB_MMAP_BYTES = 268435456 # Memory-mapped I/O window per read connection (256 MB)
+API_STATEMENT_CACHE = 256 # Prepared statements kept per read connection
+API_SERIES_CACHE_ENTRIES = 64 # Materialized /api/history/series results kept per API process (0 disables)
+API_SERIES_CACHE_MAX_SCRAPES = 50000 # Scrapes kept per materialized series before the oldest are dropped
+API_SERIES_CACHE_TTL = 3600 # Seconds before a materialized series is rebuilt from scratch
+API_STATS_CACHE_ENTRIES = 128 # Memoized /api/stats results kept per API process (0 disables)
+API_EVENTS_LIMIT = 1000 # Most events one /api/events response returns
+API_PRESET_CACHE_ENTRIES = 64 # Serialized /api/history?preset= responses kept per API process (0 disables)
+# /api/history presets (e.g. '7d') precomputed for global, F2P and members at startup and after each scrape
+API_WARM_PRESETS = ()
+# Also precompute the open /api/history chunk of API_WARM_QUERY's unit, the one every dashboard load requests
+API_WARM_CHUNKS = True
+API_WARM_QUERY = "unit=hour&agg=max&max_points=2000" # Remaining /api/history parameters the dashboard sends by default
+API_WARM_INTERVAL = 5 # Seconds between checks for a new scrape to re-warm the presets
+API_CHUNK_MAX_AGE = 31536000 # Cache-Control max-age of closed, immutable /api/history?chunk= responses (1 year)
+# Part of the chunk version sent with /api/metadata and in chunk URLs; import-pages and compact-history bump
+# the database's own history version, so only bump this after changing history some other way
+HISTORY_CHUNK_VERSION = 1
+API_COMPRESSION = True # gzip (or brotli, if installed and accepted) JSON and binary responses
+API_COMPRESS_MIN_BYTES = 1024 # Smaller responses are sent uncompressed
+API_GZIP_LEVEL = 6
+API_BROTLI_QUALITY = 5
+API_SNAPSHOT_MODE = False # Serve reads from the newest published snapshot in SNAPSHOT_DIR instead of the live database
+API_SNAPSHOT_CHECK_INTERVAL = 5 # Seconds between checks for a newer snapshot in API_SNAPSHOT_MODE
+STREAM_POLL_INTERVAL = 1 # Seconds between checks for new tracker commits to push on /api/stream
+STREAM_HEARTBEAT = 15 # Seconds between keepalive comments on idle /api/stream connections
+STREAM_MAX_SUBSCRIBERS = 1000 # Open /api/stream connections allowed per API process
+STREAM_QUEUE_SIZE = 64 # Frames buffered per subscriber before a slow client is disconnected
+STREAM_RETRY_MS = 10000 # Reconnect delay /api/stream asks browsers to wait after a dropped connection
+
+# Time partitions (see `manage.py partition`)
+PARTITION_DIR = os.path.join(BASE_DIR, "partitions") # Sealed, read-only partition files
+PARTITION_MONTHS = 1 # Months of history per partition file
+
+# Tiered retention (see `manage.py compact-history`)
+RAW_RETENTION_DAYS = 90 # Days of raw samples kept in the live database; older hours are folded into hourly_summaries
+COMPACTION_BATCH_HOURS = 24 # Hours of raw samples folded and deleted per transaction
+COMPACTION_PAUSE = 0.5 # Seconds between batches, so the tracker's writes are never held up for long
+COMPACTION_INTERVAL = 3600 # Seconds between runs of `manage.py compact-history --loop`
+
+# Anomaly detection (see anomaly.py and `manage.py detect-anomalies`)
+ANOMALY_DETECTION = True # Score samples as the tracker stores them and record sharp drops and spikes in anomaly_events
+ANOMALY_DIMENSIONS = ('global', 'world', 'location') # Series scored: the global count, each world and each location total
+ANOMALY_LEVEL_HALFLIFE = 86400 # Seconds for a series' deseasonalized level (EWMA) to move halfway to a new value
+ANOMALY_SCALE_HALFLIFE = 86400 # Seconds for its typical deviation (EWMA of absolute residuals) to do the same
+ANOMALY_SEASON_ALPHA = 0.1 # Weight of each sample in its hour-of-week seasonal factor
+ANOMALY_WARMUP_DAYS = 7 # Days a series is learned before it can raise events (one week of seasonal factors)
+ANOMALY_Z_THRESHOLD = 5.0 # Robust z-score that opens an event
+ANOMALY_Z_CLEAR = 2.5 # An open event closes at the first sample scoring below this (or of the opposite sign)
+ANOMALY_MIN_DELTA = 50 # Players a sample must also be off from its baseline, so small worlds do not flap
+ANOMALY_CHECKPOINT_INTERVAL = 3600 # Seconds of samples between saves of the detector state to anomaly_state
+
+# Read snapshots (see `manage.py snapshot`)
+SNAPSHOT_DIR = os.path.join(BASE_DIR, "snapshots")
+SNAPSHOT_INTERVAL = 300 # Seconds between snapshots when `manage.py snapshot --loop` runs
+SNAPSHOT_KEEP = 3 # Published snapshots kept; older ones are deleted
+
+# Instrumentation
+METRICS_ENABLED = False # Record request, SQL and scrape timings; served at /metrics (API) and TRACKER_METRICS_PORT
+TRACKER_METRICS_PORT = 9105 # Port of the tracker's Prometheus /metrics endpoint when METRICS_ENABLED
+SLOW_QUERY_MS = 250 # With METRICS_ENABLED, SQL statements slower than this are logged with their EXPLAIN QUERY PLAN
+PROFILING_ENABLED = False # Allow profiling API requests (see PROFILE_HEADER and PROFILE_SAMPLE_RATE)
+PROFILE_HEADER = 'X-Profile' # A request carrying this header gets its profile report back instead of the data
+PROFILE_SAMPLE_RATE = 0.0 # Fraction of API requests profiled in the background, with the report logged
@@ -1,36 +1,525 @@
+import calendar
+import itertools
+import os
 import sqlite3
 import logging
-from config import DB_PATH
+import queue
+import threading
+import time
+import zlib
+from array import array
+from config import (
+    DB_PATH, API_DB_CACHE_KB, API_DB_MMAP_BYTES, API_STATEMENT_CACHE, API_READ_POOL_SIZE, METRICS_ENABLED, SLOW_QUERY_MS,
+    WORLD_STORAGE, WORLD_CHANGE_THRESHOLD, SNAPSHOT_DIR, SNAPSHOT_KEEP, API_SNAPSHOT_MODE, API_SNAPSHOT_CHECK_INTERVAL,
+    DB_NAME, PARTITION_DIR, PARTITION_MONTHS, RAW_RETENTION_DAYS, COMPACTION_BATCH_HOURS, COMPACTION_PAUSE
+)
+import metrics
 
 logger = logging.getLogger(__name__)
 
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement from execute() until its last row is fetched
+    (or the cursor is reused, closed or dropped), counts the rows returned and the
+    VM steps it took, and logs slow statements with their EXPLAIN QUERY PLAN.
+    """
+    _sql = None
+
+    def _start(self, sql, parameters):
+        self._finish()
+        self._sql = sql
+        self._params = parameters
+        self._rows = 0
+        self._elapsed = 0.0
+        self._steps_before = self.connection.vm_steps
+
+    def _finish(self):
+        sql, self._sql = self._sql, None
+        if sql is None:
+            return
+        scope = metrics.get_scope()
+        statement = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+        metrics.SQL_SECONDS.observe(self._elapsed, scope=scope, statement=statement)
+        metrics.SQL_ROWS.inc(self._rows, scope=scope)
+        metrics.SQL_VM_STEPS.inc(self.connection.vm_steps - self._steps_before, scope=scope)
+        if self._elapsed * 1000 >= SLOW_QUERY_MS:
+            metrics.SQL_SLOW.inc(scope=scope)
+            plan = ''
+            if statement in ('SELECT', 'WITH'):
+                try:
+                    rows = self.connection.cursor(sqlite3.Cursor).execute(f"EXPLAIN QUERY PLAN {sql}", self._params)
+                    plan = ''.join(f"\n    {row[3]}" for row in rows)
+                except sqlite3.Error as e:
+                    plan = f" (no plan: {e})"
+            logger.warning(f"Slow query in {scope} ({self._elapsed * 1000:.1f} ms, {self._rows} rows): "
+                           f"{' '.join(sql.split())} {tuple(self._params)}{plan}")
+
+    def _timed(self, method, *args):
+        t0 = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - t0
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql, ())
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        self._rows += 1
+        return row
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, size if size is not None else self.arraysize)
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors are InstrumentedCursors; counts VM steps through a progress handler."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.vm_steps = 0
+        self.set_progress_handler(self._count_steps, 1000)
+
+    def _count_steps(self):
+        self.vm_steps += 1000
+        return 0
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def connect(database, **kwargs):
+    """sqlite3.connect, returning an InstrumentedConnection when METRICS_ENABLED."""
+    if METRICS_ENABLED:
+        kwargs['factory'] = InstrumentedConnection
+    return sqlite3.connect(database, **kwargs)
+
+# Schema revision stored in PRAGMA user_version (2 = integer epoch `ts` columns)
+SCHEMA_VERSION = 2
+
+# SQL expression rendering an epoch-seconds column as the ISO 8601 text the API returns
+ISO_SQL = "strftime('%Y-%m-%dT%H:%M:%SZ', {ts}, 'unixepoch')"
+
+# Rollup granularities for the global player count, mapped to the SQL expression
+# that floors an epoch timestamp (the bound parameter or column) to its bucket start.
+# Weeks start on Monday; epoch day 0 was a Thursday, hence the +3/-3 shift.
+ROLLUP_BUCKETS = {
+    '5min': "{ts} / 300 * 300",
+    'hour': "{ts} / 3600 * 3600",
+    'day': "{ts} / 86400 * 86400",
+    'week': "(({ts} / 86400 + 3) / 7 * 7 - 3) * 86400",
+    'month': "CAST(strftime('%s', {ts}, 'unixepoch', 'start of month') AS INTEGER)",
+}
+
 def get_db_connection():
     """Establishes a connection to the SQLite database."""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        # URI filenames let route_partitions attach sealed partitions read-only
+        conn = connect(DB_PATH, uri=True)
         conn.row_factory = sqlite3.Row
         return conn
     except sqlite3.Error as e:
         logger.error(f"Database connection error: {e}")
         raise
 
-def init_db():
+# Idle read-only connections shared by the API's worker threads (most recently used first)
+_read_pool = queue.LifoQueue(maxsize=API_READ_POOL_SIZE)
+
+def open_read_connection():
+    """
+    Opens a read-only connection tuned for the API's read path (page cache, mmap,
+    in-memory temp tables, query_only) that keeps up to API_STATEMENT_CACHE
+    prepared statements. It may be handed between threads, one at a time.
+    In API_SNAPSHOT_MODE it opens the newest snapshot as an immutable file, so
+    reads take no locks and never contend with the tracker.
+    """
+    path = read_database_path()
+    try:
+        conn = connect(
+            f"file:{path}?mode=ro" + ("&immutable=1" if path != DB_PATH else ""),
+            uri=True,
+            cached_statements=API_STATEMENT_CACHE,
+            check_same_thread=False
+        )
+    except sqlite3.Error as e:
+        logger.error(f"Database connection error: {e}")
+        raise
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA cache_size = -{API_DB_CACHE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {API_DB_MMAP_BYTES}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA query_only = 1")
+    return conn
+
+def acquire_read_connection():
+    """Takes an idle pooled read-only connection, or opens a new one if none is idle."""
+    if API_SNAPSHOT_MODE:
+        # Picks up a newly published snapshot (and drops idle connections to the old one)
+        read_database_path()
+    try:
+        return _read_pool.get_nowait()
+    except queue.Empty:
+        return open_read_connection()
+
+def release_read_connection(conn, discard=False):
+    """Returns a connection to the pool (closing it if the pool is full or it is discarded)."""
+    if conn.in_transaction:
+        conn.rollback()
+    if API_SNAPSHOT_MODE and not discard:
+        # A connection to a snapshot that has since been replaced is not pooled again
+        discard = os.path.basename(connection_path(conn)) != os.path.basename(read_database_path())
+    if not discard:
+        try:
+            _read_pool.put_nowait(conn)
+            return
+        except queue.Full:
+            pass
+    conn.close()
+
+def clear_read_pool():
+    """Closes every idle pooled connection, e.g. after the database file was replaced."""
+    while True:
+        try:
+            _read_pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+def connection_path(conn):
+    """The file a connection has open as its main database."""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == 'main':
+            return path
+    return None
+
+SNAPSHOT_POINTER = 'latest'
+
+# Newest published snapshot the API reads from in API_SNAPSHOT_MODE, and when the pointer was last read
+_snapshot = {"path": None, "checked": 0.0, "warned": False}
+_snapshot_lock = threading.Lock()
+
+def latest_snapshot(directory=SNAPSHOT_DIR):
+    """Path of the snapshot the `latest` pointer file in `directory` names, or None."""
+    try:
+        with open(os.path.join(directory, SNAPSHOT_POINTER), encoding='utf-8') as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(directory, name)
+    return path if name and os.path.exists(path) else None
+
+def read_database_path():
+    """
+    The file API read connections open: DB_PATH, or in API_SNAPSHOT_MODE the newest
+    published snapshot. The pointer is re-read at most every API_SNAPSHOT_CHECK_INTERVAL
+    seconds; when it moves, idle pooled connections to the old snapshot are closed.
+    """
+    if not API_SNAPSHOT_MODE:
+        return DB_PATH
+    now = time.monotonic()
+    with _snapshot_lock:
+        current = _snapshot['path']
+        if current is not None and now - _snapshot['checked'] < API_SNAPSHOT_CHECK_INTERVAL:
+            return current
+        _snapshot['checked'] = now
+        latest = latest_snapshot()
+        if latest is None:
+            if current is None and not _snapshot['warned']:
+                _snapshot['warned'] = True
+                logger.warning(f"No snapshot published in {SNAPSHOT_DIR} yet, reading {DB_PATH}")
+            return current or DB_PATH
+        _snapshot['path'] = latest
+    if latest != current:
+        logger.info(f"Serving reads from snapshot {latest}")
+        clear_read_pool()
+    return latest
+
+def create_snapshot(conn, directory=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
     """
-    Creates the database and sets it to 'Write-Ahead Logging' (WAL) mode.
+    Writes a consistent, defragmented copy of the database with VACUUM INTO (it reads
+    one transaction, so the tracker keeps writing meanwhile), then publishes it by
+    atomically replacing the `latest` pointer file and deletes all but the newest
+    `keep` snapshots. Published snapshots are never modified. Returns the new path.
     """
-    conn = sqlite3.connect(DB_PATH)
+    os.makedirs(directory, exist_ok=True)
+    name = f"snapshot-{int(time.time() * 1000)}.db"
+    path = os.path.join(directory, name)
+    conn.execute("VACUUM INTO ?", (path + '.tmp',))
+    os.replace(path + '.tmp', path)
+
+    pointer = os.path.join(directory, SNAPSHOT_POINTER)
+    with open(pointer + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer + '.tmp', pointer)
+
+    snapshots = sorted(f for f in os.listdir(directory) if f.startswith('snapshot-') and f.endswith('.db'))
+    for old in snapshots[:-keep] if keep > 0 else []:
+        if old == name:
+            continue
+        try:
+            os.remove(os.path.join(directory, old))
+        except OSError as e:
+            # Still open by a reader on a platform that does not allow deleting open files
+            logger.warning(f"Could not delete old snapshot {old}: {e}")
+    return path
+
+# Tables whose rows move into sealed time partitions; everything else (dimensions,
+# world_details, world_detail_changes, players_rollup) stays in the live database
+PARTITIONED_TABLES = ('players', 'scrape_events', 'world_data', 'world_snapshots', 'scrape_summaries')
+
+def partition_path(name, directory=None):
+    """File of the sealed partition `name` in `directory` (default PARTITION_DIR), e.g. partitions/osrs_data-2024-01.db."""
+    return os.path.join(directory or PARTITION_DIR, f"{os.path.splitext(DB_NAME)[0]}-{name}.db")
+
+def sealed_partitions(conn):
+    """[(name, start_ts, end_ts)] of the sealed partitions in time order."""
+    try:
+        return conn.execute("SELECT name, start_ts, end_ts FROM main.partitions ORDER BY start_ts").fetchall()
+    except sqlite3.OperationalError:
+        # Database created before partitioning; nothing is sealed
+        return []
+
+def overlapping_partitions(partitions, start=None, end=None, limited=False):
+    """
+    The partitions holding rows in [start, end] (epoch seconds, inclusive; None is
+    open-ended). A `limited` read without a start ("the last N rows") only needs the
+    newest partition up to `end`.
+    """
+    if start is None and limited:
+        return [p for p in partitions if end is None or p[1] <= end][-1:]
+    return [p for p in partitions if (start is None or p[2] > start) and (end is None or p[1] <= end)]
+
+def partition_spans(conn, start=None, end=None, limited=False):
+    """
+    Splits [start, end] (epoch seconds, inclusive) at the boundaries of the sealed
+    partitions it overlaps, oldest first, so it can be read one partition at a time
+    with route_partitions. A range within the live database is a single span.
+    """
+    partitions = overlapping_partitions(sealed_partitions(conn), start, end, limited)
+    if len(partitions) <= 1:
+        return [(start, end)]
+    return [
+        (start if i == 0 else p_start, end if i == len(partitions) - 1 else p_end - 1)
+        for i, (_, p_start, p_end) in enumerate(partitions)
+    ]
+
+def route_partitions(conn, start=None, end=None, limited=False):
+    """
+    Makes the partitioned tables on `conn` cover [start, end] (epoch seconds): attaches
+    the sealed partitions the range overlaps (read-only, immutable) and shadows each
+    table with a TEMP VIEW of the same name that UNIONs theirs with the live table (when
+    it holds rows in the range, e.g. samples replayed late), so queries run unchanged.
+    A range within the live database detaches everything and queries hit the live
+    tables directly. Nothing changes when the views already read the right schemas.
+    SQLite plans a join of two such views as every pairing of their branches, so
+    callers route one partition at a time (see partition_spans). `limited` is as for
+    overlapping_partitions.
+    """
+    wanted = {f"part_{name.replace('-', '_')}": name for name, _, _ in
+              overlapping_partitions(sealed_partitions(conn), start, end, limited)}
+    schemas = sorted(wanted)
+    if wanted and (start is None or conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM main.scrape_events WHERE ts BETWEEN ?1 AND ?2) "
+            "OR EXISTS (SELECT 1 FROM main.players WHERE ts BETWEEN ?1 AND ?2)",
+            (start, end if end is not None else 2 ** 62)).fetchone()[0]):
+        schemas.insert(0, 'main')
+    unions = {table: " UNION ALL ".join(f"SELECT * FROM {schema}.{table}" for schema in schemas)
+              for table in PARTITIONED_TABLES}
+    current = conn.execute("SELECT sql FROM sqlite_temp_master WHERE type = 'view' AND name = 'players'").fetchone()
+    # Views over the wanted partitions (and main) stay; without any wanted, no views may be left
+    if (current is not None and current[0].endswith(unions['players'])) if wanted else current is None:
+        return
+
+    attached = {row[1] for row in conn.execute("PRAGMA database_list") if row[1].startswith('part_')}
+    # Temp views count as writes for query_only read connections
+    query_only = conn.execute("PRAGMA query_only").fetchone()[0]
+    conn.execute("PRAGMA query_only = 0")
+    try:
+        for table in PARTITIONED_TABLES:
+            conn.execute(f"DROP VIEW IF EXISTS temp.{table}")
+        for schema in attached - wanted.keys():
+            conn.execute(f"DETACH DATABASE {schema}")
+        for schema in sorted(wanted.keys() - attached):
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (f"file:{partition_path(wanted[schema])}?mode=ro&immutable=1",))
+        if wanted:
+            for table in PARTITIONED_TABLES:
+                conn.execute(f"CREATE TEMP VIEW {table} AS {unions[table]}")
+    finally:
+        conn.execute(f"PRAGMA query_only = {query_only}")
+
+def partition_period(ts, months=PARTITION_MONTHS):
+    """(name, start_ts, end_ts) of the partition period of `months` months holding epoch second `ts`."""
+    t = time.gmtime(ts)
+    first = (t.tm_year * 12 + t.tm_mon - 1) // months * months
+    bounds = [
+        int(calendar.timegm((m // 12, m % 12 + 1, 1, 0, 0, 0)))
+        for m in (first, first + months)
+    ]
+    return f"{first // 12:04d}-{first % 12 + 1:02d}", bounds[0], bounds[1]
+
+def seal_partitions(conn, directory=PARTITION_DIR, months=PARTITION_MONTHS, now=None):
+    """
+    Moves every closed period of `months` months out of the live database into its own
+    sealed file: the period's players, scrape_events and the world_data,
+    world_snapshots and scrape_summaries of its scrapes are copied with the live
+    schema and indexes and vacuumed, the file is made read-only, and then
+    one transaction records it in `partitions` and deletes the rows from the live
+    database. A period is only sealed once newer samples and scrapes exist, so the
+    live database always holds the latest rows. Safe to run while the tracker writes.
+    Returns the names of the sealed partitions.
+    """
+    os.makedirs(directory, exist_ok=True)
+    current_start = partition_period(int(now if now is not None else time.time()), months)[1]
+    live_path = connection_path(conn)
+    ddl = conn.execute(f'''
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name IN ({",".join("?" * len(PARTITIONED_TABLES))}) AND sql IS NOT NULL
+        ORDER BY type = 'index'
+    ''', PARTITIONED_TABLES).fetchall()
+
+    sealed = []
+    while True:
+        # Rows written late into an already sealed period (journal replay) stay live
+        floor = conn.execute("SELECT COALESCE(MAX(end_ts), 0) FROM partitions").fetchone()[0]
+        oldest = conn.execute(
+            "SELECT MIN(ts) FROM (SELECT MIN(ts) AS ts FROM scrape_events WHERE ts >= ? "
+            "UNION ALL SELECT MIN(ts) FROM players WHERE ts >= ?)",
+            (floor, floor)
+        ).fetchone()[0]
+        if oldest is None:
+            break
+        name, start, end = partition_period(oldest, months)
+        newer = conn.execute(
+            "SELECT (SELECT id FROM scrape_events WHERE ts >= ? ORDER BY ts LIMIT 1), "
+            "(SELECT 1 FROM players WHERE ts >= ? LIMIT 1)",
+            (end, end)
+        ).fetchone()
+        if end > current_start or newer[0] is None or newer[1] is None:
+            break
+
+        path = partition_path(name, directory)
+        for stale in (path + '.tmp', path):
+            if os.path.exists(stale):
+                # Left over from an interrupted run (never recorded in `partitions`)
+                os.chmod(stale, 0o644)
+                os.remove(stale)
+
+        part = connect(path + '.tmp')
+        try:
+            for (sql,) in ddl:
+                part.execute(sql)
+            part.execute("ATTACH DATABASE ? AS live", (live_path,))
+            with part:
+                part.execute("INSERT INTO players SELECT * FROM live.players WHERE ts >= ? AND ts < ?", (start, end))
+                part.execute("INSERT INTO scrape_events SELECT * FROM live.scrape_events WHERE ts >= ? AND ts < ?",
+                             (start, end))
+                for table in ('world_data', 'world_snapshots', 'scrape_summaries'):
+                    part.execute(f"INSERT INTO {table} SELECT * FROM live.{table} "
+                                 f"WHERE scrape_id IN (SELECT id FROM main.scrape_events)")
+            part.execute("DETACH DATABASE live")
+            # No ANALYZE: without sqlite_stat1 the planner picks the same plans it does on the
+            # (unanalyzed) live database; the stats made it skip-scan scrape_summaries instead
+            part.execute("VACUUM")
+        finally:
+            part.close()
+        os.chmod(path + '.tmp', 0o444)
+        os.replace(path + '.tmp', path)
+
+        conn.execute("ATTACH DATABASE ? AS sealed", (path,))
+        try:
+            with conn:
+                if WORLD_STORAGE == 'changes':
+                    # Checkpoint every world at the first later scrape, so reads starting
+                    # after this period never need an older partition to forward-fill from
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO world_data (scrape_id, world_number, player_count, detail_id) "
+                        "VALUES (?, ?, ?, ?)",
+                        [(newer[0], w, count, detail_id)
+                         for w, (count, detail_id) in latest_world_rows(conn, newer[0]).items()]
+                    )
+                conn.execute("INSERT INTO partitions (name, start_ts, end_ts) VALUES (?, ?, ?)", (name, start, end))
+                for table in ('world_data', 'world_snapshots', 'scrape_summaries'):
+                    conn.execute(f"DELETE FROM main.{table} WHERE scrape_id IN (SELECT id FROM sealed.scrape_events)")
+                conn.execute("DELETE FROM main.scrape_events WHERE id IN (SELECT id FROM sealed.scrape_events)")
+                conn.execute("DELETE FROM main.players WHERE id IN (SELECT id FROM sealed.players)")
+        finally:
+            conn.execute("DETACH DATABASE sealed")
+        logger.info(f"Sealed partition {name} into {path}")
+        sealed.append(name)
+    return sealed
+
+PLAYERS_DDL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts INTEGER NOT NULL,
+        count INTEGER
+    )
+'''
+
+SCRAPE_EVENTS_DDL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts INTEGER NOT NULL UNIQUE
+    )
+'''
+
+def init_db(db_path=None):
+    """
+    Creates the database (DB_PATH unless `db_path` is given) and sets it to 'Write-Ahead Logging' (WAL) mode.
+    """
+    conn = connect(db_path or DB_PATH)
+
+    # New databases return pages freed by compact_history to the OS (no effect on existing ones)
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
 
     # Enable WAL mode (Crucial for concurrent access)
     conn.execute("PRAGMA journal_mode=WAL;")
 
-    # Create the table if it doesn't exist
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS players (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME,
-            count INTEGER
-        )
-    ''')
+    # Create the table if it doesn't exist (ts is UTC epoch seconds)
+    conn.execute(PLAYERS_DDL.format(name='players'))
 
     # Create table for locations
     conn.execute('''
@@ -62,12 +551,7 @@ def init_db():
     ''')
 
     # Create table for scrape events (timestamps)
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS scrape_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME UNIQUE
-        )
-    ''')
+    conn.execute(SCRAPE_EVENTS_DDL.format(name='scrape_events'))
 
     # Create table for time-series player counts
     conn.execute('''
@@ -82,10 +566,715 @@ def init_db():
         ) WITHOUT ROWID
     ''')
 
-    # Create indexes
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON players(timestamp);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_scrape_timestamp ON scrape_events(timestamp);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_world_number ON world_data(world_number);")
+    # Databases from before the epoch schema are converted in place
+    if is_legacy_schema(conn):
+        logger.info("Migrating ISO text timestamps to integer epoch columns...")
+        migrate_to_epoch(conn)
+
+    # Create covering indexes and ISO text compatibility views
+    create_epoch_indexes(conn)
+
+    # Create table for pre-aggregated global counts (one row per unit and bucket)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS players_rollup (
+            unit TEXT,
+            bucket INTEGER,
+            max_count INTEGER,
+            min_count INTEGER,
+            sum_count INTEGER,
+            samples INTEGER,
+            PRIMARY KEY (unit, bucket)
+        ) WITHOUT ROWID
+    ''')
+
+    # Compact world storage: one row per scrape with packed, compressed world numbers and counts
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS world_snapshots (
+            scrape_id INTEGER PRIMARY KEY,
+            worlds BLOB,
+            counts BLOB,
+            FOREIGN KEY(scrape_id) REFERENCES scrape_events(id)
+        )
+    ''')
+
+    # Compact world storage: a world's detail_id applies from scrape_id until its next change
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS world_detail_changes (
+            world_number INTEGER,
+            scrape_id INTEGER,
+            detail_id INTEGER,
+            PRIMARY KEY (world_number, scrape_id),
+            FOREIGN KEY(detail_id) REFERENCES world_details(id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Per-scrape world totals: dimension is 'total' (key 0), 'f2p' (key 1/0), 'location' or 'activity' (key = id)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_summaries (
+            scrape_id INTEGER,
+            dimension TEXT,
+            key INTEGER,
+            player_count INTEGER,
+            PRIMARY KEY (dimension, key, scrape_id),
+            FOREIGN KEY(scrape_id) REFERENCES scrape_events(id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Sealed time partitions: rows with ts in [start_ts, end_ts) live in partition_path(name)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS partitions (
+            name TEXT PRIMARY KEY,
+            start_ts INTEGER NOT NULL,
+            end_ts INTEGER NOT NULL
+        )
+    ''')
+
+    # Tiered retention: raw samples older than RAW_RETENTION_DAYS folded per hour and series.
+    # dimension is 'global' (players, key 0), 'world' (key = world number, detail_id = its
+    # details at the last sample of the hour) or a scrape_summaries dimension
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS hourly_summaries (
+            dimension TEXT,
+            key INTEGER,
+            bucket INTEGER,
+            min_count INTEGER,
+            min_ts INTEGER,
+            max_count INTEGER,
+            max_ts INTEGER,
+            sum_count INTEGER,
+            samples INTEGER,
+            detail_id INTEGER,
+            PRIMARY KEY (dimension, key, bucket)
+        ) WITHOUT ROWID
+    ''')
+    # Grouped series read every key of a dimension over a range of hours
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hourly_summaries_bucket ON hourly_summaries(dimension, bucket);")
+
+    # The hours [from_ts, until_ts) compact_history has folded into hourly_summaries (one row)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS compaction (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            from_ts INTEGER NOT NULL,
+            until_ts INTEGER NOT NULL
+        )
+    ''')
+
+    # Times stored history was rewritten in place (import-pages, compact-history), so closed
+    # /api/history chunks cached by the API and its clients are rebuilt (one row)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS history_version (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            version INTEGER NOT NULL
+        )
+    ''')
+
+    # Streaming anomaly detection (see anomaly.py): each series' baseline as of its last
+    # checkpoint; dimension is 'global' (key 0), 'world' (key = world number, tag = its
+    # detail_id) or 'location' (key = location id), seasonal packs 168 float32 factors
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS anomaly_state (
+            dimension TEXT,
+            key INTEGER,
+            tag INTEGER,
+            first_ts INTEGER,
+            last_ts INTEGER,
+            level REAL,
+            scale REAL,
+            seasonal BLOB,
+            PRIMARY KEY (dimension, key)
+        ) WITHOUT ROWID
+    ''')
+
+    # Detected anomalies: end_ts is the first sample back to normal (NULL while open), and
+    # expected/observed/z are those of the sample furthest from the baseline
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS anomaly_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dimension TEXT NOT NULL,
+            key INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            start_ts INTEGER NOT NULL,
+            last_ts INTEGER NOT NULL,
+            end_ts INTEGER,
+            expected INTEGER,
+            observed INTEGER,
+            z REAL,
+            samples INTEGER
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_anomaly_events_start ON anomaly_events(start_ts);")
 
     conn.commit()
+
+    # Existing databases get their rollups built once on first start
+    has_rollups = conn.execute("SELECT 1 FROM players_rollup LIMIT 1").fetchone()
+    has_players = conn.execute("SELECT 1 FROM players LIMIT 1").fetchone()
+    if has_players and not has_rollups:
+        logger.info("Rollup tables are empty, backfilling from players...")
+        backfill_rollups(conn)
+
+    # ...and the same for per-scrape summaries
+    has_summaries = conn.execute("SELECT 1 FROM scrape_summaries LIMIT 1").fetchone()
+    has_scrapes = conn.execute("SELECT 1 FROM scrape_events LIMIT 1").fetchone()
+    if has_scrapes and not has_summaries:
+        logger.info("Scrape summaries are empty, backfilling from world data...")
+        backfill_summaries(conn)
+
     return conn
+
+def create_epoch_indexes(conn):
+    """Creates the covering indexes and ISO text views of the epoch schema."""
+    # Range scans over (ts, count) and per-world history never touch the table itself
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_players_ts_count ON players(ts, count);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_world_data_covering ON world_data(world_number, scrape_id, player_count);")
+    conn.execute("DROP INDEX IF EXISTS idx_world_number;")
+
+    # Compatibility views exposing the old ISO text `timestamp` column
+    conn.execute(f"CREATE VIEW IF NOT EXISTS players_iso AS SELECT id, {ISO_SQL.format(ts='ts')} AS timestamp, count FROM players")
+    conn.execute(f"CREATE VIEW IF NOT EXISTS scrape_events_iso AS SELECT id, {ISO_SQL.format(ts='ts')} AS timestamp FROM scrape_events")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+
+def is_legacy_schema(conn):
+    """True if players/scrape_events still store ISO text `timestamp` columns."""
+    for table in ('players', 'scrape_events'):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if 'timestamp' in columns:
+            return True
+    return False
+
+def migrate_to_epoch(conn, batch_size=50000, pause=0.0):
+    """
+    Converts legacy players/scrape_events tables (ISO text `timestamp`) to integer `ts`.
+    Rows are copied into new tables in short batches, so a running tracker on the old
+    schema keeps writing in between; a final short write transaction copies the tail
+    and swaps the tables. Ids are preserved, so world_data and summaries stay valid.
+    """
+    for table, ddl, columns in (('players', PLAYERS_DDL, 'count'), ('scrape_events', SCRAPE_EVENTS_DDL, None)):
+        table_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if 'timestamp' not in table_columns:
+            continue
+        new_table = f"{table}_epoch"
+        conn.execute(ddl.format(name=new_table))
+        conn.commit()
+
+        extra = f", {columns}" if columns else ""
+        copy_sql = f'''
+            INSERT INTO {new_table} (id, ts{extra})
+            SELECT id, CAST(strftime('%s', timestamp) AS INTEGER){extra} FROM {table}
+            WHERE id > (SELECT COALESCE(MAX(id), 0) FROM {new_table}) AND timestamp IS NOT NULL
+            ORDER BY id LIMIT ?
+        '''
+        copied = 0
+        while True:
+            with conn:
+                rows = conn.execute(copy_sql, (batch_size,)).rowcount
+            copied += max(rows, 0)
+            logger.info(f"Copied {copied:,} {table} rows to epoch timestamps...")
+            # A short batch means we have caught up with the writer
+            if rows < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+        # Copy whatever arrived meanwhile and swap, holding the write lock only briefly
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            while conn.execute(copy_sql, (batch_size,)).rowcount > 0:
+                pass
+            conn.execute(f"DROP VIEW IF EXISTS {table}_iso")
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Swapped {table} to the epoch schema.")
+
+    create_epoch_indexes(conn)
+
+def update_rollups(conn, ts, count):
+    """Folds a single global sample (epoch seconds `ts`) into every rollup bucket it belongs to."""
+    for unit, expr in ROLLUP_BUCKETS.items():
+        conn.execute(f'''
+            INSERT INTO players_rollup (unit, bucket, max_count, min_count, sum_count, samples)
+            VALUES (?, {expr.format(ts='?')}, ?, ?, ?, 1)
+            ON CONFLICT(unit, bucket) DO UPDATE SET
+                max_count = MAX(max_count, excluded.max_count),
+                min_count = MIN(min_count, excluded.min_count),
+                sum_count = sum_count + excluded.sum_count,
+                samples = samples + 1
+        ''', (unit, ts, count, count, count))
+
+def backfill_rollups(conn):
+    """
+    Rebuilds all rollup buckets from the raw players table, every sealed partition and
+    the hours compact_history folded into hourly_summaries (hour and longer units; their
+    5-minute buckets went with the raw samples). Partitions are attached and merged in
+    one at a time (buckets such as weeks can span two of them), each in its own transaction.
+    """
+    def merge(schema):
+        for unit, expr in ROLLUP_BUCKETS.items():
+            bucket = expr.format(ts='ts')
+            conn.execute(f'''
+                INSERT INTO players_rollup (unit, bucket, max_count, min_count, sum_count, samples)
+                SELECT ?, {bucket}, MAX(count), MIN(count), SUM(count), COUNT(*)
+                FROM {schema}.players
+                WHERE count IS NOT NULL
+                GROUP BY {bucket}
+                ON CONFLICT(unit, bucket) DO UPDATE SET
+                    max_count = MAX(max_count, excluded.max_count),
+                    min_count = MIN(min_count, excluded.min_count),
+                    sum_count = sum_count + excluded.sum_count,
+                    samples = samples + excluded.samples
+            ''', (unit,))
+
+    with conn:
+        conn.execute("DELETE FROM players_rollup")
+        merge('main')
+        for unit, expr in ROLLUP_BUCKETS.items():
+            if unit == '5min':
+                continue
+            bucket = expr.format(ts='bucket')
+            conn.execute(f'''
+                INSERT INTO players_rollup (unit, bucket, max_count, min_count, sum_count, samples)
+                SELECT ?, {bucket}, MAX(max_count), MIN(min_count), SUM(sum_count), SUM(samples)
+                FROM hourly_summaries
+                WHERE dimension = 'global'
+                GROUP BY {bucket}
+                ON CONFLICT(unit, bucket) DO UPDATE SET
+                    max_count = MAX(max_count, excluded.max_count),
+                    min_count = MIN(min_count, excluded.min_count),
+                    sum_count = sum_count + excluded.sum_count,
+                    samples = samples + excluded.samples
+            ''', (unit,))
+    for name, _, _ in sealed_partitions(conn):
+        conn.execute("ATTACH DATABASE ? AS sealed", (partition_path(name),))
+        try:
+            with conn:
+                merge('sealed')
+        finally:
+            conn.execute("DETACH DATABASE sealed")
+    return conn.execute("SELECT COUNT(*) FROM players_rollup").fetchone()[0]
+
+
+def summarize_worlds(rows):
+    """
+    Sums (player_count, location_id, is_f2p, activity_id) rows into
+    {(dimension, key): player_count} for the scrape_summaries table.
+    """
+    sums = {}
+    for player_count, location_id, is_f2p, activity_id in rows:
+        for dim_key in (('total', 0), ('f2p', int(bool(is_f2p))), ('location', location_id), ('activity', activity_id)):
+            sums[dim_key] = sums.get(dim_key, 0) + player_count
+    return sums
+
+def write_scrape_summary(conn, scrape_id, rows):
+    """Stores the per-dimension totals of one scrape (see summarize_worlds) and returns them."""
+    sums = summarize_worlds(rows)
+    conn.executemany(
+        "INSERT OR REPLACE INTO scrape_summaries (scrape_id, dimension, key, player_count) VALUES (?, ?, ?, ?)",
+        [(scrape_id, dim, key, total) for (dim, key), total in sums.items()]
+    )
+    return sums
+
+def backfill_summaries(conn):
+    """Rebuilds scrape_summaries from world_data rows and compact world_snapshots."""
+    with conn:
+        conn.execute("DELETE FROM scrape_summaries")
+        # Change-only world_data rows are not whole scrapes; they are summed after forward-filling below
+        if WORLD_STORAGE != 'changes':
+            for dim, key_col in (('total', None), ('f2p', 'det.is_f2p'), ('location', 'det.location_id'),
+                                 ('activity', 'det.activity_id')):
+                group_by = f"wd.scrape_id, {key_col}" if key_col else "wd.scrape_id"
+                conn.execute(f'''
+                    INSERT INTO scrape_summaries (scrape_id, dimension, key, player_count)
+                    SELECT wd.scrape_id, ?, {key_col or 0}, SUM(wd.player_count)
+                    FROM world_data wd JOIN world_details det ON wd.detail_id = det.id
+                    GROUP BY {group_by}
+                ''', (dim,))
+
+        details = {row[0]: row[1:] for row in conn.execute(
+            "SELECT id, location_id, is_f2p, activity_id FROM world_details"
+        )}
+        snapshots = replay_world_changes(conn) if WORLD_STORAGE == 'changes' else read_world_snapshots(conn)
+        for scrape_id, _, _, counts, detail_ids in snapshots:
+            rows = [(count,) + details.get(detail_id, (None, None, None)) for count, detail_id in zip(counts, detail_ids)]
+            write_scrape_summary(conn, scrape_id, rows)
+    return conn.execute("SELECT COUNT(DISTINCT scrape_id) FROM scrape_summaries").fetchone()[0]
+
+def pack_uint16(values, delta=False):
+    """Packs integers into a zlib-compressed array('H'), optionally delta-encoded."""
+    values = array('H', values)
+    if delta and values:
+        values = array('H', [values[0]] + [b - a for a, b in zip(values, values[1:])])
+    return zlib.compress(values.tobytes())
+
+def unpack_uint16(blob, delta=False):
+    """Inverse of pack_uint16."""
+    values = array('H')
+    values.frombytes(zlib.decompress(blob))
+    if delta:
+        total = 0
+        for i, v in enumerate(values):
+            total += v
+            values[i] = total
+    return values
+
+def current_world_details(conn, before_scrape_id=None):
+    """Returns {world_number: detail_id} as of the latest change (optionally before a scrape)."""
+    query = "SELECT world_number, detail_id, MAX(scrape_id) FROM world_detail_changes"
+    params = []
+    if before_scrape_id is not None:
+        query += " WHERE scrape_id < ?"
+        params.append(before_scrape_id)
+    query += " GROUP BY world_number"
+    return {row[0]: row[1] for row in conn.execute(query, params)}
+
+def write_world_snapshot(conn, scrape_id, rows, details=None):
+    """
+    Stores one scrape's worlds in compact form.
+    `rows` are (world_number, player_count, detail_id) tuples; `details` is the
+    {world_number: detail_id} state before this scrape and is updated in place.
+    Only worlds whose detail_id changed get a world_detail_changes row.
+    """
+    if details is None:
+        details = current_world_details(conn, scrape_id)
+    rows = sorted(rows)
+    conn.execute(
+        "INSERT INTO world_snapshots (scrape_id, worlds, counts) VALUES (?, ?, ?)",
+        (scrape_id, pack_uint16([r[0] for r in rows], delta=True), pack_uint16([r[1] for r in rows]))
+    )
+    changes = [(w, scrape_id, d) for w, _, d in rows if details.get(w) != d]
+    conn.executemany(
+        "INSERT INTO world_detail_changes (world_number, scrape_id, detail_id) VALUES (?, ?, ?)",
+        changes
+    )
+    for w, _, d in changes:
+        details[w] = d
+
+def scrape_range_filter(start=None, end=None, limit=None):
+    """WHERE clause and params selecting scrape events `se` in [start, end], or the last `limit` without a range."""
+    where_clauses = []
+    params = []
+    if start is not None:
+        where_clauses.append("se.ts >= ?")
+        params.append(start)
+    if end is not None:
+        where_clauses.append("se.ts <= ?")
+        params.append(end)
+    if start is None and end is None and limit:
+        where_clauses.append("se.id IN (SELECT id FROM scrape_events ORDER BY ts DESC LIMIT ?)")
+        params.append(limit)
+    return ("WHERE " + " AND ".join(where_clauses) if where_clauses else ""), params
+
+def read_world_snapshots(conn, start=None, end=None, limit=None):
+    """
+    Decodes compact world data for scrape events in [start, end] (epoch seconds).
+    Yields (scrape_id, ts, worlds, counts, details) per scrape in time order,
+    where the last three are aligned array('H') columns. Without a range, the last `limit` scrapes.
+    """
+    where_str, params = scrape_range_filter(start, end, limit)
+
+    snapshots = conn.execute(f'''
+        SELECT ws.scrape_id, se.ts, ws.worlds, ws.counts
+        FROM world_snapshots ws JOIN scrape_events se ON ws.scrape_id = se.id
+        {where_str}
+        ORDER BY se.ts ASC
+    ''', params).fetchall()
+    if not snapshots:
+        return
+
+    # Replay the detail change log forward from the state before the first scrape
+    first_id = snapshots[0][0]
+    details = current_world_details(conn, first_id)
+    changes = conn.execute(
+        "SELECT scrape_id, world_number, detail_id FROM world_detail_changes WHERE scrape_id >= ? ORDER BY scrape_id",
+        (first_id,)
+    ).fetchall()
+    pos = 0
+
+    for scrape_id, ts, worlds_blob, counts_blob in snapshots:
+        while pos < len(changes) and changes[pos][0] <= scrape_id:
+            details[changes[pos][1]] = changes[pos][2]
+            pos += 1
+        worlds = unpack_uint16(worlds_blob, delta=True)
+        counts = unpack_uint16(counts_blob)
+        yield scrape_id, ts, worlds, counts, array('H', [details.get(w, 0) for w in worlds])
+
+def latest_world_rows(conn, before_scrape_id=None, world_number=None):
+    """
+    Returns {world_number: (player_count, detail_id)} from each world's newest world_data
+    row (optionally before a scrape), leaving out worlds whose newest row marks them offline.
+    Each world is one index seek, walked with a recursive skip-scan over world numbers.
+    """
+    before = before_scrape_id if before_scrape_id is not None else 2**63 - 1
+    if world_number is not None:
+        worlds_cte = "worlds(n) AS (SELECT ?)"
+        params = [world_number, before]
+    else:
+        worlds_cte = '''worlds(n) AS (
+            SELECT MIN(world_number) FROM world_data
+            UNION ALL
+            SELECT (SELECT MIN(world_number) FROM world_data WHERE world_number > n) FROM worlds WHERE n IS NOT NULL
+        )'''
+        params = [before]
+    rows = conn.execute(f'''
+        WITH RECURSIVE {worlds_cte}
+        SELECT wd.world_number, wd.player_count, wd.detail_id
+        FROM worlds
+        JOIN world_data wd ON wd.world_number = worlds.n AND wd.scrape_id = (
+            SELECT MAX(scrape_id) FROM world_data WHERE world_number = worlds.n AND scrape_id < ?
+        )
+    ''', params)
+    return {row[0]: (row[1], row[2]) for row in rows if row[1] is not None}
+
+def write_world_changes(conn, scrape_id, rows, state, threshold=WORLD_CHANGE_THRESHOLD):
+    """
+    Stores one scrape in 'changes' form: `rows` are (world_number, player_count, detail_id)
+    tuples, and only worlds that are new, changed details or moved at least `threshold`
+    players from their last stored count get a world_data row. Worlds missing from the
+    scrape get an offline marker (NULL count and detail). `state` is the
+    {world_number: (player_count, detail_id)} last stored and is updated in place.
+    """
+    changed = []
+    seen = set()
+    for world, count, detail_id in rows:
+        seen.add(world)
+        last = state.get(world)
+        if last is None or last[1] != detail_id or abs(count - last[0]) >= max(threshold, 1):
+            changed.append((scrape_id, world, count, detail_id))
+            state[world] = (count, detail_id)
+    for world in [w for w in state if w not in seen]:
+        changed.append((scrape_id, world, None, None))
+        del state[world]
+    conn.executemany(
+        "INSERT INTO world_data (scrape_id, world_number, player_count, detail_id) VALUES (?, ?, ?, ?)",
+        changed
+    )
+
+def read_world_changes(conn, start=None, end=None, limit=None, world_number=None):
+    """
+    Loads 'changes' storage for scrape events in [start, end] (epoch seconds; without a
+    range, the last `limit` scrapes). Returns (scrapes, seed, changes): [(scrape_id, ts)]
+    in time order, each world's stored (player_count, detail_id) before the first scrape,
+    and the (scrape_id, world_number, player_count, detail_id) rows stored by the scrapes.
+    """
+    where_str, params = scrape_range_filter(start, end, limit)
+    scrapes = conn.execute(f"SELECT se.id, se.ts FROM scrape_events se {where_str} ORDER BY se.ts ASC", params).fetchall()
+    if not scrapes:
+        return [], {}, []
+
+    first_id = min(row[0] for row in scrapes)
+    last_id = max(row[0] for row in scrapes)
+    query = "SELECT scrape_id, world_number, player_count, detail_id FROM world_data WHERE scrape_id BETWEEN ? AND ?"
+    params = [first_id, last_id]
+    if world_number is not None:
+        query += " AND world_number = ?"
+        params.append(world_number)
+    changes = conn.execute(query + " ORDER BY scrape_id", params).fetchall()
+    return scrapes, latest_world_rows(conn, first_id, world_number), changes
+
+def replay_world_changes(conn, start=None, end=None, limit=None):
+    """
+    Forward-fills 'changes' storage into full scrapes. Yields the same
+    (scrape_id, ts, worlds, counts, details) tuples as read_world_snapshots.
+    """
+    scrapes, state, changes = read_world_changes(conn, start, end, limit)
+    by_scrape = {}
+    for scrape_id, world, count, detail_id in changes:
+        by_scrape.setdefault(scrape_id, []).append((world, count, detail_id))
+
+    for scrape_id, ts in scrapes:
+        for world, count, detail_id in by_scrape.get(scrape_id, ()):
+            if count is None:
+                state.pop(world, None)
+            else:
+                state[world] = (count, detail_id)
+        worlds = sorted(state)
+        yield (scrape_id, ts, array('H', worlds), array('H', [state[w][0] for w in worlds]),
+               array('H', [state[w][1] for w in worlds]))
+
+def compact_world_data(conn, batch_size=500):
+    """
+    Migrates row-per-world `world_data` into `world_snapshots` in scrape order, deleting
+    migrated rows batch by batch. Run it with the tracker stopped (or before switching
+    WORLD_STORAGE to 'compact') so the detail change log is replayed in order.
+    Returns the number of scrapes migrated.
+    """
+    details = current_world_details(conn)
+    migrated = 0
+    while True:
+        scrape_ids = [row[0] for row in conn.execute(
+            "SELECT DISTINCT scrape_id FROM world_data ORDER BY scrape_id LIMIT ?", (batch_size,)
+        )]
+        if not scrape_ids:
+            break
+        placeholders = ",".join("?" * len(scrape_ids))
+        rows = conn.execute(
+            f"SELECT scrape_id, world_number, player_count, detail_id FROM world_data "
+            f"WHERE scrape_id IN ({placeholders}) ORDER BY scrape_id, world_number",
+            scrape_ids
+        ).fetchall()
+        by_scrape = {}
+        for scrape_id, world_number, player_count, detail_id in rows:
+            by_scrape.setdefault(scrape_id, []).append((world_number, player_count, detail_id))
+        with conn:
+            for scrape_id in scrape_ids:
+                write_world_snapshot(conn, scrape_id, by_scrape[scrape_id], details)
+            conn.execute(f"DELETE FROM world_data WHERE scrape_id IN ({placeholders})", scrape_ids)
+        migrated += len(scrape_ids)
+        logger.info(f"Compacted {migrated:,} scrapes...")
+    return migrated
+
+# Merges one hour of a series into hourly_summaries, keeping the times of its extremes
+HOURLY_UPSERT = '''
+    INSERT INTO hourly_summaries
+        (dimension, key, bucket, min_count, min_ts, max_count, max_ts, sum_count, samples, detail_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(dimension, key, bucket) DO UPDATE SET
+        min_ts = CASE WHEN excluded.min_count < min_count THEN excluded.min_ts ELSE min_ts END,
+        min_count = MIN(min_count, excluded.min_count),
+        max_ts = CASE WHEN excluded.max_count > max_count THEN excluded.max_ts ELSE max_ts END,
+        max_count = MAX(max_count, excluded.max_count),
+        sum_count = sum_count + excluded.sum_count,
+        samples = samples + excluded.samples,
+        detail_id = COALESCE(excluded.detail_id, detail_id)
+'''
+
+def compacted_range(conn):
+    """(from_ts, until_ts) of the hours compact_history has folded into hourly_summaries, or None."""
+    try:
+        row = conn.execute("SELECT from_ts, until_ts FROM main.compaction").fetchone()
+    except sqlite3.OperationalError:
+        # Database created before tiered retention; everything is raw
+        return None
+    return (row[0], row[1]) if row else None
+
+def history_version(conn):
+    """How many times stored history has been rewritten (see bump_history_version), 0 if never."""
+    try:
+        row = conn.execute("SELECT version FROM main.history_version").fetchone()
+    except sqlite3.OperationalError:
+        # Database created before history versions
+        return 0
+    return row[0] if row else 0
+
+def bump_history_version(conn):
+    """Records that stored history was rewritten; call it in the transaction that rewrites it."""
+    conn.execute(
+        "INSERT INTO history_version (id, version) VALUES (0, 1) ON CONFLICT (id) DO UPDATE SET version = version + 1"
+    )
+
+def fold_hourly(conn, samples):
+    """
+    Merges (dimension, key, ts, count, detail_id) samples, in time order, into
+    hourly_summaries. Samples without a count (offline worlds) are left out.
+    """
+    buckets = {}
+    for dimension, key, ts, count, detail_id in samples:
+        if count is None:
+            continue
+        bucket_key = (dimension, key, ts // 3600 * 3600)
+        b = buckets.get(bucket_key)
+        if b is None:
+            buckets[bucket_key] = [count, ts, count, ts, count, 1, detail_id]
+            continue
+        if count < b[0]:
+            b[0], b[1] = count, ts
+        if count > b[2]:
+            b[2], b[3] = count, ts
+        b[4] += count
+        b[5] += 1
+        b[6] = detail_id
+    conn.executemany(HOURLY_UPSERT, [(*bucket_key, *b) for bucket_key, b in buckets.items()])
+
+def world_samples(conn, start, end):
+    """Yields ('world', world_number, ts, count, detail_id) for every world of the scrapes in [start, end)."""
+    if WORLD_STORAGE in ('compact', 'changes'):
+        reader = replay_world_changes if WORLD_STORAGE == 'changes' else read_world_snapshots
+        for _, ts, worlds, counts, details in reader(conn, start, end - 1):
+            for world, count, detail_id in zip(worlds, counts, details):
+                yield 'world', world, ts, count, detail_id
+        return
+    yield from conn.execute('''
+        SELECT 'world', wd.world_number, se.ts, wd.player_count, wd.detail_id
+        FROM world_data wd JOIN scrape_events se ON wd.scrape_id = se.id
+        WHERE se.ts >= ? AND se.ts < ?
+        ORDER BY se.ts
+    ''', (start, end))
+
+def compact_history(conn, retention_days=RAW_RETENTION_DAYS, batch_hours=COMPACTION_BATCH_HOURS,
+                    pause=COMPACTION_PAUSE, now=None):
+    """
+    Folds the raw samples of the live database older than `retention_days` into
+    hourly_summaries (per hour: min and max with the times they were seen, sum and
+    sample count, for the global count, every world and every scrape_summaries
+    dimension) and deletes them, along with their 5-minute rollups. Hours are compacted
+    oldest first, one transaction per `batch_hours` with `pause` seconds between them,
+    so the tracker's writes are only ever held up for one batch; with incremental
+    auto-vacuum the freed pages are returned after each batch. The newest sample and
+    scrape always stay raw, and sealed partitions are left as they are.
+    Returns the number of hours compacted.
+    """
+    cutoff = (int(now if now is not None else time.time()) - retention_days * 86400) // 3600 * 3600
+    newest = [conn.execute(f"SELECT MAX(ts) FROM main.{table}").fetchone()[0] for table in ('players', 'scrape_events')]
+    newest = [ts for ts in newest if ts is not None]
+    if not newest:
+        return 0
+    cutoff = min([cutoff] + [ts // 3600 * 3600 for ts in newest])
+
+    state = compacted_range(conn)
+    if state is None:
+        oldest = [conn.execute(f"SELECT MIN(ts) FROM main.{table}").fetchone()[0] for table in ('players', 'scrape_events')]
+        first = min(ts for ts in oldest if ts is not None) // 3600 * 3600
+        state = (first, first)
+    first, until = state
+    incremental = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+    hours = 0
+    while until < cutoff:
+        end = min(until + batch_hours * 3600, cutoff)
+        # From `first`, so rows written late (journal replay) into compacted hours are folded in too
+        span = (first, end)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fold_hourly(conn, itertools.chain(
+                conn.execute("SELECT 'global', 0, ts, count, NULL FROM players WHERE ts >= ? AND ts < ? ORDER BY ts", span),
+                world_samples(conn, first, end),
+                conn.execute('''
+                    SELECT ss.dimension, ss.key, se.ts, ss.player_count, NULL
+                    FROM scrape_summaries ss JOIN scrape_events se ON ss.scrape_id = se.id
+                    WHERE se.ts >= ? AND se.ts < ?
+                    ORDER BY se.ts
+                ''', span)
+            ))
+            if WORLD_STORAGE == 'changes':
+                # Checkpoint every world at the first kept scrape, so reads never need a deleted row to forward-fill from
+                kept = conn.execute("SELECT id FROM scrape_events WHERE ts >= ? ORDER BY ts LIMIT 1", (end,)).fetchone()[0]
+                conn.executemany(
+                    "INSERT OR IGNORE INTO world_data (scrape_id, world_number, player_count, detail_id) VALUES (?, ?, ?, ?)",
+                    [(kept, w, count, detail_id) for w, (count, detail_id) in latest_world_rows(conn, kept).items()]
+                )
+            for table in ('world_data', 'world_snapshots', 'scrape_summaries'):
+                conn.execute(f"DELETE FROM {table} WHERE scrape_id IN "
+                             f"(SELECT id FROM scrape_events WHERE ts >= ? AND ts < ?)", span)
+            conn.execute("DELETE FROM scrape_events WHERE ts >= ? AND ts < ?", span)
+            conn.execute("DELETE FROM players WHERE ts >= ? AND ts < ?", span)
+            conn.execute("DELETE FROM players_rollup WHERE unit = '5min' AND bucket >= ? AND bucket < ?", span)
+            conn.execute("INSERT OR REPLACE INTO compaction (id, from_ts, until_ts) VALUES (0, ?, ?)", span)
+            # Closed history chunks over these hours now read hourly_summaries
+            bump_history_version(conn)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        if incremental:
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+
+        hours += (end - until) // 3600
+        until = end
+        logger.info(f"Compacted raw samples before {time.strftime('%Y-%m-%d %H:%M', time.gmtime(until))} UTC...")
+        if pause and until < cutoff:
+            time.sleep(pause)
+    return hours
@@ -0,0 +1,91 @@
+import math
+
+# NumPy is optional: when installed the downsamplers run vectorized, otherwise in pure Python
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def minmax_indices(ys, max_points):
+    """
+    Splits the series into max_points // 2 equal buckets and keeps the lowest and
+    highest sample of each, so every spike and dip survives. Returns sorted indices.
+    """
+    n = len(ys)
+    if n <= max_points:
+        return list(range(n))
+    buckets = max(1, max_points // 2)
+    size = math.ceil(n / buckets)
+
+    if np is not None:
+        values = np.asarray(ys, dtype=float)
+        padded_len = buckets * size
+        high = np.full(padded_len, -np.inf)
+        low = np.full(padded_len, np.inf)
+        high[:n] = values
+        low[:n] = values
+        offsets = np.arange(buckets) * size
+        picks = np.concatenate([
+            offsets + high.reshape(buckets, size).argmax(axis=1),
+            offsets + low.reshape(buckets, size).argmin(axis=1),
+        ])
+        return sorted(set(int(i) for i in picks if i < n))
+
+    picks = set()
+    for start in range(0, n, size):
+        bucket = range(start, min(start + size, n))
+        picks.add(max(bucket, key=ys.__getitem__))
+        picks.add(min(bucket, key=ys.__getitem__))
+    return sorted(picks)
+
+def lttb_indices(xs, ys, max_points):
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last sample and, per bucket,
+    the sample forming the largest triangle with the previous pick and the next
+    bucket's average. Returns sorted indices.
+    """
+    n = len(ys)
+    if n <= max_points or max_points < 3:
+        return list(range(n))
+    every = (n - 2) / (max_points - 2)
+    picks = [0]
+    a = 0
+
+    if np is not None:
+        x = np.asarray(xs, dtype=float)
+        y = np.asarray(ys, dtype=float)
+        for i in range(max_points - 2):
+            start = int(i * every) + 1
+            end = int((i + 1) * every) + 1
+            next_end = min(int((i + 2) * every) + 1, n)
+            avg_x = x[end:next_end].mean() if next_end > end else x[n - 1]
+            avg_y = y[end:next_end].mean() if next_end > end else y[n - 1]
+            areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+            a = start + int(areas.argmax())
+            picks.append(a)
+    else:
+        for i in range(max_points - 2):
+            start = int(i * every) + 1
+            end = int((i + 1) * every) + 1
+            next_end = min(int((i + 2) * every) + 1, n)
+            if next_end > end:
+                avg_x = sum(xs[end:next_end]) / (next_end - end)
+                avg_y = sum(ys[end:next_end]) / (next_end - end)
+            else:
+                avg_x, avg_y = xs[n - 1], ys[n - 1]
+            best, best_area = start, -1.0
+            for j in range(start, end):
+                area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+                if area > best_area:
+                    best, best_area = j, area
+            a = best
+            picks.append(a)
+
+    picks.append(n - 1)
+    return picks
+
+def downsample(xs, ys, max_points, method='minmax'):
+    """Returns the indices of at most `max_points` samples to keep, using 'minmax' or 'lttb'."""
+    if method == 'lttb':
+        return lttb_indices(xs, ys, max_points)
+    return minmax_indices(ys, max_points)
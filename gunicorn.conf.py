@@ -0,0 +1,30 @@
+"""
+gunicorn settings for serving the API in production (Linux/macOS):
+    gunicorn -c gunicorn.conf.py
+
+Each worker is a separate process with its own read connection pool, caches and
+response warm-up thread, so the app is loaded after the fork (no preload_app) and
+the workers share nothing but the database (or its snapshots, see API_SNAPSHOT_MODE).
+"""
+import multiprocessing
+
+from config import API_HOST, API_PORT, API_WORKERS, API_THREADS
+
+wsgi_app = "osrs_api:create_app()"
+bind = f"{API_HOST}:{API_PORT}"
+
+# One process per core runs Python in parallel; threads overlap SQLite and socket I/O
+# within a worker, and keep long-lived /api/stream connections from blocking it
+workers = API_WORKERS or multiprocessing.cpu_count()
+worker_class = "gthread"
+threads = API_THREADS
+preload_app = False
+
+# Workers only need to check in; requests (and streams) may run longer than this
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth of the per-process caches
+max_requests = 20000
+max_requests_jitter = 2000
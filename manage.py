@@ -0,0 +1,199 @@
+import argparse
+import logging
+import time
+
+from database import (init_db, get_db_connection, backfill_rollups, backfill_summaries, compact_world_data,
+                      is_legacy_schema, migrate_to_epoch, create_snapshot, seal_partitions, compact_history)
+from config import (SNAPSHOT_DIR, SNAPSHOT_INTERVAL, SNAPSHOT_KEEP, RAW_RETENTION_DAYS, COMPACTION_BATCH_HOURS,
+                    COMPACTION_PAUSE, COMPACTION_INTERVAL, ANOMALY_WARMUP_DAYS)
+from archive_import import import_pages
+from anomaly import rebuild_anomalies
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def cmd_backfill_rollups(args):
+    """Rebuilds the players_rollup table from the raw players table."""
+    conn = init_db()
+    try:
+        rows = backfill_rollups(conn)
+        logger.info(f"Rebuilt {rows:,} rollup buckets.")
+    finally:
+        conn.close()
+
+def cmd_backfill_summaries(args):
+    """Rebuilds the scrape_summaries table from stored world data."""
+    conn = init_db()
+    try:
+        scrapes = backfill_summaries(conn)
+        logger.info(f"Rebuilt summaries for {scrapes:,} scrapes.")
+    finally:
+        conn.close()
+
+def cmd_compact_history(args):
+    """Folds raw samples older than the retention window into hourly summaries, once or every --interval seconds."""
+    conn = init_db()
+    try:
+        if args.vacuum and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            logger.info("Switching the database to incremental auto-vacuum (one full VACUUM)...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        while True:
+            t0 = time.monotonic()
+            try:
+                hours = compact_history(conn, retention_days=args.days, batch_hours=args.batch_hours, pause=args.pause)
+                logger.info(f"Compacted {hours:,} hours of raw samples in {time.monotonic() - t0:.1f}s.")
+            except Exception as e:
+                if not args.loop:
+                    raise
+                logger.error(f"Compaction failed: {e}")
+            if not args.loop:
+                return
+            time.sleep(max(0.0, args.interval - (time.monotonic() - t0)))
+    finally:
+        conn.close()
+
+def cmd_compact_world_data(args):
+    """Migrates row-per-world world_data into packed world_snapshots."""
+    conn = init_db()
+    try:
+        before = conn.execute("PRAGMA page_count").fetchone()[0]
+        scrapes = compact_world_data(conn, batch_size=args.batch_size)
+        logger.info(f"Migrated {scrapes:,} scrapes to compact storage.")
+        if args.vacuum:
+            conn.execute("VACUUM")
+            after = conn.execute("PRAGMA page_count").fetchone()[0]
+            logger.info(f"Database shrank from {before:,} to {after:,} pages.")
+        logger.info("Set WORLD_STORAGE = 'compact' in config.py before restarting the tracker and API.")
+    finally:
+        conn.close()
+
+def cmd_detect_anomalies(args):
+    """Rebuilds the anomaly detector's state and events by replaying the last --days of samples."""
+    if args.days <= ANOMALY_WARMUP_DAYS:
+        logger.warning(f"Series are learned for ANOMALY_WARMUP_DAYS ({ANOMALY_WARMUP_DAYS}) before events are "
+                       f"recorded, so --days {args.days} records none.")
+    conn = init_db()
+    try:
+        t0 = time.monotonic()
+        samples, events = rebuild_anomalies(conn, args.days)
+        logger.info(f"Replayed {samples:,} samples in {time.monotonic() - t0:.1f}s and recorded {events:,} events.")
+    finally:
+        conn.close()
+
+def cmd_import_pages(args):
+    """Bulk-loads archived homepage and server list pages from a directory or tarball."""
+    conn = init_db()
+    try:
+        stats = import_pages(conn, args.path, workers=args.workers)
+        rate = stats['pages'] / stats['seconds'] if stats['seconds'] else 0
+        logger.info(
+            f"Imported {stats['counts']:,} global counts and {stats['scrapes']:,} world scrapes from "
+            f"{stats['pages']:,} pages in {stats['seconds']:.1f}s ({rate:,.0f} pages/sec); skipped "
+            f"{stats['duplicates']:,} duplicate, {stats['skipped']:,} out-of-order or sealed and "
+            f"{stats['unparsed']:,} unrecognized pages."
+        )
+    finally:
+        conn.close()
+
+def cmd_migrate_epoch(args):
+    """Converts ISO text timestamps to integer epoch columns while the tracker keeps running."""
+    conn = get_db_connection()
+    try:
+        if not is_legacy_schema(conn):
+            logger.info("Database already uses epoch timestamps.")
+            return
+        migrate_to_epoch(conn, batch_size=args.batch_size, pause=args.pause)
+        logger.info("Migration finished. Restart the tracker and API on the new code.")
+    finally:
+        conn.close()
+
+def cmd_partition(args):
+    """Seals every closed period of PARTITION_MONTHS months of the live database into its own read-only file."""
+    conn = init_db()
+    try:
+        before = conn.execute("PRAGMA page_count").fetchone()[0]
+        sealed = seal_partitions(conn)
+        logger.info(f"Sealed {len(sealed)} partition(s){': ' + ', '.join(sealed) if sealed else ''}.")
+        if args.vacuum and sealed:
+            conn.execute("VACUUM")
+            after = conn.execute("PRAGMA page_count").fetchone()[0]
+            logger.info(f"Live database shrank from {before:,} to {after:,} pages.")
+    finally:
+        conn.close()
+
+def cmd_snapshot(args):
+    """Publishes a read snapshot of the database for API_SNAPSHOT_MODE, once or every --interval seconds."""
+    conn = get_db_connection()
+    try:
+        while True:
+            t0 = time.monotonic()
+            try:
+                path = create_snapshot(conn, directory=args.dir, keep=args.keep)
+                logger.info(f"Published snapshot {path} in {time.monotonic() - t0:.1f}s.")
+            except Exception as e:
+                if not args.loop:
+                    raise
+                logger.error(f"Snapshot failed: {e}")
+            if not args.loop:
+                return
+            time.sleep(max(0.0, args.interval - (time.monotonic() - t0)))
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance commands for the OSRS player count database.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('backfill-rollups', help="Rebuild pre-aggregated history rollups from raw samples.")
+    p.set_defaults(func=cmd_backfill_rollups)
+
+    p = subparsers.add_parser('backfill-summaries', help="Rebuild per-scrape total/F2P/location/activity sums.")
+    p.set_defaults(func=cmd_backfill_summaries)
+
+    p = subparsers.add_parser('compact-history', help="Fold raw samples past the retention window into hourly summaries.")
+    p.add_argument('--days', type=int, default=RAW_RETENTION_DAYS, help="Days of raw samples to keep.")
+    p.add_argument('--batch-hours', type=int, default=COMPACTION_BATCH_HOURS, help="Hours compacted per transaction.")
+    p.add_argument('--pause', type=float, default=COMPACTION_PAUSE, help="Seconds to sleep between batches.")
+    p.add_argument('--loop', action='store_true', help="Keep compacting every --interval seconds.")
+    p.add_argument('--interval', type=float, default=COMPACTION_INTERVAL, help="Seconds between runs with --loop.")
+    p.add_argument('--vacuum', action='store_true',
+                   help="Switch an existing database to incremental auto-vacuum first (one full VACUUM).")
+    p.set_defaults(func=cmd_compact_history)
+
+    p = subparsers.add_parser('compact-world-data', help="Migrate world_data rows into compact per-scrape snapshots.")
+    p.add_argument('--batch-size', type=int, default=500, help="Scrapes migrated per transaction.")
+    p.add_argument('--vacuum', action='store_true', help="VACUUM afterwards to return freed pages to the OS.")
+    p.set_defaults(func=cmd_compact_world_data)
+
+    p = subparsers.add_parser('detect-anomalies', help="Rebuild anomaly detection state and events from recent samples.")
+    p.add_argument('--days', type=int, default=28, help="Days of samples replayed, counted back from the newest.")
+    p.set_defaults(func=cmd_detect_anomalies)
+
+    p = subparsers.add_parser('import-pages', help="Bulk-load saved homepage and /slu pages (e.g. Wayback snapshots).")
+    p.add_argument('path', help="Directory or tarball of saved pages.")
+    p.add_argument('--workers', type=int, default=None, help="Parser processes (default: one per CPU core).")
+    p.set_defaults(func=cmd_import_pages)
+
+    p = subparsers.add_parser('migrate-epoch', help="Convert ISO text timestamps to integer epoch columns online.")
+    p.add_argument('--batch-size', type=int, default=50000, help="Rows copied per transaction.")
+    p.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches.")
+    p.set_defaults(func=cmd_migrate_epoch)
+
+    p = subparsers.add_parser('partition', help="Move closed months into sealed, read-only partition files.")
+    p.add_argument('--vacuum', action='store_true', help="VACUUM the live database afterwards to return freed pages.")
+    p.set_defaults(func=cmd_partition)
+
+    p = subparsers.add_parser('snapshot', help="Publish a consistent read-only copy of the database for API replicas.")
+    p.add_argument('--dir', default=SNAPSHOT_DIR, help="Directory snapshots are published to.")
+    p.add_argument('--keep', type=int, default=SNAPSHOT_KEEP, help="Snapshots kept; older ones are deleted.")
+    p.add_argument('--loop', action='store_true', help="Keep publishing a new snapshot every --interval seconds.")
+    p.add_argument('--interval', type=float, default=SNAPSHOT_INTERVAL, help="Seconds between snapshots with --loop.")
+    p.set_defaults(func=cmd_snapshot)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
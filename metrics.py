@@ -0,0 +1,148 @@
+"""
+Minimal in-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are module-level and thread-safe. The API serves them at
+/metrics; the tracker serves them from start_http_server(). Recording is cheap, but
+the callers only do it when METRICS_ENABLED is set in config.py.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# What the current thread/task is working for, e.g. the API endpoint or 'tracker'
+_scope = contextvars.ContextVar('metrics_scope', default='other')
+
+_registry = []
+_lock = threading.Lock()
+
+def set_scope(name):
+    _scope.set(name)
+
+def get_scope():
+    return _scope.get()
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with _lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count], sum
+        self._values = {}
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the `with` block in seconds."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+def render():
+    """Returns every registered metric in the Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port, addr=''):
+    """Serves /metrics from a daemon thread (for processes without a web app, like the tracker)."""
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# --- Metrics shared by the modules ---
+
+SQL_SECONDS = Histogram(
+    'osrs_sql_query_seconds', "SQL statement time from execute to the last fetched row.", ('scope', 'statement'))
+SQL_ROWS = Counter('osrs_sql_rows_returned_total', "Rows fetched from SQL statements.", ('scope',))
+SQL_VM_STEPS = Counter(
+    'osrs_sql_vm_steps_total', "SQLite virtual machine instructions executed (counted in steps of 1000).", ('scope',))
+SQL_SLOW = Counter('osrs_sql_slow_queries_total', "SQL statements slower than SLOW_QUERY_MS.", ('scope',))
+
+HTTP_SECONDS = Histogram(
+    'osrs_http_request_seconds', "API request latency.", ('endpoint', 'method', 'status'))
+HTTP_BYTES = Counter('osrs_http_response_bytes_total', "Serialized API response bytes.", ('endpoint',))
+
+SCRAPE_FETCH_SECONDS = Histogram('osrs_scrape_fetch_seconds', "Page download time, including retries.", ('page',))
+SCRAPE_PARSE_SECONDS = Histogram('osrs_scrape_parse_seconds', "Page parse time.", ('page',))
+SCRAPE_NOT_MODIFIED = Counter(
+    'osrs_scrape_not_modified_total', "Fetches answered 304 and served from the parsed cache.", ('page',))
+SCRAPE_INSERT_SECONDS = Histogram('osrs_scrape_insert_seconds', "Scrape write transaction time.", ('worlds',))
+SCRAPE_JOURNALED = Counter(
+    'osrs_scrape_journaled_total', "Samples spooled to the journal because the database could not be written.")
+SCRAPE_ERRORS = Counter('osrs_scrape_errors_total', "Pages that could not be fetched or parsed.", ('page',))
@@ -1,20 +1,318 @@
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, g, jsonify, request, render_template
 from flask_cors import CORS
 import os
-from datetime import datetime, timedelta, timezone
+import sys
+import time
+import hashlib
+import random
+import threading
+import bisect
+import itertools
+import math
+import queue
+from collections import OrderedDict
+import calendar
+import cProfile
+import gzip
+import io
+import pstats
+from datetime import date, datetime, timedelta, timezone
 import logging
+import sqlite3
+from array import array
+from urllib.parse import parse_qs
 
-from config import BASE_DIR
-from database import get_db_connection
+from config import (
+    BASE_DIR, WORLD_STORAGE, API_CACHE_TTL, API_CACHE_MAX_AGE, API_READ_POOL,
+    API_SERIES_CACHE_ENTRIES, API_SERIES_CACHE_MAX_SCRAPES, API_SERIES_CACHE_TTL,
+    API_STATS_CACHE_ENTRIES, API_EVENTS_LIMIT, API_SNAPSHOT_MODE, API_HOST, API_PORT, API_DEBUG,
+    API_PRESET_CACHE_ENTRIES, API_WARM_PRESETS, API_WARM_CHUNKS, API_WARM_QUERY, API_WARM_INTERVAL,
+    API_CHUNK_MAX_AGE, HISTORY_CHUNK_VERSION,
+    API_COMPRESSION, API_COMPRESS_MIN_BYTES, API_GZIP_LEVEL, API_BROTLI_QUALITY,
+    STREAM_POLL_INTERVAL, STREAM_HEARTBEAT, STREAM_MAX_SUBSCRIBERS, STREAM_QUEUE_SIZE, STREAM_RETRY_MS,
+    METRICS_ENABLED, PROFILING_ENABLED, PROFILE_HEADER, PROFILE_SAMPLE_RATE
+)
+from database import (
+    get_db_connection, open_read_connection, acquire_read_connection, release_read_connection, read_database_path,
+    read_world_snapshots, read_world_changes, replay_world_changes, sealed_partitions, partition_spans, route_partitions,
+    compacted_range, history_version, ROLLUP_BUCKETS, ISO_SQL
+)
+from downsample import downsample
+import analytics
+import metrics
+
+# pyinstrument is optional: when installed it produces the profile reports, otherwise cProfile does
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+# brotli is optional: when installed, clients that accept it get brotli instead of gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# NumPy is optional: when installed, 'changes' world storage is forward-filled vectorized and /api/stats is available
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Output label for each rollup unit, formatted from the bucket start (epoch seconds)
+ROLLUP_LABELS = {
+    'minute': "datetime({b}, 'unixepoch')",
+    'hour': "strftime('%Y-%m-%dT%H:00:00Z', {b}, 'unixepoch')",
+    'day': "strftime('%Y-%m-%d', {b}, 'unixepoch')",
+    'week': "date({b}, 'unixepoch')",
+    'month': "strftime('%Y-%m-01', {b}, 'unixepoch')",
+}
+
+# Series dimensions for /api/history/series: (key column, label expression, extra join)
+SERIES_DIMENSIONS = {
+    'world': ("wd.world_number", "'World ' || (wd.world_number + 300)", ""),
+    'location': ("det.location_id", "loc.name", "LEFT JOIN locations loc ON det.location_id = loc.id"),
+    'f2p': ("det.is_f2p", "CASE WHEN det.is_f2p THEN 'Free-to-Play' ELSE 'Members' END", ""),
+    'activity': ("det.activity_id", "act.description", "LEFT JOIN activities act ON det.activity_id = act.id"),
+}
+
+# Label of each scrape_summaries (and hourly_summaries) key `ss.key` per dimension
+SUMMARY_LABELS = {
+    'location': "(SELECT name FROM locations WHERE id = ss.key)",
+    'f2p': "CASE WHEN ss.key THEN 'Free-to-Play' ELSE 'Members' END",
+    'activity': "(SELECT description FROM activities WHERE id = ss.key)",
+}
+
+# Scrapes forward-filled per (scrape x world) block when reading 'changes' world storage
+WORLD_CHANGE_BLOCK = 2048
+
 # Tell Flask where to find the static files and templates
 app = Flask(__name__, template_folder=os.path.join(BASE_DIR, 'templates'))
 CORS(app)
 
+# Only one profiler may run at a time, so concurrent requests are not profiled
+_profile_lock = threading.Lock()
+
+@app.before_request
+def start_instrumentation():
+    g.request_started = time.perf_counter()
+    metrics.set_scope(request.endpoint or 'unknown')
+
+    if PROFILING_ENABLED:
+        requested = PROFILE_HEADER in request.headers
+        if (requested or random.random() < PROFILE_SAMPLE_RATE) and _profile_lock.acquire(blocking=False):
+            g.profile_requested = requested
+            g.profiler = Profiler() if Profiler is not None else cProfile.Profile()
+            if Profiler is not None:
+                g.profiler.start()
+            else:
+                g.profiler.enable()
+
+@app.after_request
+def finish_instrumentation(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        try:
+            response = profile_report(profiler, response, g.pop('profile_requested', False))
+        finally:
+            _profile_lock.release()
+
+    if METRICS_ENABLED and 'request_started' in g:
+        endpoint = request.endpoint or 'unknown'
+        metrics.HTTP_SECONDS.observe(
+            time.perf_counter() - g.request_started,
+            endpoint=endpoint, method=request.method, status=response.status_code
+        )
+        if response.content_length is not None:
+            metrics.HTTP_BYTES.inc(response.content_length, endpoint=endpoint)
+    return response
+
+# Response types worth compressing (history, series and stats payloads)
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/octet-stream')
+
+@app.after_request
+def compress_response(response):
+    """
+    Encodes JSON and binary responses of at least API_COMPRESS_MIN_BYTES with brotli
+    (when installed and accepted) or gzip. Registered after finish_instrumentation so
+    it runs first and the metrics count the bytes actually sent. Bodies already
+    encoded for a cached preset response (g.encoded_bodies) are reused.
+    """
+    if (not API_COMPRESSION or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    body = response.get_data()
+    if len(body) < API_COMPRESS_MIN_BYTES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if brotli is not None and request.accept_encodings['br']:
+        encoding = 'br'
+    elif request.accept_encodings['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+    encoded_bodies = g.get('encoded_bodies')
+    data = encoded_bodies.get(encoding) if encoded_bodies is not None else None
+    if data is None:
+        if encoding == 'br':
+            data = brotli.compress(body, quality=API_BROTLI_QUALITY)
+        else:
+            data = gzip.compress(body, compresslevel=API_GZIP_LEVEL, mtime=0)
+        if encoded_bodies is not None:
+            encoded_bodies[encoding] = data
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # The representation changed, so a strong validator no longer matches it byte for byte
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def profile_report(profiler, response, requested):
+    """Stops `profiler`; returns the report as the response if it was requested, otherwise logs it."""
+    if Profiler is not None:
+        profiler.stop()
+        report = profiler.output_text()
+    else:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(40)
+        report = out.getvalue()
+
+    if requested:
+        return app.response_class(report, mimetype='text/plain')
+    logger.info(f"Profile of {request.full_path} ({response.status_code}):\n{report}")
+    return response
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus metrics for this API process (404 unless METRICS_ENABLED)."""
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return app.response_class(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+def get_db():
+    """
+    Returns the connection for the current request: a pooled read-only connection,
+    or a fresh one per request when API_READ_POOL is off (read-only on the newest
+    snapshot in API_SNAPSHOT_MODE). Released by release_db when the app context tears down.
+    """
+    if 'db' not in g:
+        g.db_pooled = API_READ_POOL
+        if API_READ_POOL:
+            g.db = acquire_read_connection()
+        else:
+            g.db = open_read_connection() if API_SNAPSHOT_MODE else get_db_connection()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    if g.pop('db_pooled', False):
+        # Pooled connections stay open; drop one that hit a database error
+        release_read_connection(conn, discard=isinstance(exc, sqlite3.Error))
+    else:
+        conn.close()
+
+# Relative ranges /api/history accepts as `preset`, in seconds before now (matching the dashboard's presets)
+HISTORY_PRESETS = {
+    '3h': 3 * 3600,
+    '6h': 6 * 3600,
+    '12h': 12 * 3600,
+    '24h': 86400,
+    '7d': 7 * 86400,
+    '30d': 30 * 86400,
+    '6m': 183 * 86400,
+    '1y': 365 * 86400,
+    '5y': 1826 * 86400,
+    '10y': 3652 * 86400,
+}
+
+# Span of one /api/history `chunk` per `unit` (None = raw samples). Each aligns with the
+# unit's buckets, so a bucket never straddles two chunks; 'isoyear' is an ISO 8601
+# week-numbering year, which starts on a Monday like the week buckets
+HISTORY_CHUNKS = {
+    None: 'day',
+    'minute': 'day',
+    'hour': 'month',
+    'day': 'year',
+    'week': 'isoyear',
+    'month': 'year',
+}
+
+# Parameters that choose a range themselves and so cannot be combined with `chunk`
+CHUNK_EXCLUSIVE_ARGS = ('start', 'end', 'since', 'preset', 'limit')
+
+# Serialized preset and chunk /api/history responses (see cached_history), least recently used first
+_preset_cache = OrderedDict()
+_preset_lock = threading.Lock()
+
+# World numbers in each sealed partition (see partition_worlds); sealed partitions never change
+_partition_worlds = {}
+
+# Serialized responses keyed by name: {"version", "body", "status", "etag", "last_modified", "expires"}
+_response_cache = {}
+
+def data_version(conn):
+    """
+    Cheap probe that changes whenever the tracker commits a new players or scrape_events
+    row or stored history is rewritten; the last element is the history_version.
+    """
+    # The newest rows are always in the live database, whatever partitions are attached
+    row = conn.execute(
+        "SELECT (SELECT MAX(id) FROM main.players), (SELECT MAX(id) FROM main.scrape_events)"
+    ).fetchone()
+    return tuple(row) + (history_version(conn),)
+
+def history_chunk_version(conn):
+    """The `v` of chunk URLs, e.g. '1.4': HISTORY_CHUNK_VERSION and the database's history_version."""
+    return f"{HISTORY_CHUNK_VERSION}.{history_version(conn)}"
+
+def cached_response(name, build):
+    """
+    Serves `build(conn)` -> (payload, status) from an in-memory cache of serialized JSON.
+    Entries expire after API_CACHE_TTL seconds or as soon as data_version() changes.
+    Responses carry ETag/Last-Modified, so clients revalidating with
+    If-None-Match/If-Modified-Since get a 304.
+    """
+    now = time.time()
+    conn = get_db()
+    version = data_version(conn)
+    entry = _response_cache.get(name)
+    if entry is None or entry['version'] != version or entry['expires'] <= now:
+        payload, status = build(conn)
+        body = app.json.dumps(payload)
+        etag = hashlib.sha1(body.encode('utf-8')).hexdigest()[:20]
+        # Keep Last-Modified stable when only the TTL ran out and the content is unchanged
+        last_modified = entry['last_modified'] if entry and entry['etag'] == etag else now
+        entry = {
+            "version": version,
+            "body": body,
+            "status": status,
+            "etag": etag,
+            "last_modified": last_modified,
+            "expires": now + API_CACHE_TTL
+        }
+        if status == 200:
+            _response_cache[name] = entry
+
+    response = app.response_class(entry['body'], status=entry['status'], mimetype='application/json')
+    if entry['status'] == 200:
+        response.set_etag(entry['etag'])
+        response.last_modified = datetime.fromtimestamp(int(entry['last_modified']), timezone.utc)
+        response.cache_control.public = True
+        response.cache_control.max_age = API_CACHE_MAX_AGE
+        response.make_conditional(request)
+    return response
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -30,76 +328,472 @@ def sitemap():
 @app.route('/api/latest')
 def get_latest():
     """Returns the most recent single data point with F2P/Members breakdown."""
-    conn = get_db_connection()
-    try:
-        # Get the last row added to players (global count)
-        row = conn.execute('SELECT * FROM players ORDER BY id DESC LIMIT 1').fetchone()
-        
-        f2p_count = 0
-        members_count = 0
-        
-        if row:
-            try:
-                latest_scrape = conn.execute('SELECT id, timestamp FROM scrape_events ORDER BY timestamp DESC LIMIT 1').fetchone()
-                breakdown_ts = None
-                if latest_scrape:
-                    scrape_id = latest_scrape['id']
-                    breakdown_ts = latest_scrape['timestamp']
-                    
-                    # Calculate F2P count
-                    f2p_res = conn.execute('''
-                        SELECT SUM(wd.player_count) as count 
-                        FROM world_data wd 
-                        JOIN world_details det ON wd.detail_id = det.id 
-                        WHERE wd.scrape_id = ? AND det.is_f2p = 1
-                    ''', (scrape_id,)).fetchone()
-                    f2p_count = f2p_res['count'] if f2p_res and f2p_res['count'] else 0
-                    
-                    # Calculate Members count
-                    mem_res = conn.execute('''
-                        SELECT SUM(wd.player_count) as count 
-                        FROM world_data wd 
-                        JOIN world_details det ON wd.detail_id = det.id 
-                        WHERE wd.scrape_id = ? AND det.is_f2p = 0
-                    ''', (scrape_id,)).fetchone()
-                    members_count = mem_res['count'] if mem_res and mem_res['count'] else 0
-            except Exception as e:
-                logger.error(f"Error fetching breakdown: {e}")
-
-        if row:
-            return jsonify({
-                "timestamp": row['timestamp'],
-                "count": row['count'],
-                "f2p_count": f2p_count,
-                "members_count": members_count,
-                "breakdown_timestamp": breakdown_ts
-            })
-        else:
-            return jsonify({"error": "No data found"}), 404
-    finally:
-        conn.close()
+    return cached_response('latest', build_latest)
+
+def build_latest(conn):
+    """Builds the /api/latest payload and status code."""
+    # Get the last row added to players (global count)
+    row = conn.execute(
+        f"SELECT {ISO_SQL.format(ts='ts')} AS timestamp, count FROM main.players ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+
+    f2p_count = 0
+    members_count = 0
+    breakdown_ts = None
+
+    if row:
+        try:
+            latest_scrape = conn.execute(f"SELECT id, {ISO_SQL.format(ts='ts')} AS timestamp FROM main.scrape_events ORDER BY ts DESC LIMIT 1").fetchone()
+            if latest_scrape:
+                scrape_id = latest_scrape['id']
+                breakdown_ts = latest_scrape['timestamp']
+
+                # F2P/Members totals were summed by the tracker at insert time
+                totals = {r['key']: r['player_count'] for r in conn.execute(
+                    "SELECT key, player_count FROM main.scrape_summaries WHERE dimension = 'f2p' AND scrape_id = ?",
+                    (scrape_id,)
+                )}
+                f2p_count = totals.get(1, 0)
+                members_count = totals.get(0, 0)
+        except Exception as e:
+            logger.error(f"Error fetching breakdown: {e}")
+
+    if row:
+        return {
+            "timestamp": row['timestamp'],
+            "count": row['count'],
+            "f2p_count": f2p_count,
+            "members_count": members_count,
+            "breakdown_timestamp": breakdown_ts
+        }, 200
+    else:
+        return {"error": "No data found"}, 404
 
 @app.route('/api/metadata')
 def get_metadata():
     """Returns lists of worlds, locations, and activities for filtering."""
-    conn = get_db_connection()
+    return cached_response('metadata', build_metadata)
+
+def build_metadata(conn):
+    """Builds the /api/metadata payload and status code."""
+    # Get Locations
+    locations = conn.execute('SELECT id, name FROM locations ORDER BY name').fetchall()
+
+    # Get Activities
+    activities = conn.execute('SELECT id, description FROM activities ORDER BY description').fetchall()
+
+    # Get Worlds (Distinct world numbers from live world_data, the compact detail log and sealed partitions)
+    worlds = {row['world_number'] for row in conn.execute('''
+        SELECT world_number FROM main.world_data
+        UNION
+        SELECT world_number FROM world_detail_changes
+    ''')}
+    worlds |= partition_worlds(conn)
+
+    return {
+        "locations": [{"id": row['id'], "name": row['name']} for row in locations],
+        "activities": [{"id": row['id'], "description": row['description']} for row in activities],
+        "worlds": sorted(worlds),
+        "history_chunk_version": history_chunk_version(conn)
+    }, 200
+
+def partition_worlds(conn):
+    """World numbers in the world_data of every sealed partition, read once per partition and process."""
+    worlds = set()
+    for name, start, end in sealed_partitions(conn):
+        if name not in _partition_worlds:
+            route_partitions(conn, start, end - 1)
+            _partition_worlds[name] = {row[0] for row in conn.execute("SELECT DISTINCT world_number FROM world_data")}
+        worlds |= _partition_worlds[name]
+    return worlds
+
+def parse_iso(ts):
+    """Parses ISO timestamps robustly (accepts a trailing Z) as UTC."""
+    if not ts:
+        return None
     try:
-        # Get Locations
-        locations = conn.execute('SELECT id, name FROM locations ORDER BY name').fetchall()
-        
-        # Get Activities
-        activities = conn.execute('SELECT id, description FROM activities ORDER BY description').fetchall()
-        
-        # Get Worlds (Distinct world numbers from world_data)
-        worlds = conn.execute('SELECT DISTINCT world_number FROM world_data ORDER BY world_number').fetchall()
-        
-        return jsonify({
-            "locations": [{"id": row['id'], "name": row['name']} for row in locations],
-            "activities": [{"id": row['id'], "description": row['description']} for row in activities],
-            "worlds": [row['world_number'] for row in worlds]
+        # strip Z and parse as naive then set UTC
+        if ts.endswith('Z'):
+            ts2 = ts[:-1]
+        else:
+            ts2 = ts
+        # datetime.fromisoformat handles 'YYYY-MM-DDTHH:MM:SS[.ffffff]'
+        return datetime.fromisoformat(ts2).replace(tzinfo=timezone.utc)
+    except Exception:
+        # fallback to strptime for basic formats
+        try:
+            return datetime.strptime(ts2, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+        except Exception:
+            return None
+
+def parse_since(value):
+    """Parses the `since` parameter: epoch seconds or an ISO timestamp."""
+    if value and value.isdigit():
+        return datetime.fromtimestamp(int(value), timezone.utc)
+    return parse_iso(value)
+
+# Longest bucket of each unit: the next bucket starts within this many seconds of a bucket's start
+ROLLUP_SPANS = {'hour': 3600, 'day': 86400, 'week': 7 * 86400, 'month': 32 * 86400}
+
+def bucket_expr(unit, step, ts):
+    """SQL for the start of the `unit` (and, for minutes, `step`) bucket holding epoch column/parameter `ts`."""
+    if unit == 'minute':
+        step_seconds = (step if step else 5) * 60
+        return f"({ts} / {step_seconds} * {step_seconds})"
+    return ROLLUP_BUCKETS[unit].format(ts=ts)
+
+def bucket_start(conn, unit, step, ts):
+    """Start (epoch seconds) of the `unit`/`step` bucket holding epoch second `ts`."""
+    return conn.execute(f"SELECT {bucket_expr(unit, step, '?')}", (ts,)).fetchone()[0]
+
+def raw_buckets(conn, unit, step, agg, start, end):
+    """
+    (timestamps, epochs, counts) of the `unit`/`step` buckets aggregated from the raw
+    players rows in [start, end] (epoch seconds), like query_rollup's. A bucket read
+    from two partitions is merged.
+    """
+    bucket = bucket_expr(unit, step, 'ts')
+    query = f"""
+        SELECT {ROLLUP_LABELS[unit].format(b=bucket)}, {bucket}, MAX(count), SUM(count), COUNT(count)
+        FROM players
+        WHERE ts BETWEEN ? AND ?
+        GROUP BY {bucket}
+    """
+
+    def read(start_dt, end_dt):
+        return conn.execute(query, (int(start_dt.timestamp()), int(end_dt.timestamp()))).fetchall()
+
+    buckets = {}
+    for rows in read_partitioned(conn, datetime.fromtimestamp(start, timezone.utc),
+                                 datetime.fromtimestamp(end, timezone.utc), read):
+        for label, epoch, high, total, samples in rows:
+            if epoch in buckets:
+                _, other_high, other_total, other_samples = buckets[epoch]
+                high = high if other_high is None else other_high if high is None else max(high, other_high)
+                total, samples = (total or 0) + (other_total or 0), samples + other_samples
+            buckets[epoch] = (label, high, total, samples)
+
+    timestamps, epochs, counts = [], [], []
+    for epoch in sorted(buckets):
+        label, high, total, samples = buckets[epoch]
+        timestamps.append(label)
+        epochs.append(epoch)
+        if agg == 'avg':
+            # ROUND(AVG(count)) as SQLite computes it: half away from zero, as a REAL
+            counts.append(float(math.floor(total / samples + 0.5)) if samples else None)
+        else:
+            counts.append(high)
+    return timestamps, epochs, counts
+
+def query_rollup(conn, unit, step, agg, start_dt, end_dt):
+    """
+    Reads aggregated global history from the players_rollup table.
+    Only buckets lying wholly in [start_dt, end_dt] come from the rollups; the partial
+    first and last buckets are aggregated from the raw players rows in the range (at
+    most two buckets of rows, see raw_buckets), so points cover exactly its samples.
+    Returns (timestamps, epochs, counts) columns.
+    """
+    rollup_unit = '5min' if unit == 'minute' else unit
+    bucket_col = bucket_expr(unit, step, 'bucket')
+    start = int(start_dt.timestamp()) if start_dt else None
+    end = int(end_dt.timestamp()) if end_dt else None
+
+    # Whole buckets run from the first one starting at or after `start` to the one before the bucket holding end + 1
+    first = last = None
+    if start is not None:
+        first = bucket_start(conn, unit, step, start)
+        if first < start:
+            span = (step if step else 5) * 60 if unit == 'minute' else ROLLUP_SPANS[unit]
+            first = bucket_start(conn, unit, step, first + span)
+    if end is not None:
+        last = bucket_start(conn, unit, step, end + 1)
+    if first is not None and last is not None and first >= last:
+        # No whole bucket: at most two partial ones
+        return raw_buckets(conn, unit, step, agg, start, end)
+
+    if agg == 'avg':
+        agg_expr = "ROUND(CAST(SUM(sum_count) AS REAL) / SUM(samples))"
+    else:
+        agg_expr = "MAX(max_count)"
+
+    where_clauses = ["unit = ?"]
+    params = [rollup_unit]
+    if first is not None:
+        where_clauses.append("bucket >= ?")
+        params.append(first)
+    if last is not None:
+        where_clauses.append("bucket < ?")
+        params.append(last)
+
+    query = f"""
+        SELECT {ROLLUP_LABELS[unit].format(b=bucket_col)} as timestamp, {bucket_col} as epoch, {agg_expr} as count
+        FROM players_rollup
+        WHERE {' AND '.join(where_clauses)}
+        GROUP BY {bucket_col}
+        ORDER BY {bucket_col} ASC
+    """
+    parts = [fetch_columns(conn, query, params)]
+    if first is not None and start < first:
+        parts.insert(0, raw_buckets(conn, unit, step, agg, start, first - 1))
+    if last is not None and last <= end:
+        parts.append(raw_buckets(conn, unit, step, agg, last, end))
+    return concat_columns(parts)
+
+def fetch_columns(conn, query, params, reverse=False):
+    """Runs a (timestamp, epoch, count) query and returns the three columns as lists, without Row objects."""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    rows = cursor.execute(query, params).fetchall()
+    if reverse:
+        rows.reverse()
+    if not rows:
+        return [], [], []
+    timestamps, epochs, counts = zip(*rows)
+    return list(timestamps), list(epochs), list(counts)
+
+def read_partitioned(conn, start_dt, end_dt, read, limited=False):
+    """
+    Calls read(start_dt, end_dt) with the sealed partition its range overlaps attached
+    (see route_partitions) and returns the results as a list. A range spanning several
+    partitions is read one partition at a time (see partition_spans), oldest first.
+    `limited` says read() returns only the last N rows when it gets no range, which
+    only needs the newest partition; otherwise an open-ended range reads every one.
+    """
+    start = int(start_dt.timestamp()) if start_dt else None
+    end = int(end_dt.timestamp()) if end_dt else None
+    spans = partition_spans(conn, start, end, limited)
+    if len(spans) == 1:
+        route_partitions(conn, start, end, limited)
+        return [read(start_dt, end_dt)]
+    results = []
+    for span_start, span_end in spans:
+        route_partitions(conn, span_start, span_end, limited)
+        results.append(read(
+            datetime.fromtimestamp(span_start, timezone.utc) if span_start is not None else None,
+            datetime.fromtimestamp(span_end, timezone.utc) if span_end is not None else None
+        ))
+    return results
+
+def concat_columns(parts):
+    """Joins the (timestamps, epochs, counts) columns read from consecutive spans."""
+    if len(parts) == 1:
+        return parts[0]
+    return tuple(list(itertools.chain.from_iterable(column)) for column in zip(*parts))
+
+def concat_series(parts):
+    """Joins the (epochs, series) read from consecutive spans, padding series missing from a span."""
+    if len(parts) == 1:
+        return parts[0]
+    epochs = []
+    series = {}
+    for part_epochs, part_series in parts:
+        for key, s in part_series.items():
+            merged = series.setdefault(key, {"key": s['key'], "label": s['label'], "counts": []})
+            merged['counts'].extend([None] * (len(epochs) - len(merged['counts'])))
+            merged['counts'].extend(s['counts'])
+        epochs.extend(part_epochs)
+    return epochs, series
+
+def tier_spans(conn, start_dt, end_dt, limited=False):
+    """
+    Splits [start_dt, end_dt] where it enters and leaves the hours compact_history folded
+    into hourly_summaries (see compacted_range), oldest first: [(start_dt, end_dt, compacted)].
+    A `limited` request without a range (the latest N rows) is always raw.
+    """
+    tier = compacted_range(conn)
+    if tier is None or (limited and start_dt is None and end_dt is None):
+        return [(start_dt, end_dt, False)]
+    first, until = tier
+    start = int(start_dt.timestamp()) if start_dt else None
+    end = int(end_dt.timestamp()) if end_dt else None
+    if first >= until or (end is not None and end < first) or (start is not None and start >= until):
+        return [(start_dt, end_dt, False)]
+
+    spans = []
+    if start is None or start < first:
+        spans.append((start_dt, datetime.fromtimestamp(first - 1, timezone.utc), False))
+    spans.append((
+        datetime.fromtimestamp(max(start, first) if start is not None else first, timezone.utc),
+        datetime.fromtimestamp(min(end, until - 1) if end is not None else until - 1, timezone.utc),
+        True
+    ))
+    if end is None or end >= until:
+        spans.append((datetime.fromtimestamp(until, timezone.utc), end_dt, False))
+    return spans
+
+def read_tiered(conn, start_dt, end_dt, read, read_hourly, limited=False):
+    """
+    Like read_partitioned, except that the compacted part of the range (see tier_spans)
+    is read with read_hourly(start_dt, end_dt) from hourly_summaries. Returns the parts oldest first.
+    """
+    parts = []
+    for span_start, span_end, compacted in tier_spans(conn, start_dt, end_dt, limited):
+        if compacted:
+            parts.append(read_hourly(span_start, span_end))
+        else:
+            parts.extend(read_partitioned(conn, span_start, span_end, read, limited))
+    return parts
+
+def query_hourly(conn, dimension, key, start_dt, end_dt, agg='peaks'):
+    """
+    (epochs, counts) of one hourly_summaries series over [start_dt, end_dt]. 'peaks' gives
+    each hour's low and high at the times they were seen, the envelope a chart of the raw
+    samples shows; 'max' and 'avg' give one point at the start of each hour, like the rollups.
+    """
+    start, end = int(start_dt.timestamp()), int(end_dt.timestamp())
+    rows = conn.execute('''
+        SELECT bucket, min_ts, min_count, max_ts, max_count, ROUND(CAST(sum_count AS REAL) / samples)
+        FROM hourly_summaries
+        WHERE dimension = ? AND key = ? AND bucket >= ? AND bucket <= ?
+        ORDER BY bucket
+    ''', (dimension, key, start // 3600 * 3600, end)).fetchall()
+    epochs = []
+    counts = []
+    for bucket, min_ts, min_count, max_ts, max_count, avg_count in rows:
+        if agg == 'peaks':
+            points = [p for p in sorted({(min_ts, min_count), (max_ts, max_count)}) if start <= p[0] <= end]
+        else:
+            points = [(bucket, int(avg_count) if agg == 'avg' else max_count)]
+        for epoch, count in points:
+            epochs.append(epoch)
+            counts.append(count)
+    return epochs, counts
+
+def hourly_columns(points, fmt='%Y-%m-%dT%H:%M:%SZ'):
+    """(timestamps, epochs, counts) columns of query_hourly's points, labelled with `fmt`."""
+    epochs, counts = points
+    return [time.strftime(fmt, time.gmtime(epoch)) for epoch in epochs], epochs, counts
+
+def hourly_filtered(conn, start_dt, end_dt, world_id, location_id, is_f2p):
+    """
+    (epochs, counts) for /api/history's world filters over compacted hours: the peaks of
+    a single world or summary dimension, else matching worlds' hourly maxima summed.
+    """
+    if location_id is None and is_f2p is None:
+        dimension, key = ('world', world_id) if world_id is not None else ('global', 0)
+        return query_hourly(conn, dimension, key, start_dt, end_dt)
+    if world_id is None and (location_id is None) != (is_f2p is None):
+        dimension, key = ('location', location_id) if location_id is not None else ('f2p', is_f2p)
+        return query_hourly(conn, dimension, key, start_dt, end_dt)
+    epochs, series = hourly_world_series(conn, None, start_dt, end_dt, world_id, location_id, is_f2p)
+    return epochs, series[None]['counts'] if None in series else []
+
+def hourly_world_series(conn, group_by, start_dt, end_dt, world_id, location_id, is_f2p):
+    """
+    Same (epochs, series) as query_world_series over compacted hours, from each world's
+    hourly maximum and its details at the end of the hour, one point per hour. A `group_by`
+    of None sums all matching worlds into a single series.
+    """
+    key_col, label_expr, extra_join = SERIES_DIMENSIONS[group_by] if group_by else ("NULL", "NULL", "")
+    where_clauses = []
+    params = [int(start_dt.timestamp()) // 3600 * 3600, int(end_dt.timestamp())]
+    for clause, value in (("wd.world_number = ?", world_id), ("det.location_id = ?", location_id),
+                          ("det.is_f2p = ?", is_f2p)):
+        if value is not None:
+            where_clauses.append(clause)
+            params.append(value)
+
+    where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    query = f"""
+        SELECT wd.bucket as epoch, {key_col} as series_key, {label_expr} as label,
+               SUM(wd.player_count) as count
+        FROM (
+            SELECT key AS world_number, bucket, max_count AS player_count, detail_id
+            FROM hourly_summaries
+            WHERE dimension = 'world' AND bucket >= ? AND bucket <= ?
+        ) wd
+        LEFT JOIN world_details det ON wd.detail_id = det.id
+        {extra_join}
+        {where_str}
+        GROUP BY wd.bucket, {key_col}
+        ORDER BY wd.bucket ASC
+    """
+
+    epochs = []
+    series = {}
+    for row in conn.execute(query, params):
+        if not epochs or epochs[-1] != row['epoch']:
+            epochs.append(row['epoch'])
+        append_series_point(series, len(epochs), row['series_key'], row['label'], row['count'])
+    return epochs, series
+
+def hourly_summary_series(conn, dimension, start_dt, end_dt):
+    """Same (epochs, series) as query_summary_series over compacted hours, from each hour's maximum."""
+    query = f"""
+        SELECT ss.bucket as epoch, ss.key as series_key, {SUMMARY_LABELS[dimension]} as label, ss.max_count as count
+        FROM hourly_summaries ss
+        WHERE ss.dimension = ? AND ss.bucket >= ? AND ss.bucket <= ?
+        ORDER BY ss.bucket ASC
+    """
+    epochs = []
+    series = {}
+    for row in conn.execute(query, (dimension, int(start_dt.timestamp()) // 3600 * 3600, int(end_dt.timestamp()))):
+        if not epochs or epochs[-1] != row['epoch']:
+            epochs.append(row['epoch'])
+        append_series_point(series, len(epochs), row['series_key'], row['label'], row['count'])
+    return epochs, series
+
+def to_iso(epoch):
+    """Formats integer epoch seconds as the ISO 8601 UTC string the API returns."""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+def history_format():
+    """The /api/history format for the current request: `format`, else negotiated from Accept."""
+    fmt = request.args.get('format', default=None, type=str)
+    if fmt is None:
+        best = request.accept_mimetypes.best_match(['application/json', 'application/octet-stream'])
+        fmt = 'binary' if best == 'application/octet-stream' else 'json'
+    return fmt
+
+def history_response(timestamps, epochs, counts):
+    """
+    Serializes /api/history columns, first reducing them to at most `max_points`
+    when the request asks for it (`downsample` picks 'minmax' or 'lttb').
+    `timestamps` may be None, in which case ISO strings are derived from `epochs`.
+
+    The format is negotiated from `format` (or the Accept header):
+        - 'json' (default): [{"timestamp": ISO, "count": int}, ...]
+        - 'columnar': {"encoding": "delta", "timestamps": [...], "counts": [...]} with
+          epoch-second timestamps, the first absolute and the rest as differences.
+        - 'binary' / Accept: application/octet-stream: little-endian uint32 n, then
+          n uint32 epoch seconds, then n int32 counts (-1 for missing).
+    """
+    max_points = request.args.get('max_points', default=None, type=int)
+    method = request.args.get('downsample', default='minmax', type=str)
+    fmt = history_format()
+
+    if max_points and len(counts) > max_points:
+        keep = downsample(epochs, [c or 0 for c in counts], max_points, method)
+        if timestamps is not None:
+            timestamps = [timestamps[i] for i in keep]
+        epochs = [epochs[i] for i in keep]
+        counts = [counts[i] for i in keep]
+
+    if fmt == 'columnar':
+        deltas = [b - a for a, b in zip(epochs, epochs[1:])]
+        response = jsonify({
+            "encoding": "delta",
+            "timestamps": epochs[:1] + deltas,
+            "counts": counts
         })
-    finally:
-        conn.close()
+    elif fmt == 'binary':
+        ts_array = array('I', epochs)
+        count_array = array('i', [-1 if c is None else int(round(c)) for c in counts])
+        header = array('I', [len(counts)])
+        if sys.byteorder == 'big':
+            for arr in (header, ts_array, count_array):
+                arr.byteswap()
+        response = app.response_class(
+            header.tobytes() + ts_array.tobytes() + count_array.tobytes(),
+            mimetype='application/octet-stream'
+        )
+    else:
+        if timestamps is None:
+            timestamps = [to_iso(epoch) for epoch in epochs]
+        response = jsonify([{"timestamp": ts, "count": c} for ts, c in zip(timestamps, counts)])
+
+    response.vary.add('Accept')
+    return response
 
 @app.route('/api/history')
 def get_history():
@@ -112,12 +806,149 @@ def get_history():
         - unit (str): aggregation unit, one of 'minute', 'hour', 'day', 'week', 'month'.
         - step (int): bucket size in minutes.
         - agg (str): 'max' or 'avg'.
+        - max_points (int): downsample the result to at most this many points.
+        - downsample (str): 'minmax' (default, keeps each bucket's low and high) or 'lttb'.
+        - format (str): 'json' (default), 'columnar' or 'binary' (see history_response).
+        - preset (str): relative range ending now, one of HISTORY_PRESETS (e.g. '7d'); replaces `start`.
+          Responses are cached per parameter set until the next scrape or API_CACHE_TTL.
+        - chunk (str): one fixed, UTC-aligned chunk of `unit` instead of a range (see HISTORY_CHUNKS):
+          'YYYY-MM-DD' for raw samples or minute buckets (`step` must divide a day), 'YYYY-MM'
+          for hours, 'YYYY' for days and months, and the ISO week-numbering year 'YYYY' for weeks.
+          Cannot be combined with start, end, since, preset or limit. Once the tracker has written
+          past its end a chunk is closed and sent as immutable; `v` (history_chunk_version, from
+          /api/metadata) only takes part in the URL, so that rewriting history busts cached chunks.
+        - since (epoch seconds or ISO): only points at or after this time (raises `start`).
+          Aggregated buckets overlapping it are returned whole, so a client can replace
+          its points from the first returned timestamp onward.
+
+        Hours compacted by `manage.py compact-history` are served from hourly_summaries
+        (see read_tiered): raw and filtered requests get each hour's low and high at the
+        times they were seen, minute buckets each hour's max (or avg).
         
         NEW FILTERS:
         - world_id (int): Filter by specific world number.
         - location_id (int): Filter by location ID.
         - is_f2p (bool/int): Filter by F2P status (1=True, 0=False).
     """
+    chunk = request.args.get('chunk', default=None, type=str)
+    if chunk is not None:
+        return chunk_response(chunk)
+    preset = request.args.get('preset', default=None, type=str)
+    if preset is None:
+        return build_history()
+    if preset not in HISTORY_PRESETS:
+        return jsonify({"error": f"Unknown preset, expected one of {', '.join(HISTORY_PRESETS)}"}), 400
+    start_dt = datetime.fromtimestamp(time.time() - HISTORY_PRESETS[preset], timezone.utc)
+    return cached_history(lambda: build_history(start_dt))
+
+def chunk_bounds(unit, chunk):
+    """
+    (start, end) epoch seconds of `chunk` (end exclusive) for `unit` (see HISTORY_CHUNKS).
+    Raises ValueError unless `chunk` is the canonical name of a chunk of that unit.
+    """
+    kind = HISTORY_CHUNKS[unit]
+    fmt = {'day': '%Y-%m-%d', 'month': '%Y-%m'}.get(kind, '%Y')
+    start = datetime.strptime(chunk, fmt).date()
+    if start.strftime(fmt) != chunk:
+        raise ValueError(f"{chunk} is not a canonical chunk name")
+    if kind == 'day':
+        end = start + timedelta(days=1)
+    elif kind == 'month':
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    elif kind == 'year':
+        end = date(start.year + 1, 1, 1)
+    else:
+        start, end = date.fromisocalendar(start.year, 1, 1), date.fromisocalendar(start.year + 1, 1, 1)
+    return calendar.timegm(start.timetuple()), calendar.timegm(end.timetuple())
+
+def chunk_name(unit, ts):
+    """Name of the `unit` chunk (see HISTORY_CHUNKS) holding epoch second `ts`."""
+    day = datetime.fromtimestamp(ts, timezone.utc).date()
+    kind = HISTORY_CHUNKS[unit]
+    if kind == 'day':
+        return day.strftime('%Y-%m-%d')
+    if kind == 'month':
+        return day.strftime('%Y-%m')
+    return str(day.isocalendar()[0] if kind == 'isoyear' else day.year)
+
+def chunk_response(chunk):
+    """
+    Serves one aligned /api/history chunk. It is closed, and cached as immutable by the
+    API, browsers and CDNs, once the tracker has committed a sample (or, for world
+    filters, a scrape) at or after its end; the writer commits in order, so nothing
+    can be added to it later.
+    """
+    unit = request.args.get('unit', default=None, type=str)
+    step = request.args.get('step', default=None, type=int)
+    conflicting = [arg for arg in CHUNK_EXCLUSIVE_ARGS if arg in request.args]
+    if conflicting:
+        return jsonify({"error": f"chunk cannot be combined with {', '.join(conflicting)}"}), 400
+    if unit not in HISTORY_CHUNKS:
+        return jsonify({"error": f"Unknown unit, expected one of {', '.join(u for u in HISTORY_CHUNKS if u)}"}), 400
+    if unit == 'minute' and 86400 % ((step if step else 5) * 60):
+        return jsonify({"error": "Minute chunks need a step that divides a day"}), 400
+    try:
+        start, end = chunk_bounds(unit, chunk)
+    except ValueError:
+        return jsonify({"error": f"Invalid chunk for unit {unit or 'raw'}: {chunk}"}), 400
+
+    use_world_data = any(arg in request.args for arg in ('world_id', 'location_id', 'is_f2p'))
+    newest = get_db().execute(
+        "SELECT MAX(ts) FROM main.scrape_events" if use_world_data else "SELECT MAX(ts) FROM main.players"
+    ).fetchone()[0]
+    closed = newest is not None and newest >= end
+    return cached_history(lambda: build_history(
+        datetime.fromtimestamp(start, timezone.utc), datetime.fromtimestamp(end - 1, timezone.utc)
+    ), immutable=closed)
+
+def cached_history(build, immutable=False):
+    """
+    Serves a preset or chunk /api/history request from _preset_cache, keyed by every
+    query parameter and the negotiated format. Entries expire like cached_response's,
+    unless `immutable` (a closed chunk), and keep their compressed bodies so repeated
+    hits are not re-encoded. `build` returns the response (or error tuple) to cache.
+    """
+    now = time.time()
+    version = data_version(get_db())
+    # Closed chunks never expire, so a rewrite of stored history (the history_version) gets them a new key
+    key = (tuple(sorted(request.args.items(multi=True))), history_format(), version[-1])
+    with _preset_lock:
+        entry = _preset_cache.get(key)
+    if entry is None or not entry['immutable'] and (entry['version'] != version or entry['expires'] <= now):
+        built = build()
+        # Errors come back as (response, status) tuples and are not cached
+        if isinstance(built, tuple) or built.status_code != 200 or not API_PRESET_CACHE_ENTRIES:
+            return built
+        body = built.get_data()
+        entry = {
+            "version": version,
+            "body": body,
+            "mimetype": built.mimetype,
+            "etag": hashlib.sha1(body).hexdigest()[:20],
+            "expires": now + API_CACHE_TTL,
+            "immutable": immutable,
+            "encoded": {}
+        }
+        with _preset_lock:
+            _preset_cache[key] = entry
+            _preset_cache.move_to_end(key)
+            while len(_preset_cache) > API_PRESET_CACHE_ENTRIES:
+                _preset_cache.popitem(last=False)
+
+    g.encoded_bodies = entry['encoded']
+    response = app.response_class(entry['body'], mimetype=entry['mimetype'])
+    response.vary.add('Accept')
+    response.set_etag(entry['etag'])
+    response.cache_control.public = True
+    if entry['immutable']:
+        response.cache_control.max_age = API_CHUNK_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = API_CACHE_MAX_AGE
+    return response.make_conditional(request)
+
+def build_history(range_start=None, range_end=None):
+    """Builds the /api/history response for the current request, over [range_start, range_end] when given."""
     # Query params
     limit = request.args.get('limit', default=None, type=int)
     start = request.args.get('start', default=None, type=str)
@@ -136,27 +967,13 @@ def get_history():
     if agg == 'avg':
         agg_func = "ROUND(AVG(count))"
 
-    # Helper to parse ISO timestamps robustly (accept trailing Z)
-    def parse_iso(ts):
-        if not ts:
-            return None
-        try:
-            # strip Z and parse as naive then set UTC
-            if ts.endswith('Z'):
-                ts2 = ts[:-1]
-            else:
-                ts2 = ts
-            # datetime.fromisoformat handles 'YYYY-MM-DDTHH:MM:SS[.ffffff]'
-            return datetime.fromisoformat(ts2).replace(tzinfo=timezone.utc)
-        except Exception:
-            # fallback to strptime for basic formats
-            try:
-                return datetime.strptime(ts2, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
-            except Exception:
-                return None
+    start_dt = range_start or parse_iso(start)
+    end_dt = range_end or parse_iso(end)
 
-    start_dt = parse_iso(start)
-    end_dt = parse_iso(end)
+    # `since` narrows the range to the points at or after the client's newest one
+    since_dt = parse_since(request.args.get('since', default=None, type=str))
+    if since_dt and (start_dt is None or since_dt > start_dt):
+        start_dt = since_dt
 
     # Enforce server-side limit: minute-level queries (unit=minute) cannot span more than 30 days
     if unit == 'minute' and step:
@@ -173,13 +990,52 @@ def get_history():
             if duration > timedelta(days=30):
                 return jsonify({"error": "Minute-level queries cannot span more than 30 days."}), 400
 
-    conn = get_db_connection()
+    conn = get_db()
     try:
+        if since_dt and start_dt == since_dt and unit in ROLLUP_LABELS:
+            # The bucket overlapping `since` is returned whole, so clients can replace their points from it onward
+            start_dt = datetime.fromtimestamp(bucket_start(conn, unit, step, int(since_dt.timestamp())), timezone.utc)
+
         # --- QUERY CONSTRUCTION ---
         
         # Determine if we are querying the main 'players' table or the 'world_data' system
         use_world_data = (world_id is not None) or (location_id is not None) or (is_f2p is not None)
         
+        # A single location or F2P filter is answered from the per-scrape summaries
+        summary_filter = None
+        if world_id is None and location_id is None and is_f2p is not None:
+            summary_filter = ('f2p', is_f2p)
+        elif world_id is None and location_id is not None and is_f2p is None:
+            summary_filter = ('location', location_id)
+
+        def hourly_series(start_dt, end_dt):
+            # A single series keyed like the raw reads', so concat_series lines them up
+            epochs, counts = hourly_filtered(conn, start_dt, end_dt, world_id, location_id, is_f2p)
+            key = summary_filter[1] if summary_filter else None
+            return epochs, {key: {"key": key, "label": None, "counts": counts}}
+
+        if summary_filter:
+            range_limit = limit if not start_dt and not end_dt else None
+            epochs, series = concat_series(read_tiered(
+                conn, start_dt, end_dt,
+                lambda start_dt, end_dt: query_summary_series(
+                    conn, summary_filter[0], start_dt, end_dt, range_limit, key=summary_filter[1]),
+                hourly_series, limited=bool(range_limit)))
+            counts = series[summary_filter[1]]['counts'] if summary_filter[1] in series else []
+            return history_response(None, epochs, counts)
+
+        if use_world_data and WORLD_STORAGE in ('compact', 'changes'):
+            # Decode packed snapshots (or forward-fill stored changes) and sum matching worlds per scrape
+            range_limit = limit if not start_dt and not end_dt else None
+            world_series = change_world_series if WORLD_STORAGE == 'changes' else snapshot_world_series
+            epochs, series = concat_series(read_tiered(
+                conn, start_dt, end_dt,
+                lambda start_dt, end_dt: world_series(
+                    conn, None, start_dt, end_dt, range_limit, world_id, location_id, is_f2p),
+                hourly_series, limited=bool(range_limit)))
+            counts = series[None]['counts'] if None in series else []
+            return history_response(None, epochs, counts)
+
         if use_world_data:
             # We are querying detailed world data
             # Note: Aggregation (unit/step) logic for world data is complex. 
@@ -191,14 +1047,14 @@ def get_history():
             where_clauses = []
             params = []
             group_by = ""
-            order_by = "ORDER BY se.timestamp ASC"
+            order_by = "ORDER BY se.ts ASC"
             
             # If filtering by location or f2p, we need world_details
             if location_id is not None or is_f2p is not None:
                 from_clause += " JOIN world_details det ON wd.detail_id = det.id"
                 
             # Select Timestamp
-            select_clause = "SELECT se.timestamp as timestamp"
+            select_clause = f"SELECT {ISO_SQL.format(ts='se.ts')} as timestamp, se.ts as epoch"
             
             # Select Count
             if world_id is not None:
@@ -220,112 +1076,1031 @@ def get_history():
                 where_clauses.append("det.is_f2p = ?")
                 params.append(is_f2p)
 
-            # Time Filters
-            if start_dt:
-                where_clauses.append("se.timestamp >= ?")
-                params.append(start_dt.isoformat())
-            if end_dt:
-                where_clauses.append("se.timestamp <= ?")
-                params.append(end_dt.isoformat())
-                
-            # Limit (only if no time range)
-            limit_clause = ""
-            if not start_dt and not end_dt and limit:
-                 lim = limit if limit else 288
-                 limit_clause = f"LIMIT {lim}"
-                 order_by = "ORDER BY se.timestamp DESC"
-                 
-            where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-            query = f"{select_clause} {from_clause} {where_str} {group_by} {order_by} {limit_clause}"
-            
-            rows = conn.execute(query, params).fetchall()
-            
-            results = []
-            for row in rows:
-                results.append({
-                    "timestamp": row['timestamp'],
-                    "count": row['count']
-                })
-                
-            if "DESC" in order_by:
-                results.reverse()
-                
-            return jsonify(results)
+            filter_clauses, filter_params, base_order = where_clauses, params, order_by
+
+            def read(start_dt, end_dt):
+                where_clauses, params, order_by = list(filter_clauses), list(filter_params), base_order
+                # Time Filters
+                if start_dt:
+                    where_clauses.append("se.ts >= ?")
+                    params.append(int(start_dt.timestamp()))
+                if end_dt:
+                    where_clauses.append("se.ts <= ?")
+                    params.append(int(end_dt.timestamp()))
+
+                # Limit (only if no time range)
+                limit_clause = ""
+                if not start_dt and not end_dt and limit:
+                     lim = limit if limit else 288
+                     limit_clause = f"LIMIT {lim}"
+                     order_by = "ORDER BY se.ts DESC"
+
+                where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+                query = f"{select_clause} {from_clause} {where_str} {group_by} {order_by} {limit_clause}"
+
+                return fetch_columns(conn, query, params, reverse="DESC" in order_by)
+
+            def read_hourly(start_dt, end_dt):
+                return hourly_columns(hourly_filtered(conn, start_dt, end_dt, world_id, location_id, is_f2p))
+
+            return history_response(*concat_columns(
+                read_tiered(conn, start_dt, end_dt, read, read_hourly, limited=bool(limit))))
                  
         else:
             # Standard Global History (players table)
             table = "players"
-            col_ts = "timestamp"
+            col_ts = "ts"
             col_count = "count"
             
             select_clause = ""
             group_by = ""
             
+            # Minute buckets that are a multiple of 5 minutes can be served from the 5min rollup
+            use_rollup = unit in ('hour', 'day', 'week', 'month') or (
+                unit == 'minute' and (step if step else 5) % 5 == 0
+            )
+
+            # Compacted hours have no 5-minute rollups left; they are served from hourly_summaries
+            minute_label = '%Y-%m-%d %H:%M:%S'
+            hourly_agg = 'avg' if agg == 'avg' else 'max'
+
+            if use_rollup and unit != 'minute':
+                return history_response(*query_rollup(conn, unit, step, agg, start_dt, end_dt))
+            if use_rollup:
+                parts = [
+                    hourly_columns(query_hourly(conn, 'global', 0, span_start, span_end, hourly_agg), minute_label)
+                    if compacted else query_rollup(conn, unit, step, agg, span_start, span_end)
+                    for span_start, span_end, compacted in tier_spans(conn, start_dt, end_dt)
+                ]
+                return history_response(*concat_columns(parts))
+
             if unit:
-                # Aggregation Logic
+                # Aggregation Logic (steps the rollups cannot serve)
                 if unit == 'minute':
                     step_seconds = (step if step else 5) * 60
-                    select_clause = f"SELECT datetime((strftime('%s', {col_ts}) / {step_seconds}) * {step_seconds}, 'unixepoch') as timestamp, {agg_func} as count"
-                    group_by = f"GROUP BY (strftime('%s', {col_ts}) / {step_seconds})"
-                elif unit == 'hour':
-                    select_clause = f"SELECT strftime('%Y-%m-%dT%H:00:00Z', {col_ts}) as timestamp, {agg_func} as count"
-                    group_by = f"GROUP BY strftime('%Y-%m-%dT%H', {col_ts})"
-                elif unit == 'day':
-                    select_clause = f"SELECT strftime('%Y-%m-%d', {col_ts}) as timestamp, {agg_func} as count"
-                    group_by = f"GROUP BY strftime('%Y-%m-%d', {col_ts})"
-                elif unit == 'week':
-                    select_clause = f"SELECT date({col_ts}, 'weekday 0', '-6 days') as timestamp, {agg_func} as count"
-                    group_by = f"GROUP BY strftime('%Y-%W', {col_ts})"
-                elif unit == 'month':
-                    select_clause = f"SELECT strftime('%Y-%m-01', {col_ts}) as timestamp, {agg_func} as count"
-                    group_by = f"GROUP BY strftime('%Y-%m', {col_ts})"
+                    bucket = f"{col_ts} / {step_seconds} * {step_seconds}"
+                    select_clause = (f"SELECT datetime({bucket}, 'unixepoch') as timestamp, "
+                                     f"{bucket} as epoch, {agg_func} as count")
+                    group_by = f"GROUP BY {col_ts} / {step_seconds}"
             else:
                 # Raw Data
-                select_clause = f"SELECT {col_ts}, {col_count}"
+                select_clause = f"SELECT {ISO_SQL.format(ts=col_ts)} as timestamp, {col_ts} as epoch, {col_count}"
             
-            from_clause = f"FROM {table}"
-            where_clauses = []
-            params = []
-            
-            if start_dt:
-                where_clauses.append(f"{col_ts} >= ?")
-                params.append(start_dt.isoformat())
-            if end_dt:
-                where_clauses.append(f"{col_ts} <= ?")
-                params.append(end_dt.isoformat())
-                
-            limit_clause = ""
-            order_by = "ORDER BY timestamp ASC"
-            
-            if not start_dt and not end_dt and not unit:
-                lim = limit if limit else 288
-                limit_clause = f"LIMIT {lim}"
-                order_by = "ORDER BY timestamp DESC"
+            def read(start_dt, end_dt):
+                from_clause = f"FROM {table}"
+                where_clauses = []
+                params = []
 
-            where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-            query = f"{select_clause} {from_clause} {where_str} {group_by} {order_by} {limit_clause}"
-            
-            rows = conn.execute(query, params).fetchall()
-            
-            results = []
-            for row in rows:
-                results.append({
-                    "timestamp": row['timestamp'],
-                    "count": row['count']
-                })
-                
-            if "DESC" in order_by:
-                results.reverse()
-                
-            return jsonify(results)
+                if start_dt:
+                    where_clauses.append(f"{col_ts} >= ?")
+                    params.append(int(start_dt.timestamp()))
+                if end_dt:
+                    where_clauses.append(f"{col_ts} <= ?")
+                    params.append(int(end_dt.timestamp()))
+
+                limit_clause = ""
+                order_by = f"ORDER BY {col_ts} ASC"
+
+                if not start_dt and not end_dt and not unit:
+                    lim = limit if limit else 288
+                    limit_clause = f"LIMIT {lim}"
+                    order_by = f"ORDER BY {col_ts} DESC"
+
+                where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+                query = f"{select_clause} {from_clause} {where_str} {group_by} {order_by} {limit_clause}"
+
+                return fetch_columns(conn, query, params, reverse="DESC" in order_by)
+
+            def read_hourly(start_dt, end_dt):
+                if unit:
+                    return hourly_columns(query_hourly(conn, 'global', 0, start_dt, end_dt, hourly_agg), minute_label)
+                return hourly_columns(query_hourly(conn, 'global', 0, start_dt, end_dt))
+
+            # Raw requests without a range are the latest rows (288 by default)
+            return history_response(*concat_columns(
+                read_tiered(conn, start_dt, end_dt, read, read_hourly, limited=not unit)))
             
     except Exception as e:
         logger.error(f"Error in get_history: {e}")
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+
+def query_world_series(conn, group_by, start_dt, end_dt, limit, world_id, location_id, is_f2p):
+    """
+    Sums world_data per scrape event and `group_by` dimension in one query.
+    Returns (epochs, series) where series maps key -> {"key", "label", "counts"}.
+    """
+    key_col, label_expr, extra_join = SERIES_DIMENSIONS[group_by]
+
+    where_clauses = []
+    params = []
+    if world_id is not None:
+        where_clauses.append("wd.world_number = ?")
+        params.append(world_id)
+    if location_id is not None:
+        where_clauses.append("det.location_id = ?")
+        params.append(location_id)
+    if is_f2p is not None:
+        where_clauses.append("det.is_f2p = ?")
+        params.append(is_f2p)
+    if start_dt:
+        where_clauses.append("se.ts >= ?")
+        params.append(int(start_dt.timestamp()))
+    if end_dt:
+        where_clauses.append("se.ts <= ?")
+        params.append(int(end_dt.timestamp()))
+    if not start_dt and not end_dt:
+        where_clauses.append("se.id IN (SELECT id FROM scrape_events ORDER BY ts DESC LIMIT ?)")
+        params.append(limit if limit else 288)
+
+    where_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    query = f"""
+        SELECT se.ts as epoch, {key_col} as series_key, {label_expr} as label,
+               SUM(wd.player_count) as count
+        FROM world_data wd
+        JOIN scrape_events se ON wd.scrape_id = se.id
+        JOIN world_details det ON wd.detail_id = det.id
+        {extra_join}
+        {where_str}
+        GROUP BY se.id, {key_col}
+        ORDER BY se.ts ASC
+    """
+
+    epochs = []
+    series = {}
+    for row in conn.execute(query, params):
+        if not epochs or epochs[-1] != row['epoch']:
+            epochs.append(row['epoch'])
+        append_series_point(series, len(epochs), row['series_key'], row['label'], row['count'])
+    return epochs, series
+
+def query_summary_series(conn, dimension, start_dt, end_dt, limit, key=None):
+    """
+    Reads per-scrape totals for a 'location', 'f2p' or 'activity' dimension (optionally a single key)
+    from scrape_summaries. Returns (epochs, series) like query_world_series.
+    """
+    label_expr = SUMMARY_LABELS[dimension]
+
+    where_clauses = ["ss.dimension = ?"]
+    params = [dimension]
+    if key is not None:
+        where_clauses.append("ss.key = ?")
+        params.append(key)
+    if start_dt:
+        where_clauses.append("se.ts >= ?")
+        params.append(int(start_dt.timestamp()))
+    if end_dt:
+        where_clauses.append("se.ts <= ?")
+        params.append(int(end_dt.timestamp()))
+    if not start_dt and not end_dt and limit:
+        where_clauses.append("se.id IN (SELECT id FROM scrape_events ORDER BY ts DESC LIMIT ?)")
+        params.append(limit)
+
+    query = f"""
+        SELECT se.ts as epoch, ss.key as series_key, {label_expr} as label, ss.player_count as count
+        FROM scrape_summaries ss
+        JOIN scrape_events se ON ss.scrape_id = se.id
+        WHERE {' AND '.join(where_clauses)}
+        ORDER BY se.ts ASC
+    """
+
+    epochs = []
+    series = {}
+    for row in conn.execute(query, params):
+        if not epochs or epochs[-1] != row['epoch']:
+            epochs.append(row['epoch'])
+        append_series_point(series, len(epochs), row['series_key'], row['label'], row['count'])
+    return epochs, series
+
+def snapshot_world_series(conn, group_by, start_dt, end_dt, limit, world_id, location_id, is_f2p,
+                          reader=read_world_snapshots):
+    """
+    Same result as query_world_series, computed from compact world_snapshots (or the
+    whole scrapes yielded by another `reader`, like replay_world_changes).
+    A `group_by` of None sums all matching worlds into a single series.
+    """
+    details = {row['id']: (row['location_id'], row['is_f2p'], row['activity_id'])
+               for row in conn.execute("SELECT id, location_id, is_f2p, activity_id FROM world_details")}
+    location_names = {row['id']: row['name'] for row in conn.execute("SELECT id, name FROM locations")}
+    activity_names = {row['id']: row['description'] for row in conn.execute("SELECT id, description FROM activities")}
+
+    def series_key(world, detail):
+        if group_by == 'world':
+            return world, f"World {world + 300}"
+        if group_by == 'location':
+            return detail[0], location_names.get(detail[0])
+        if group_by == 'f2p':
+            return int(detail[1]), 'Free-to-Play' if detail[1] else 'Members'
+        if group_by == 'activity':
+            return detail[2], activity_names.get(detail[2])
+        return None, None
+
+    epochs = []
+    series = {}
+    snapshots = reader(
+        conn,
+        int(start_dt.timestamp()) if start_dt else None,
+        int(end_dt.timestamp()) if end_dt else None,
+        limit
+    )
+    for _, ts, worlds, counts, detail_ids in snapshots:
+        sums = {}
+        for world, count, detail_id in zip(worlds, counts, detail_ids):
+            detail = details.get(detail_id, (None, None, None))
+            if world_id is not None and world != world_id:
+                continue
+            if location_id is not None and detail[0] != location_id:
+                continue
+            if is_f2p is not None and detail[1] != is_f2p:
+                continue
+            key, label = series_key(world, detail)
+            if key in sums:
+                sums[key][1] += count
+            else:
+                sums[key] = [label, count]
+        if not sums:
+            continue
+        epochs.append(ts)
+        for key, (label, total) in sums.items():
+            append_series_point(series, len(epochs), key, label, total)
+    return epochs, series
+
+def change_world_series(conn, group_by, start_dt, end_dt, limit, world_id, location_id, is_f2p):
+    """
+    Same result as query_world_series for 'changes' storage, where world_data only holds
+    a row when a world's count or details changed. Each world's last stored row is
+    carried forward; with NumPy installed the forward-fill and sums run vectorized over
+    blocks of (scrape x world) matrices, otherwise the scrapes are replayed in Python.
+    """
+    if np is None:
+        return snapshot_world_series(
+            conn, group_by, start_dt, end_dt, limit, world_id, location_id, is_f2p, reader=replay_world_changes)
+
+    scrapes, seed, changes = read_world_changes(
+        conn,
+        int(start_dt.timestamp()) if start_dt else None,
+        int(end_dt.timestamp()) if end_dt else None,
+        limit,
+        world_id
+    )
+    worlds = sorted(set(seed) | {row[1] for row in changes})
+    if not scrapes or not worlds:
+        return [], {}
+
+    # location/f2p/activity of each detail_id (-1 when unknown)
+    detail_rows = conn.execute("SELECT id, location_id, is_f2p, activity_id FROM world_details").fetchall()
+    lookups = {name: np.full(max([row[0] for row in detail_rows] + [0]) + 1, -1, dtype=np.int64)
+               for name in ('location', 'f2p', 'activity')}
+    for detail_id, loc, f2p, act in detail_rows:
+        for name, value in (('location', loc), ('f2p', f2p), ('activity', act)):
+            if value is not None:
+                lookups[name][detail_id] = int(value)
+    labels = {
+        'location': {row['id']: row['name'] for row in conn.execute("SELECT id, name FROM locations")},
+        'activity': {row['id']: row['description'] for row in conn.execute("SELECT id, description FROM activities")},
+    }
+
+    # Each change as (scrape position, world column, count, detail); offline markers get count -1
+    column_of = {w: i for i, w in enumerate(worlds)}
+    position_of = {scrape_id: i for i, (scrape_id, _) in enumerate(scrapes)}
+    changes = sorted((position_of[c[0]], column_of[c[1]], -1 if c[2] is None else c[2], c[3] or 0)
+                     for c in changes if c[0] in position_of)
+    change_pos, change_cols, change_counts, change_details = (
+        np.array(column, dtype=np.int64) for column in (zip(*changes) if changes else ([], [], [], [])))
+
+    carry_counts = np.full(len(worlds), -1, dtype=np.int64)
+    carry_details = np.zeros(len(worlds), dtype=np.int64)
+    for world, (count, detail_id) in seed.items():
+        carry_counts[column_of[world]] = count
+        carry_details[column_of[world]] = detail_id or 0
+
+    world_numbers = np.array(worlds, dtype=np.int64)
+    columns = np.arange(len(worlds))
+    epochs = []
+    series = {}
+    for block_start in range(0, len(scrapes), WORLD_CHANGE_BLOCK):
+        block_end = min(block_start + WORLD_CHANGE_BLOCK, len(scrapes))
+        # Row 0 holds the state carried in from before the block
+        rows = block_end - block_start + 1
+        counts = np.full((rows, len(worlds)), -1, dtype=np.int64)
+        details = np.zeros((rows, len(worlds)), dtype=np.int64)
+        has = np.zeros((rows, len(worlds)), dtype=bool)
+        counts[0], details[0], has[0] = carry_counts, carry_details, True
+        lo, hi = np.searchsorted(change_pos, [block_start, block_end])
+        block_rows = change_pos[lo:hi] - block_start + 1
+        counts[block_rows, change_cols[lo:hi]] = change_counts[lo:hi]
+        details[block_rows, change_cols[lo:hi]] = change_details[lo:hi]
+        has[block_rows, change_cols[lo:hi]] = True
+
+        # Forward-fill: take each world's value from the newest row that stored one
+        source = np.maximum.accumulate(np.where(has, np.arange(rows)[:, None], 0), axis=0)
+        counts = counts[source, columns]
+        details = details[source, columns]
+        carry_counts, carry_details = counts[-1], details[-1]
+        counts, details = counts[1:], details[1:]
+
+        present = counts >= 0
+        if location_id is not None:
+            present &= lookups['location'][details] == location_id
+        if is_f2p is not None:
+            present &= lookups['f2p'][details] == is_f2p
+        if group_by == 'world':
+            keys = np.broadcast_to(world_numbers, counts.shape)
+        elif group_by in lookups:
+            keys = lookups[group_by][details]
+        else:
+            keys = np.zeros(counts.shape, dtype=np.int64)
+
+        # Sum matching worlds per (scrape, key); scrapes without any are left out
+        block_keys, key_index = np.unique(keys[present], return_inverse=True)
+        flat = np.nonzero(present)[0] * len(block_keys) + key_index
+        size = (rows - 1) * len(block_keys)
+        totals = np.bincount(flat, weights=counts[present], minlength=size).reshape(rows - 1, len(block_keys))
+        found = (np.bincount(flat, minlength=size) > 0).reshape(rows - 1, len(block_keys))
+        keep = found.any(axis=1)
+        offset = len(epochs)
+        epochs.extend(ts for (_, ts), kept in zip(scrapes[block_start:block_end], keep.tolist()) if kept)
+
+        for k, key in enumerate(block_keys.tolist()):
+            if group_by == 'world':
+                key, label = key, f"World {key + 300}"
+            elif group_by == 'f2p':
+                label = 'Free-to-Play' if key else 'Members'
+            elif group_by in labels:
+                key = None if key == -1 else key
+                label = labels[group_by].get(key)
+            else:
+                key, label = None, None
+            if key not in series:
+                series[key] = {"key": key, "label": label, "counts": []}
+            column = series[key]['counts']
+            column.extend([None] * (offset - len(column)))
+            column.extend(int(total) if hit else None
+                          for total, hit in zip(totals[keep, k].tolist(), found[keep, k].tolist()))
+    return epochs, series
+
+def append_series_point(series, length, key, label, count):
+    """Appends `count` as point number `length` of a series, padding missed scrapes with None."""
+    if key not in series:
+        series[key] = {"key": key, "label": label, "counts": []}
+    counts = series[key]['counts']
+    counts.extend([None] * (length - 1 - len(counts)))
+    counts.append(count)
+
+# Materialized /api/history/series results per (group_by, filters):
+# {"start", "watermark", "epochs", "series", "expires"}, least recently used first
+_series_cache = OrderedDict()
+_series_cache_lock = threading.Lock()
+
+def cached_series(key, build, start_dt, end_dt):
+    """
+    Returns (epochs, series) for scrapes in [start_dt, end_dt] from a materialized copy
+    of build(start_dt, end_dt). The copy remembers the newest scrape it has seen (its
+    watermark); a later request whose range starts inside the copy only builds the
+    scrapes after the watermark and appends them. Entries are rebuilt after
+    API_SERIES_CACHE_TTL seconds and trimmed to API_SERIES_CACHE_MAX_SCRAPES scrapes.
+    """
+    now = time.time()
+    start_ts = int(start_dt.timestamp())
+    end_ts = int(end_dt.timestamp()) if end_dt else None
+    with _series_cache_lock:
+        entry = _series_cache.get(key)
+
+    if entry is None or entry['expires'] <= now or not entry['start'] <= start_ts <= entry['watermark'] + 1:
+        epochs, series = build(start_dt, end_dt)
+        entry = {
+            "start": start_ts,
+            "watermark": epochs[-1] if epochs else start_ts - 1,
+            "epochs": epochs,
+            "series": series,
+            "expires": now + API_SERIES_CACHE_TTL
+        }
+    elif end_ts is None or end_ts > entry['watermark']:
+        # Same materialized range plus a new tail: only scrapes after the watermark
+        new_epochs, new_series = build(datetime.fromtimestamp(entry['watermark'] + 1, timezone.utc), end_dt)
+        if new_epochs:
+            entry = append_series(entry, new_epochs, new_series)
+
+    with _series_cache_lock:
+        _series_cache[key] = entry
+        _series_cache.move_to_end(key)
+        while len(_series_cache) > API_SERIES_CACHE_ENTRIES:
+            _series_cache.popitem(last=False)
+
+    # Slice the requested range out of the materialized one
+    lo = bisect.bisect_left(entry['epochs'], start_ts)
+    hi = bisect.bisect_right(entry['epochs'], end_ts) if end_ts is not None else len(entry['epochs'])
+    series = {}
+    for k, s in entry['series'].items():
+        counts = s['counts'][lo:hi]
+        counts.extend([None] * (hi - lo - len(counts)))
+        if any(c is not None for c in counts):
+            series[k] = {"key": s['key'], "label": s['label'], "counts": counts}
+    return entry['epochs'][lo:hi], series
+
+def append_series(entry, new_epochs, new_series):
+    """Returns a new cache entry with the delta scrapes appended (entries are never mutated)."""
+    epochs = entry['epochs'] + new_epochs
+    # Drop the oldest scrapes beyond the size limit
+    drop = max(0, len(epochs) - API_SERIES_CACHE_MAX_SCRAPES)
+    series = {}
+    for k in entry['series'].keys() | new_series.keys():
+        old = entry['series'].get(k)
+        new = new_series.get(k)
+        counts = old['counts'] + [None] * (len(entry['epochs']) - len(old['counts'])) if old else [None] * len(entry['epochs'])
+        if new:
+            counts = counts + new['counts']
+        series[k] = {"key": k, "label": (new or old)['label'], "counts": counts[drop:]}
+    return {
+        "start": epochs[drop] if drop else entry['start'],
+        "watermark": epochs[-1],
+        "epochs": epochs[drop:],
+        "series": series,
+        "expires": entry['expires']
+    }
+
+@app.route('/api/history/series')
+def get_history_series():
+    """
+    Returns one series per value of a world_data dimension from a single query.
+    Query parameters:
+        - group_by (str): one of 'world', 'location', 'f2p', 'activity'.
+        - start / end (ISO datetime string): time range of scrape events.
+        - limit (int): last `limit` scrape events when no range is provided (default 288).
+        - world_id / location_id / is_f2p: same filters as /api/history.
+        - since (epoch seconds or ISO): only scrape events at or after this time.
+
+    Ranged requests are served from materialized series (see cached_series), so a
+    refresh of the same range only queries the scrapes added since the last one.
+    Compacted hours give one point per hour, the maximum (see hourly_world_series).
+
+    Response is columnar: a shared `timestamps` array and per series a `counts` array
+    aligned to it (null where the series has no value in that scrape).
+    """
+    group_by = request.args.get('group_by', default='world', type=str)
+    start_dt = parse_iso(request.args.get('start', default=None, type=str))
+    end_dt = parse_iso(request.args.get('end', default=None, type=str))
+    limit = request.args.get('limit', default=None, type=int)
+
+    since_dt = parse_since(request.args.get('since', default=None, type=str))
+    if since_dt and (start_dt is None or since_dt > start_dt):
+        start_dt = since_dt
+
+    world_id = request.args.get('world_id', default=None, type=int)
+    location_id = request.args.get('location_id', default=None, type=int)
+    is_f2p = request.args.get('is_f2p', default=None, type=int)
+
+    if group_by not in SERIES_DIMENSIONS:
+        return jsonify({"error": f"group_by must be one of: {', '.join(SERIES_DIMENSIONS)}"}), 400
+
+    conn = get_db()
+    try:
+        def build_span(start_dt, end_dt):
+            if group_by != 'world' and world_id is None and location_id is None and is_f2p is None:
+                return query_summary_series(conn, group_by, start_dt, end_dt, limit if limit else 288)
+            elif WORLD_STORAGE == 'compact':
+                return snapshot_world_series(
+                    conn, group_by, start_dt, end_dt, limit if limit else 288, world_id, location_id, is_f2p)
+            elif WORLD_STORAGE == 'changes':
+                return change_world_series(
+                    conn, group_by, start_dt, end_dt, limit if limit else 288, world_id, location_id, is_f2p)
+            return query_world_series(conn, group_by, start_dt, end_dt, limit, world_id, location_id, is_f2p)
+
+        def build_hourly(start_dt, end_dt):
+            if group_by != 'world' and world_id is None and location_id is None and is_f2p is None:
+                return hourly_summary_series(conn, group_by, start_dt, end_dt)
+            return hourly_world_series(conn, group_by, start_dt, end_dt, world_id, location_id, is_f2p)
+
+        def build(start_dt, end_dt):
+            # Without a range every reader returns the last `limit` (default 288) scrapes
+            return concat_series(read_tiered(conn, start_dt, end_dt, build_span, build_hourly, limited=True))
+
+        if start_dt and API_SERIES_CACHE_ENTRIES:
+            epochs, series = cached_series((group_by, world_id, location_id, is_f2p), build, start_dt, end_dt)
+        else:
+            epochs, series = build(start_dt, end_dt)
+            for s in series.values():
+                s['counts'].extend([None] * (len(epochs) - len(s['counts'])))
+
+        return jsonify({
+            "group_by": group_by,
+            "timestamps": [to_iso(epoch) for epoch in epochs],
+            "series": sorted(series.values(), key=lambda s: (s['key'] is None, s['key']))
+        })
+    except Exception as e:
+        logger.error(f"Error in get_history_series: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def load_stats_series(conn, start_dt, end_dt, world_id, location_id, is_f2p):
+    """
+    Loads the series /api/history would return for these filters over [start_dt, end_dt]
+    as NumPy arrays (epoch seconds, counts), filled straight from the cursor.
+    """
+    start, end = int(start_dt.timestamp()), int(end_dt.timestamp())
+    if world_id is None and location_id is None and is_f2p is None:
+        cursor = conn.execute(
+            "SELECT ts, count FROM players WHERE ts >= ? AND ts <= ? AND count IS NOT NULL ORDER BY ts",
+            (start, end)
+        )
+    elif world_id is None and (location_id is None) != (is_f2p is None):
+        dimension, key = ('location', location_id) if location_id is not None else ('f2p', is_f2p)
+        cursor = conn.execute('''
+            SELECT se.ts, ss.player_count
+            FROM scrape_summaries ss JOIN scrape_events se ON ss.scrape_id = se.id
+            WHERE ss.dimension = ? AND ss.key = ? AND se.ts >= ? AND se.ts <= ?
+            ORDER BY se.ts
+        ''', (dimension, key, start, end))
+    elif WORLD_STORAGE in ('compact', 'changes'):
+        world_series = change_world_series if WORLD_STORAGE == 'changes' else snapshot_world_series
+        epochs, series = world_series(conn, None, start_dt, end_dt, None, world_id, location_id, is_f2p)
+        counts = series[None]['counts'] if None in series else []
+        points = [(epoch, count) for epoch, count in zip(epochs, counts) if count is not None]
+        return (np.array([p[0] for p in points], dtype=np.int64),
+                np.array([p[1] for p in points], dtype=np.float64))
+    else:
+        where_clauses = ["se.ts >= ?", "se.ts <= ?"]
+        params = [start, end]
+        for clause, value in (("wd.world_number = ?", world_id), ("det.location_id = ?", location_id),
+                              ("det.is_f2p = ?", is_f2p)):
+            if value is not None:
+                where_clauses.append(clause)
+                params.append(value)
+        cursor = conn.execute(f'''
+            SELECT se.ts, SUM(wd.player_count)
+            FROM world_data wd
+            JOIN scrape_events se ON wd.scrape_id = se.id
+            JOIN world_details det ON wd.detail_id = det.id
+            WHERE {' AND '.join(where_clauses)} AND wd.player_count IS NOT NULL
+            GROUP BY se.id
+            ORDER BY se.ts
+        ''', params)
+
+    values = np.fromiter(itertools.chain.from_iterable(cursor), dtype=np.int64).reshape(-1, 2)
+    return values[:, 0], values[:, 1].astype(np.float64)
+
+def json_values(values, digits=None):
+    """NumPy values as a JSON list: ints (or floats rounded to `digits`), with NaN as null."""
+    if digits is None:
+        return [None if v != v else int(round(v)) for v in values.tolist()]
+    return [None if v != v else round(v, digits) for v in values.tolist()]
+
+def stats_peaks(epochs, counts, args):
+    unit = args['unit']
+    result = analytics.extremes(epochs, counts, unit)
+    return {
+        "unit": unit,
+        "buckets": [to_iso(b) for b in result['buckets'].tolist()],
+        "peak": {"timestamps": [to_iso(t) for t in result['peak_times'].tolist()], "counts": json_values(result['peaks'])},
+        "trough": {
+            "timestamps": [to_iso(t) for t in result['trough_times'].tolist()],
+            "counts": json_values(result['troughs'])
+        },
+        "mean": json_values(result['means'], 1),
+        "samples": result['samples'].tolist(),
+    }
+
+def stats_percentiles(epochs, counts, args):
+    window, step = args['window'] * 3600, args['step'] * 3600
+    ends, values = analytics.rolling_percentiles(epochs, counts, window, step)
+    payload = {"window": window, "step": step, "timestamps": [to_iso(t) for t in ends.tolist()]}
+    for quantile, column in zip(analytics.QUANTILES, values):
+        payload[f"p{quantile}"] = json_values(column, 1)
+    return payload
+
+def stats_seasonality(epochs, counts, args):
+    result = analytics.seasonality(epochs, counts)
+    payload = {
+        "hours": result['hours'].tolist(),
+        "mean": json_values(result['means'], 1),
+        "samples": result['samples'].tolist()
+    }
+    for quantile, column in zip(analytics.QUANTILES, result['quantiles']):
+        payload[f"p{quantile}"] = json_values(column, 1)
+    return payload
+
+def stats_yoy(epochs, counts, args):
+    unit = args['unit']
+    result = analytics.year_over_year(epochs, counts, unit)
+    # The year before `start` was only loaded for comparison
+    keep = result['buckets'] >= analytics.bucket_starts(np.int64(int(args['start_dt'].timestamp())), unit)
+    return {
+        "unit": unit,
+        "buckets": [to_iso(b) for b in result['buckets'][keep].tolist()],
+        "mean": json_values(result['means'][keep], 1),
+        "previous": json_values(result['previous'][keep], 1),
+        "delta": json_values(result['deltas'][keep], 1),
+        "change": json_values(result['ratios'][keep], 4),
+    }
+
+# /api/stats/<kind>: (builder, default range in days)
+STATS_KINDS = {
+    'peaks': (stats_peaks, 30),
+    'percentiles': (stats_percentiles, 30),
+    'seasonality': (stats_seasonality, 56),
+    'yoy': (stats_yoy, 90),
+}
+
+# Serialized /api/stats results keyed by (kind, parameters, data_version), least recently used first
+_stats_cache = OrderedDict()
+_stats_cache_lock = threading.Lock()
+
+@app.route('/api/stats/<kind>')
+def get_stats(kind):
+    """
+    Analytics over the series /api/history returns for the same filters (world_id,
+    location_id, is_f2p), computed with NumPy:
+        - peaks: peak and trough count and time, mean and samples per `unit` (day or week)
+        - percentiles: rolling p5/p50/p95 over a trailing `window` (hours, default 168), every `step` hours (default 1)
+        - seasonality: mean and p5/p50/p95 per UTC hour of the week (0 = Monday 00:00)
+        - yoy: mean per `unit` (day or week) against the same bucket 52 weeks earlier
+    `start`/`end` are ISO timestamps; without `start` the last 30 days (56 for
+    seasonality, 90 for yoy) are used. Results are memoized until new data arrives.
+    """
+    if kind not in STATS_KINDS:
+        return jsonify({"error": f"Unknown statistic '{kind}'. Use one of: {', '.join(STATS_KINDS)}"}), 404
+    if not analytics.AVAILABLE:
+        return jsonify({"error": "Statistics require numpy to be installed on the server"}), 501
+    build, default_days = STATS_KINDS[kind]
+
+    args = {
+        'unit': request.args.get('unit', default='day', type=str),
+        'window': request.args.get('window', default=168, type=int),
+        'step': request.args.get('step', default=1, type=int),
+        'world_id': request.args.get('world_id', default=None, type=int),
+        'location_id': request.args.get('location_id', default=None, type=int),
+        'is_f2p': request.args.get('is_f2p', default=None, type=int),
+    }
+    if args['unit'] not in ('day', 'week'):
+        return jsonify({"error": "unit must be 'day' or 'week'"}), 400
+    if args['window'] < 1 or args['step'] < 1:
+        return jsonify({"error": "window and step must be at least 1 hour"}), 400
+
+    start = request.args.get('start', default=None, type=str)
+    end = request.args.get('end', default=None, type=str)
+    end_dt = parse_iso(end) or datetime.now(timezone.utc)
+    start_dt = parse_iso(start) or end_dt - timedelta(days=default_days)
+    if start_dt >= end_dt:
+        return jsonify({"error": "start must be before end"}), 400
+    args['start_dt'] = start_dt
+
+    conn = get_db()
+    try:
+        # Explicit ranges are part of the key; open-ended ones are refreshed by the watermark and TTL
+        key = (kind, start, end, *(args[name] for name in ('unit', 'window', 'step', 'world_id', 'location_id', 'is_f2p')),
+               data_version(conn))
+        now = time.time()
+        with _stats_cache_lock:
+            entry = _stats_cache.get(key)
+            if entry is not None and entry['expires'] > now:
+                _stats_cache.move_to_end(key)
+                return app.response_class(entry['body'], mimetype='application/json')
+
+        load_start = start_dt - timedelta(weeks=52) if kind == 'yoy' else start_dt
+        def load_hourly(start_dt, end_dt):
+            points = [p for p in zip(*hourly_filtered(
+                conn, start_dt, end_dt, args['world_id'], args['location_id'], args['is_f2p'])) if p[1] is not None]
+            return (np.array([p[0] for p in points], dtype=np.int64),
+                    np.array([p[1] for p in points], dtype=np.float64))
+
+        parts = read_tiered(conn, load_start, end_dt, lambda start_dt, end_dt: load_stats_series(
+            conn, start_dt, end_dt, args['world_id'], args['location_id'], args['is_f2p']), load_hourly)
+        epochs = np.concatenate([part[0] for part in parts])
+        counts = np.concatenate([part[1] for part in parts])
+        body = app.json.dumps(build(epochs, counts, args))
+        if API_STATS_CACHE_ENTRIES:
+            with _stats_cache_lock:
+                _stats_cache[key] = {"body": body, "expires": now + API_CACHE_TTL}
+                while len(_stats_cache) > API_STATS_CACHE_ENTRIES:
+                    _stats_cache.popitem(last=False)
+        return app.response_class(body, mimetype='application/json')
+    except Exception as e:
+        logger.error(f"Error in get_stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# Label of each anomaly_events series `ev.key` per dimension
+EVENT_LABELS = {
+    'global': "'Online Players'",
+    'world': "'World ' || (ev.key + 300)",
+    'location': "(SELECT name FROM locations WHERE id = ev.key)",
+}
+
+@app.route('/api/events')
+def get_events():
+    """
+    Returns the anomalies (sharp drops and spikes) the tracker's detector recorded, for
+    overlaying on the chart. Query parameters:
+        - start / end (ISO datetime string): events overlapping this range (default: the last 7 days).
+        - dimension (str): only 'global', 'world' or 'location' series, with `key` (world
+          number or location id) for a single series.
+        - kind (str): only 'drop' or 'spike' events.
+    Events are ordered by start time; `end` is null while an event is still open.
+    """
+    dimension = request.args.get('dimension', default=None, type=str)
+    key = request.args.get('key', default=None, type=int)
+    kind = request.args.get('kind', default=None, type=str)
+    if dimension is not None and dimension not in EVENT_LABELS:
+        return jsonify({"error": f"dimension must be one of: {', '.join(EVENT_LABELS)}"}), 400
+    if kind is not None and kind not in ('drop', 'spike'):
+        return jsonify({"error": "kind must be 'drop' or 'spike'"}), 400
+
+    end_dt = parse_iso(request.args.get('end', default=None, type=str)) or datetime.now(timezone.utc)
+    start_dt = parse_iso(request.args.get('start', default=None, type=str)) or end_dt - timedelta(days=7)
+    where = ["ev.start_ts <= ?", "COALESCE(ev.end_ts, ev.last_ts) >= ?"]
+    params = [int(end_dt.timestamp()), int(start_dt.timestamp())]
+    if dimension is not None:
+        where.append("ev.dimension = ?")
+        params.append(dimension)
+        if key is not None:
+            where.append("ev.key = ?")
+            params.append(key)
+    if kind is not None:
+        where.append("ev.kind = ?")
+        params.append(kind)
+    labels = ' '.join(f"WHEN '{dim}' THEN {label}" for dim, label in EVENT_LABELS.items())
+
+    conn = get_db()
+    try:
+        # Events are only written to the live database
+        rows = conn.execute(f'''
+            SELECT ev.dimension, ev.key, CASE ev.dimension {labels} END AS label, ev.kind, ev.start_ts,
+                   ev.end_ts, ev.last_ts, ev.expected, ev.observed, ev.z, ev.samples
+            FROM main.anomaly_events ev
+            WHERE {' AND '.join(where)}
+            ORDER BY ev.start_ts
+            LIMIT ?
+        ''', params + [API_EVENTS_LIMIT]).fetchall()
+    except Exception as e:
+        logger.error(f"Error in get_events: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    response = jsonify({"events": [{
+        "dimension": row['dimension'],
+        "key": row['key'],
+        "label": row['label'],
+        "kind": row['kind'],
+        "start": to_iso(row['start_ts']),
+        "end": to_iso(row['end_ts']) if row['end_ts'] is not None else None,
+        "last": to_iso(row['last_ts']),
+        "expected": row['expected'],
+        "observed": row['observed'],
+        "z": round(row['z'], 1),
+        "samples": row['samples']
+    } for row in rows]})
+    response.cache_control.public = True
+    response.cache_control.max_age = API_CACHE_MAX_AGE
+    return response
+
+def sse_frame(event, payload, event_id=None):
+    """Serializes one Server-Sent Events message."""
+    frame = f"event: {event}\n"
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    return frame + f"data: {app.json.dumps(payload)}\n\n"
+
+def new_stream_frames(conn, after_players_id, after_scrape_id, limit=None):
+    """
+    SSE frames for rows committed after the given ids: a `point` per global sample
+    (its id is the players id) and a `scrape` per world scrape with the total and the
+    F2P/location/activity sums. Returns (frames, last players id, last scrape id).
+    """
+    frames = []
+    query = f"SELECT id, {ISO_SQL.format(ts='ts')} AS timestamp, count FROM players WHERE id > ?"
+    params = [after_players_id]
+    if limit:
+        # Only the newest `limit` samples, oldest first
+        query = f"SELECT * FROM ({query} ORDER BY id DESC LIMIT ?)"
+        params.append(limit)
+    for row in conn.execute(query + " ORDER BY id", params):
+        frames.append(sse_frame('point', {"timestamp": row['timestamp'], "count": row['count']}, row['id']))
+        after_players_id = row['id']
+
+    scrapes = {}
+    for row in conn.execute(f'''
+        SELECT se.id, {ISO_SQL.format(ts='se.ts')} AS timestamp, ss.dimension, ss.key, ss.player_count
+        FROM scrape_events se
+        JOIN scrape_summaries ss ON ss.scrape_id = se.id
+        WHERE se.id > ?
+        ORDER BY se.id
+    ''', (after_scrape_id,)):
+        scrape = scrapes.setdefault(row['id'], {"timestamp": row['timestamp']})
+        if row['dimension'] == 'total':
+            scrape['total'] = row['player_count']
+        else:
+            scrape.setdefault(row['dimension'], {})[row['key']] = row['player_count']
+    for scrape_id, scrape in scrapes.items():
+        frames.append(sse_frame('scrape', scrape))
+        after_scrape_id = scrape_id
+    return frames, after_players_id, after_scrape_id
+
+class StreamBroadcaster:
+    """
+    Pushes new data to /api/stream subscribers. A single daemon thread per API process
+    polls PRAGMA data_version on its own read connection (it changes whenever another
+    connection, i.e. the tracker, commits), reads and serializes the new rows once and
+    queues the same frames for every subscriber. In API_SNAPSHOT_MODE a snapshot never
+    changes, so it instead reopens its connection whenever a newer snapshot is published.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self):
+        """Returns a queue of frames for a new subscriber, or None when STREAM_MAX_SUBSCRIBERS are connected."""
+        q = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        with self._lock:
+            if len(self._subscribers) >= STREAM_MAX_SUBSCRIBERS:
+                return None
+            self._subscribers.add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stream-broadcaster', daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def broadcast(self, frames):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                for frame in frames:
+                    q.put_nowait(frame)
+            except queue.Full:
+                # Drop a client that cannot keep up; it reconnects with Last-Event-ID
+                self.unsubscribe(q)
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(None)
+
+    def _run(self):
+        conn = None
+        players_id = None
+        while True:
+            try:
+                if conn is None:
+                    path = read_database_path()
+                    conn = open_read_connection()
+                    version = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if players_id is None:
+                        players_id, scrape_id = (last or 0 for last in data_version(conn))
+                time.sleep(STREAM_POLL_INTERVAL)
+                if API_SNAPSHOT_MODE:
+                    if read_database_path() == path:
+                        continue
+                    # Keep the watermarks so the new snapshot's rows are pushed as new data
+                    conn.close()
+                    conn = None
+                    path = read_database_path()
+                    conn = open_read_connection()
+                else:
+                    current = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if current == version:
+                        continue
+                    version = current
+                frames, players_id, scrape_id = new_stream_frames(conn, players_id, scrape_id)
+                if frames:
+                    payload, status = build_latest(conn)
+                    if status == 200:
+                        frames.append(sse_frame('latest', payload))
+                    self.broadcast(frames)
+            except Exception as e:
+                logger.error(f"Error in stream broadcaster: {e}")
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                time.sleep(STREAM_POLL_INTERVAL)
+
+_broadcaster = StreamBroadcaster()
+
+@app.route('/api/stream')
+def get_stream():
+    """
+    Server-Sent Events feed replacing polling for live counts. Sends `latest` on connect
+    and after every tracker commit, plus a `point` per new global sample and a `scrape`
+    per new world scrape. A reconnecting client (Last-Event-ID) first gets the samples it missed.
+    """
+    q = _broadcaster.subscribe()
+    if q is None:
+        return jsonify({"error": "Too many stream subscribers"}), 503
+
+    try:
+        conn = get_db()
+        frames = []
+        last_event_id = request.headers.get('Last-Event-ID', type=int)
+        if last_event_id is not None:
+            frames, _, _ = new_stream_frames(conn, last_event_id, data_version(conn)[1] or 0, limit=288)
+        payload, status = build_latest(conn)
+        if status == 200:
+            frames.append(sse_frame('latest', payload))
+    except Exception as e:
+        _broadcaster.unsubscribe(q)
+        logger.error(f"Error in get_stream: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    def events():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            yield from frames
+            while True:
+                try:
+                    frame = q.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # Comment line keeping proxies from closing an idle connection
+                    frame = ": keepalive\n\n"
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            _broadcaster.unsubscribe(q)
+
+    return app.response_class(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+class ResponseWarmer:
+    """
+    Precomputes the dashboard's default preset requests (API_WARM_PRESETS, and the
+    open chunk of API_WARM_QUERY's unit, for global, F2P and members, in every
+    encoding the API serves) in a daemon thread: at worker start, whenever
+    data_version() changes and before cached entries expire, so visitors get them
+    from _preset_cache instead of waiting for the queries.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def paths(self, chunk_version):
+        unit = parse_qs(API_WARM_QUERY).get('unit', [None])[0]
+        ranges = [f"preset={preset}" for preset in API_WARM_PRESETS]
+        if API_WARM_CHUNKS and unit in HISTORY_CHUNKS:
+            ranges.append(f"chunk={chunk_name(unit, time.time())}&v={chunk_version}")
+        return [
+            f"/api/history?{range_args}&{API_WARM_QUERY}" + (f"&is_f2p={is_f2p}" if is_f2p is not None else "")
+            for range_args in ranges
+            for is_f2p in (None, 1, 0)
+        ]
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='response-warmer', daemon=True)
+                self._thread.start()
+
+    def warm(self, chunk_version):
+        """Requests every warmed path through the full app stack, so compressed bodies are cached too."""
+        client = app.test_client()
+        encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+        paths = self.paths(chunk_version)
+        t0 = time.perf_counter()
+        for path in paths:
+            for encoding in encodings:
+                response = client.get(path, headers={
+                    'Accept': 'application/octet-stream',
+                    'Accept-Encoding': encoding
+                })
+                if response.status_code != 200:
+                    logger.warning(f"Warming {path} returned {response.status_code}")
+                    break
+        logger.info(f"Warmed {len(paths)} history responses in {time.perf_counter() - t0:.2f}s")
+
+    def _run(self):
+        version = None
+        warmed = 0.0
+        while True:
+            try:
+                conn = acquire_read_connection()
+                try:
+                    current = data_version(conn)
+                    chunk_version = history_chunk_version(conn)
+                finally:
+                    release_read_connection(conn)
+                # Also re-warm just before the cached entries' TTL runs out
+                if current != version or time.monotonic() - warmed >= API_CACHE_TTL - API_WARM_INTERVAL:
+                    self.warm(chunk_version)
+                    version = current
+                    warmed = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error warming responses: {e}")
+            time.sleep(API_WARM_INTERVAL)
+
+_warmer = ResponseWarmer()
+
+def create_app():
+    """
+    Returns the API app for a WSGI server, starting this process's background work.
+    Call it in each worker process after the fork (gunicorn: "osrs_api:create_app()",
+    see gunicorn.conf.py), since threads and SQLite connections do not survive a fork.
+    """
+    if (API_WARM_PRESETS or API_WARM_CHUNKS) and API_PRESET_CACHE_ENTRIES:
+        _warmer.start()
+    return app
 
 if __name__ == '__main__':
-    # Run the server on port 5000
-    print("API Server starting on http://127.0.0.1:5000")
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server; use gunicorn.conf.py in production
+    print(f"API Server starting on http://{API_HOST}:{API_PORT}")
+    create_app().run(host=API_HOST, port=API_PORT, debug=API_DEBUG, threaded=True)
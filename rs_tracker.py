@@ -1,13 +1,28 @@
 import requests
+from requests.adapters import HTTPAdapter
+import asyncio
 import datetime
 import time
-import re
 import os
+import json
 import logging
-from bs4 import BeautifulSoup
+import queue
+import sqlite3
+import threading
+from urllib.parse import urlsplit
 
-from config import DB_PATH, OSRS_MAIN_URL, OSRS_SLU_URL, WORLD_SCRAPE_INTERVAL, REQUEST_TIMEOUT, USER_AGENT, SCRAPE_INTERVAL
-from database import init_db
+from config import (
+    DB_PATH, OSRS_MAIN_URL, OSRS_SLU_URL, WORLD_SCRAPE_INTERVAL, REQUEST_TIMEOUT, USER_AGENT, SCRAPE_INTERVAL,
+    SCRAPE_RETRIES, SCRAPE_BACKOFF, HTTP_POOL_SIZE, WORLD_STORAGE, METRICS_ENABLED, TRACKER_METRICS_PORT,
+    WRITE_QUEUE_SIZE, WRITE_BATCH_SIZE, WRITE_RETRY_INTERVAL, TRACKER_JOURNAL_PATH, ANOMALY_DETECTION
+)
+import metrics
+from anomaly import AnomalyDetector
+from database import (
+    init_db, update_rollups, current_world_details, latest_world_rows, write_world_snapshot, write_world_changes,
+    write_scrape_summary
+)
+from slu_parser import parse_world_data, parse_osrs_count
 
 # Configure Logging
 logging.basicConfig(
@@ -20,203 +35,497 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_osrs_count():
-    try:
-        headers = {'User-Agent': USER_AGENT}
-        # Timeout ensures the bot doesn't hang forever on a bad connection
-        response = requests.get(OSRS_MAIN_URL, headers=headers, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
+class PageFetcher:
+    """
+    Fetches pages over pooled keep-alive sessions with retry/backoff.
+    Remembers ETag/Last-Modified per URL and sends conditional requests, so an
+    unchanged page (304) returns the previously parsed result without re-parsing.
+    Safe to share between threads: each thread gets its own session, since
+    requests.Session is not thread-safe.
+    """
+
+    def __init__(self, retries=SCRAPE_RETRIES, backoff=SCRAPE_BACKOFF, timeout=REQUEST_TIMEOUT):
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sessions = []
+        # url -> (validators, parsed result)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The calling thread's session, created on first use."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({'User-Agent': USER_AGENT})
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def fetch(self, url, parse):
+        """
+        Returns parse(response.content) for `url`, or the cached result if the page is unchanged.
+        Retries sleep on the calling thread (backoff, then doubling: 2 + 4 + 8 s by default),
+        so a failing page can hold a tick past its interval; run_scheduler then skips the
+        ticks it missed.
+        """
+        with self._lock:
+            validators, cached = self._cache.get(url, ({}, None))
+        page = urlsplit(url).path or '/'
+        headers = {}
+        if 'etag' in validators:
+            headers['If-None-Match'] = validators['etag']
+        if 'last_modified' in validators:
+            headers['If-Modified-Since'] = validators['last_modified']
+
+        t0 = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code == 304 and cached is not None:
+                    if METRICS_ENABLED:
+                        metrics.SCRAPE_FETCH_SECONDS.observe(time.perf_counter() - t0, page=page)
+                        metrics.SCRAPE_NOT_MODIFIED.inc(page=page)
+                    return cached
+                response.raise_for_status()
+                break
+            except requests.RequestException as e:
+                if attempt == self.retries:
+                    if METRICS_ENABLED:
+                        metrics.SCRAPE_ERRORS.inc(page=page)
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                logger.warning(f"Fetching {url} failed ({e}), retrying in {delay}s...")
+                time.sleep(delay)
+
+        t1 = time.perf_counter()
+        result = parse(response.content)
+        if METRICS_ENABLED:
+            metrics.SCRAPE_FETCH_SECONDS.observe(t1 - t0, page=page)
+            metrics.SCRAPE_PARSE_SECONDS.observe(time.perf_counter() - t1, page=page)
+        new_validators = {}
+        if response.headers.get('ETag'):
+            new_validators['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            new_validators['last_modified'] = response.headers['Last-Modified']
+        if new_validators:
+            with self._lock:
+                self._cache[url] = (new_validators, result)
+        return result
 
-        # Find the number in the HTML
-        match = re.search(r"([\d,]+)\s*(?:people playing|players online)", response.text, re.IGNORECASE)
-        if match:
-            return int(match.group(1).replace(',', ''))
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+            # Threads open new sessions if the fetcher is used again
+            self._local = threading.local()
+        for session in sessions:
+            session.close()
 
+def get_osrs_count(fetcher=None, url=OSRS_MAIN_URL):
+    try:
+        fetcher = fetcher or PageFetcher()
+        return fetcher.fetch(url, parse_osrs_count)
     except Exception as e:
         logger.error(f"Error scraping total count: {e}")
 
     return None
 
-def get_world_data():
+def get_world_data(fetcher=None, url=OSRS_SLU_URL):
     try:
-        headers = {'User-Agent': USER_AGENT}
-        response = requests.get(OSRS_SLU_URL, headers=headers, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-        world_rows = []
-        
-        # Find all rows with class 'server-list__row'
-        rows = soup.find_all('tr', class_='server-list__row')
-        
-        for row in rows:
-            cells = row.find_all('td')
-            if len(cells) < 5:
-                continue
-                
-            # 1. World Number
-            world_link = cells[0].find('a', class_='server-list__world-link')
-            if not world_link:
-                continue
-            world_text = world_link.get_text(strip=True) # e.g., "Old School 93"
-            # Extract number
-            world_match = re.search(r"Old School (\d+)", world_text)
-            if not world_match:
-                continue
-            world_number = int(world_match.group(1))
-            
-            # 2. Player Count
-            players_text = cells[1].get_text(strip=True) # e.g., "48 players"
-            player_match = re.search(r"([\d,]+)", players_text)
-            
-            if player_match:
-                player_count = int(player_match.group(1).replace(',', ''))
-            else:
-                # If no number is found, it means the world is full (2000 players)
-                player_count = 2000
-            
-            # 3. Location
-            location = cells[2].get_text(strip=True)
-            
-            # 4. Type
-            type_text = cells[3].get_text(strip=True).lower()
-            is_f2p = 'free' in type_text
-            
-            # 5. Activity
-            activity = cells[4].get_text(strip=True)
-            
-            world_rows.append({
-                'world_number': world_number,
-                'player_count': player_count,
-                'location': location,
-                'is_f2p': is_f2p,
-                'activity': activity
-            })
-            
-        return world_rows
-
+        fetcher = fetcher or PageFetcher()
+        return fetcher.fetch(url, parse_world_data)
     except Exception as e:
         logger.error(f"Error scraping world data: {e}")
         return []
 
-def main():
-    # 1. Initialize Database
-    conn = init_db()
-    logger.info(f"Bot started. Saving to: {os.path.abspath(DB_PATH)}")
-    
+class DimensionCache:
+    """
+    Location, activity and world_details ids (and, for compact and changes storage, each
+    world's last stored state), loaded from the database once and then kept in memory.
+    Ids are added as new values are inserted, so reset() must be called after a
+    rolled-back transaction: ids handed out inside it no longer exist.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.locations = None
+        self.activities = None
+        self.details = None
+        self.world_details = None
+        self.stored_worlds = None
+
+    def load(self, conn):
+        if self.locations is not None:
+            return
+        self.locations = {row[0]: row[1] for row in conn.execute("SELECT name, id FROM locations")}
+        self.activities = {row[0]: row[1] for row in conn.execute("SELECT description, id FROM activities")}
+        # Unique combos of (location_id, is_f2p, activity_id)
+        self.details = {
+            (row[0], bool(row[1]), row[2]): row[3]
+            for row in conn.execute("SELECT location_id, is_f2p, activity_id, id FROM world_details")
+        }
+
+    def resolve(self, conn, world):
+        """Returns (location_id, activity_id, detail_id) for a parsed world, inserting new values."""
+        self.load(conn)
+        loc_name = world['location']
+        if loc_name not in self.locations:
+            cursor = conn.execute("INSERT INTO locations (name) VALUES (?)", (loc_name,))
+            self.locations[loc_name] = cursor.lastrowid
+        loc_id = self.locations[loc_name]
+
+        act_desc = world['activity']
+        if act_desc not in self.activities:
+            cursor = conn.execute("INSERT INTO activities (description) VALUES (?)", (act_desc,))
+            self.activities[act_desc] = cursor.lastrowid
+        act_id = self.activities[act_desc]
+
+        detail_key = (loc_id, world['is_f2p'], act_id)
+        if detail_key not in self.details:
+            cursor = conn.execute(
+                "INSERT INTO world_details (location_id, is_f2p, activity_id) VALUES (?, ?, ?)",
+                (loc_id, world['is_f2p'], act_id)
+            )
+            self.details[detail_key] = cursor.lastrowid
+        return loc_id, act_id, self.details[detail_key]
+
+    def snapshot_details(self, conn, scrape_id):
+        """{world_number: detail_id} before `scrape_id`, updated in place by write_world_snapshot."""
+        if self.world_details is None:
+            self.world_details = current_world_details(conn, scrape_id)
+        return self.world_details
+
+    def changed_worlds(self, conn, scrape_id):
+        """{world_number: (player_count, detail_id)} last stored before `scrape_id`, updated in place by write_world_changes."""
+        if self.stored_worlds is None:
+            self.stored_worlds = latest_world_rows(conn, scrape_id)
+        return self.stored_worlds
+
+def write_world_scrape(conn, ts, world_data_list, dimensions):
+    """
+    Inserts one world scrape (event, per-world rows and summaries) inside the caller's
+    transaction. Returns its (world_number, player_count, detail_id) rows and the
+    {(dimension, key): player_count} summaries.
+    """
+    scrape_id = conn.execute("INSERT INTO scrape_events (ts) VALUES (?)", (ts,)).lastrowid
+
+    data_to_insert = []
+    summary_rows = []
+    for w in world_data_list:
+        loc_id, act_id, detail_id = dimensions.resolve(conn, w)
+        summary_rows.append((w['player_count'], loc_id, w['is_f2p'], act_id))
+        data_to_insert.append((scrape_id, w['world_number'], w['player_count'], detail_id))
+
+    if WORLD_STORAGE == 'compact':
+        write_world_snapshot(
+            conn, scrape_id, [row[1:] for row in data_to_insert], dimensions.snapshot_details(conn, scrape_id))
+    elif WORLD_STORAGE == 'changes':
+        write_world_changes(
+            conn, scrape_id, [row[1:] for row in data_to_insert], dimensions.changed_worlds(conn, scrape_id))
+    else:
+        conn.executemany(
+            "INSERT INTO world_data (scrape_id, world_number, player_count, detail_id) VALUES (?, ?, ?, ?)",
+            data_to_insert
+        )
+    return [row[1:] for row in data_to_insert], write_scrape_summary(conn, scrape_id, summary_rows)
+
+def write_samples(conn, samples, dimensions, skip_existing=False, detector=None):
+    """
+    Inserts (ts, count, world_data_list, scrape_worlds) samples inside the caller's
+    transaction, the global counts with a single executemany. With `skip_existing`,
+    counts and world scrapes already stored for a tick are skipped (journal replay).
+    A `detector` (AnomalyDetector) scores every global, world and location sample.
+    """
+    if detector is not None:
+        # Catches up from its checkpoint before this batch is stored
+        detector.load(conn)
+    players = []
+    for ts, count, world_data_list, scrape_worlds in samples:
+        # Stored as UTC epoch seconds; the ISO 8601 form is only for log lines
+        current_time = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).isoformat().replace('+00:00', 'Z')
+        if count:
+            if not (skip_existing and conn.execute("SELECT 1 FROM players WHERE ts = ?", (ts,)).fetchone()):
+                players.append((ts, count))
+            if detector is not None:
+                detector.observe(conn, 'global', 0, ts, count)
+            logger.info(f"[{current_time}] Saved total count: {count:,}")
+        else:
+            logger.warning(f"[{current_time}] Failed to get total count.")
+
+        if scrape_worlds:
+            if world_data_list:
+                if skip_existing and conn.execute("SELECT 1 FROM scrape_events WHERE ts = ?", (ts,)).fetchone():
+                    continue
+                logger.info(f"[{current_time}] Saving data for {len(world_data_list)} worlds...")
+                rows, summaries = write_world_scrape(conn, ts, world_data_list, dimensions)
+                if detector is not None:
+                    for world, player_count, detail_id in rows:
+                        detector.observe(conn, 'world', world, ts, player_count, detail_id)
+                    for (dimension, key), player_count in summaries.items():
+                        detector.observe(conn, dimension, key, ts, player_count)
+                logger.info(f"[{current_time}] Saved world data.")
+            else:
+                logger.warning(f"[{current_time}] Failed to get world data or list empty.")
+
+    conn.executemany("INSERT INTO players (ts, count) VALUES (?, ?)", players)
+    for ts, count in players:
+        update_rollups(conn, ts, count)
+
+def save_scrape(conn, ts, count, world_data_list, scrape_worlds, dimensions=None, detector=None):
+    """Writes one tick's global count and (optionally) world snapshot in a single transaction."""
+    dimensions = dimensions or DimensionCache()
+    try:
+        with conn:
+            write_samples(conn, [(ts, count, world_data_list, scrape_worlds)], dimensions, detector=detector)
+    except Exception:
+        dimensions.reset()
+        if detector is not None:
+            detector.reset()
+        raise
+
+class ScrapeWriter:
+    """
+    Persists scraped samples on a background thread, so a locked database or a slow
+    commit never delays the next scrape. submit() queues a sample; the writer thread
+    group-commits whatever has queued up (at most WRITE_BATCH_SIZE samples) in one
+    transaction, resolving dimension ids from a DimensionCache kept for its lifetime
+    and, with ANOMALY_DETECTION, scoring them with an AnomalyDetector kept likewise.
+
+    Samples that cannot be written (database locked, unavailable, or the queue full)
+    are appended to an on-disk journal, which is replayed before any newer samples
+    once writes succeed again, including on the next start.
+    """
+
+    def __init__(self, db_path=None, journal_path=TRACKER_JOURNAL_PATH, queue_size=WRITE_QUEUE_SIZE,
+                 batch_size=WRITE_BATCH_SIZE, retry_interval=WRITE_RETRY_INTERVAL):
+        self.db_path = db_path
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dimensions = DimensionCache()
+        self.detector = AnomalyDetector() if ANOMALY_DETECTION else None
+        self.conn = None
+        self._journal_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='scrape-writer', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, ts, count, world_data_list, scrape_worlds):
+        """Queues one tick's sample without blocking; it is journaled if the queue is full."""
+        sample = (ts, count, world_data_list, scrape_worlds)
+        try:
+            self.queue.put_nowait(sample)
+        except queue.Full:
+            logger.warning(f"Write queue full, journaling sample for {ts}.")
+            self._spool([sample])
+
+    def close(self, timeout=None):
+        """Writes (or journals) everything queued, then stops the writer thread."""
+        self.queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self.queue.get(timeout=self.retry_interval)]
+            except queue.Empty:
+                # Nothing new; retry the journal in case the database is back
+                batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [sample for sample in batch if sample is not None]
+            self._flush(batch)
+
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _flush(self, batch):
+        # Journaled samples are older than the batch, so they go first. If the journal
+        # cannot be emptied the batch joins it; replay puts it back in time order.
+        if not self._replay_journal():
+            if batch:
+                self._spool(batch)
+        elif batch and not self._write(batch):
+            self._spool(batch)
+
+    def _write(self, samples, skip_existing=False):
+        """Writes samples in one transaction; returns False if the database could not be written."""
+        t0 = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = init_db(self.db_path)
+            with self.conn:
+                write_samples(self.conn, samples, self.dimensions, skip_existing, self.detector)
+        except sqlite3.OperationalError as e:
+            # Locked, busy, read-only or unreachable: keep the samples and retry later
+            logger.error(f"Could not write {len(samples)} sample(s): {e}")
+            self._reset_connection()
+            return False
+        except Exception as e:
+            self._reset_connection()
+            if len(samples) == 1:
+                # Retrying a sample that cannot be stored would block every later one
+                logger.critical(f"Dropping sample for {samples[0][0]} that cannot be stored: {e}")
+                return True
+            logger.error(f"Batch write failed ({e}), writing samples one at a time.")
+            return all(self._write([sample], skip_existing) for sample in samples)
+
+        if METRICS_ENABLED:
+            metrics.SCRAPE_INSERT_SECONDS.observe(
+                time.perf_counter() - t0, worlds=str(any(s[3] and s[2] for s in samples)).lower())
+        return True
+
+    def _reset_connection(self):
+        self.dimensions.reset()
+        if self.detector is not None:
+            self.detector.reset()
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except sqlite3.Error:
+                pass
+            self.conn = None
+
+    def _spool(self, samples):
+        """Appends samples to the journal (one JSON array per line), flushed to disk."""
+        try:
+            with self._journal_lock, open(self.journal_path, 'a', encoding='utf-8') as f:
+                for sample in samples:
+                    f.write(json.dumps(sample, separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logger.critical(f"Could not journal {len(samples)} sample(s), they are lost: {e}")
+            return
+        logger.warning(f"Journaled {len(samples)} sample(s) to {self.journal_path}.")
+        if METRICS_ENABLED:
+            metrics.SCRAPE_JOURNALED.inc(len(samples))
+
+    def _replay_journal(self):
+        """
+        Writes any journaled samples in time order; returns False if the database is still
+        unavailable or submit() journaled newer samples meanwhile. The journal is not in
+        time order when a batch is spooled after samples submit() journaled (queue full)
+        while it waited.
+        """
+        with self._journal_lock:
+            if not os.path.exists(self.journal_path):
+                return True
+            with open(self.journal_path, encoding='utf-8') as f:
+                lines = f.readlines()
+
+        samples = []
+        for line in lines:
+            try:
+                samples.append(tuple(json.loads(line)))
+            except ValueError:
+                # A line cut short by a crash while journaling
+                logger.warning(f"Skipping unreadable journal entry: {line[:80]!r}")
+        samples.sort(key=lambda sample: sample[0])
+        if samples:
+            logger.info(f"Replaying {len(samples)} journaled sample(s)...")
+        for i in range(0, len(samples), self.batch_size):
+            # Samples written before a crash or a failed chunk are skipped, not duplicated
+            if not self._write(samples[i:i + self.batch_size], skip_existing=True):
+                return False
+
+        with self._journal_lock:
+            # Keep anything journaled (by submit) while replaying
+            with open(self.journal_path, encoding='utf-8') as f:
+                remaining = f.readlines()[len(lines):]
+            if remaining:
+                with open(self.journal_path + '.tmp', 'w', encoding='utf-8') as f:
+                    f.writelines(remaining)
+                os.replace(self.journal_path + '.tmp', self.journal_path)
+            else:
+                os.remove(self.journal_path)
+        return not remaining
+
+async def scrape_tick(fetcher, scrape_worlds, main_url=OSRS_MAIN_URL, slu_url=OSRS_SLU_URL):
+    """Fetches the homepage and (if due) the SLU page concurrently."""
+    tasks = [asyncio.to_thread(get_osrs_count, fetcher, main_url)]
+    if scrape_worlds:
+        tasks.append(asyncio.to_thread(get_world_data, fetcher, slu_url))
+    results = await asyncio.gather(*tasks)
+    count = results[0]
+    world_data_list = results[1] if scrape_worlds else []
+    return count, world_data_list
+
+async def run_scheduler(writer, fetcher, interval=SCRAPE_INTERVAL, world_interval=WORLD_SCRAPE_INTERVAL,
+                        main_url=OSRS_MAIN_URL, slu_url=OSRS_SLU_URL, max_ticks=None):
+    """
+    Scrapes on fixed wall-clock ticks (multiples of `interval` since the epoch), so the
+    schedule does not drift by however long a fetch or parse takes. Samples are handed
+    to the ScrapeWriter, so inserts never hold up the next tick.
+    """
     # Track last world scrape time
     last_world_scrape = 0
+    next_tick = (int(time.time()) // interval + 1) * interval
+    ticks = 0
+
+    while max_ticks is None or ticks < max_ticks:
+        # Wait for the next wall-clock tick
+        await asyncio.sleep(max(0, next_tick - time.time()))
+        tick = next_tick
 
-    while True:
         try:
-            # 2. Scrape Data
-            # Always get total count
-            count = get_osrs_count()
-            
             # Check if we should scrape worlds
-            current_ts = time.time()
-            scrape_worlds = (current_ts - last_world_scrape >= WORLD_SCRAPE_INTERVAL)
-            
-            world_data_list = []
-            if scrape_worlds:
-                world_data_list = get_world_data()
-                if world_data_list:
-                    last_world_scrape = current_ts
-            
-            # Store timezone-aware UTC timestamps in ISO 8601
-            current_time = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0).isoformat().replace('+00:00', 'Z')
-
-            # 3. Save to Database
-            with conn:
-                if count:
-                    conn.execute(
-                        "INSERT INTO players (timestamp, count) VALUES (?, ?)",
-                        (current_time, count)
-                    )
-                    logger.info(f"[{current_time}] Saved total count: {count:,}")
-                else:
-                    logger.warning(f"[{current_time}] Failed to get total count.")
-                
-                if scrape_worlds:
-                    if world_data_list:
-                        logger.info(f"[{current_time}] Saving data for {len(world_data_list)} worlds...")
-                        
-                        # 0. Create Scrape Event
-                        cursor = conn.execute("INSERT INTO scrape_events (timestamp) VALUES (?)", (current_time,))
-                        scrape_id = cursor.lastrowid
-
-                        # Cache locations
-                        location_map = {}
-                        for row in conn.execute("SELECT name, id FROM locations"):
-                            location_map[row[0]] = row[1]
-
-                        # Cache activities
-                        activity_map = {}
-                        for row in conn.execute("SELECT description, id FROM activities"):
-                            activity_map[row[0]] = row[1]
-
-                        # Cache details (unique combos of loc_id, f2p, activity_id)
-                        details_map = {}
-                        for row in conn.execute("SELECT location_id, is_f2p, activity_id, id FROM world_details"):
-                            details_map[(row[0], bool(row[1]), row[2])] = row[3]
-
-                        data_to_insert = []
-
-                        for w in world_data_list:
-                            # 1. Handle Location
-                            loc_name = w['location']
-                            if loc_name not in location_map:
-                                cursor = conn.execute("INSERT INTO locations (name) VALUES (?)", (loc_name,))
-                                location_map[loc_name] = cursor.lastrowid
-                            
-                            loc_id = location_map[loc_name]
-
-                            # 2. Handle Activity
-                            act_desc = w['activity']
-                            if act_desc not in activity_map:
-                                cursor = conn.execute("INSERT INTO activities (description) VALUES (?)", (act_desc,))
-                                activity_map[act_desc] = cursor.lastrowid
-                            
-                            act_id = activity_map[act_desc]
-                            
-                            # 3. Handle Details (The unique combo)
-                            detail_key = (loc_id, w['is_f2p'], act_id)
-                            
-                            if detail_key not in details_map:
-                                cursor = conn.execute(
-                                    "INSERT INTO world_details (location_id, is_f2p, activity_id) VALUES (?, ?, ?)", 
-                                    (loc_id, w['is_f2p'], act_id)
-                                )
-                                details_map[detail_key] = cursor.lastrowid
-                            
-                            detail_id = details_map[detail_key]
-
-                            # 4. Prepare Data
-                            data_to_insert.append((
-                                scrape_id, 
-                                w['world_number'], 
-                                w['player_count'],
-                                detail_id
-                            ))
-
-                        conn.executemany(
-                            "INSERT INTO world_data (scrape_id, world_number, player_count, detail_id) VALUES (?, ?, ?, ?)",
-                            data_to_insert
-                        )
-                        logger.info(f"[{current_time}] Saved world data.")
-                    else:
-                        logger.warning(f"[{current_time}] Failed to get world data or list empty.")
+            scrape_worlds = (tick - last_world_scrape >= world_interval)
+
+            # 2. Scrape Data
+            count, world_data_list = await scrape_tick(fetcher, scrape_worlds, main_url, slu_url)
+            if scrape_worlds and world_data_list:
+                last_world_scrape = tick
+
+            # 3. Queue for the writer thread (stamped with the tick time, not the fetch time)
+            writer.submit(tick, count, world_data_list, scrape_worlds)
 
         except Exception as e:
             logger.critical(f"Critical Error in loop: {e}")
-            # Try to reconnect to DB if something broke the connection
-            try:
-                conn = init_db()
-            except:
-                pass
 
-        # 4. Wait for the configured interval
-        time.sleep(SCRAPE_INTERVAL)
+        # 4. Advance to the next tick, skipping any we overran
+        ticks += 1
+        next_tick += interval
+        if next_tick <= time.time():
+            skipped = int((time.time() - next_tick) // interval) + 1
+            logger.warning(f"Scrape overran the interval, skipping {skipped} tick(s).")
+            next_tick += skipped * interval
+
+def main():
+    # 1. Initialize Database (and migrate it) before scraping starts
+    init_db().close()
+    logger.info(f"Bot started. Saving to: {os.path.abspath(DB_PATH)}")
+    metrics.set_scope('tracker')
+    if METRICS_ENABLED:
+        metrics.start_http_server(TRACKER_METRICS_PORT)
+        logger.info(f"Serving metrics on port {TRACKER_METRICS_PORT}")
+
+    writer = ScrapeWriter().start()
+    fetcher = PageFetcher()
+    try:
+        asyncio.run(run_scheduler(writer, fetcher))
+    finally:
+        fetcher.close()
+        writer.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
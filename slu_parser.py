@@ -0,0 +1,204 @@
+import re
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+# lxml is optional: when installed it tokenizes the page in C, otherwise html.parser is used
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+WORLD_RE = re.compile(r"Old School (\d+)")
+COUNT_RE = re.compile(r"([\d,]+)")
+ONLINE_RE = re.compile(r"([\d,]+)\s*(?:people playing|players online)", re.IGNORECASE)
+
+class _SluRowCollector:
+    """
+    Event target that turns 'server-list__row' table rows into world dicts in one pass.
+    Receives start/end/data callbacks from either lxml's parser target interface or
+    the html.parser adapter below, so both backends share the same extraction logic.
+    """
+
+    def __init__(self):
+        self.worlds = []
+        self._in_row = False
+        self._cells = None
+        self._cell = None
+        self._link = None
+        self._in_link = False
+        self._text = []
+
+    def _flush(self):
+        # Text nodes are stripped individually and joined, like get_text(strip=True)
+        if not self._text:
+            return
+        text = ''.join(self._text).strip()
+        self._text = []
+        if not text or self._cell is None:
+            return
+        self._cell.append(text)
+        if self._in_link:
+            self._link.append(text)
+
+    def start(self, tag, attrib):
+        self._flush()
+        if tag == 'tr':
+            classes = (attrib.get('class') or '').split()
+            self._in_row = 'server-list__row' in classes
+            self._cells = [] if self._in_row else None
+        elif not self._in_row:
+            return
+        elif tag == 'td':
+            self._cell = []
+            self._cells.append(self._cell)
+        elif tag == 'a' and self._cell is not None and len(self._cells) == 1 and self._link is None:
+            if 'server-list__world-link' in (attrib.get('class') or '').split():
+                self._link = []
+                self._in_link = True
+
+    def end(self, tag):
+        self._flush()
+        if not self._in_row:
+            return
+        if tag == 'a':
+            self._in_link = False
+        elif tag == 'td':
+            self._cell = None
+        elif tag == 'tr':
+            self._finish_row()
+
+    def data(self, text):
+        if self._cell is not None:
+            self._text.append(text)
+
+    def close(self):
+        self._flush()
+        if self._in_row:
+            self._finish_row()
+        return self.worlds
+
+    def _finish_row(self):
+        cells = [''.join(c) for c in self._cells]
+        link = ''.join(self._link) if self._link is not None else None
+        self._in_row = False
+        self._cells = None
+        self._cell = None
+        self._link = None
+        self._in_link = False
+
+        if len(cells) < 5 or link is None:
+            return
+        world_match = WORLD_RE.search(link)
+        if not world_match:
+            return
+
+        player_match = COUNT_RE.search(cells[1])
+        self.worlds.append({
+            'world_number': int(world_match.group(1)),
+            # If no number is found, it means the world is full (2000 players)
+            'player_count': int(player_match.group(1).replace(',', '')) if player_match else 2000,
+            'location': cells[2],
+            'is_f2p': 'free' in cells[3].lower(),
+            'activity': cells[4]
+        })
+
+class _StdlibAdapter(HTMLParser):
+    """Forwards html.parser events to a _SluRowCollector."""
+
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+def parse_world_data_stdlib(content):
+    """Streaming SLU parser built on the standard library's html.parser."""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    collector = _SluRowCollector()
+    parser = _StdlibAdapter(collector)
+    parser.feed(content)
+    parser.close()
+    return collector.close()
+
+def parse_world_data_lxml(content):
+    """Streaming SLU parser using lxml's C tokenizer with a parser target (no tree is built)."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    parser = etree.HTMLParser(target=_SluRowCollector(), encoding='utf-8')
+    parser.feed(content)
+    return parser.close()
+
+def parse_world_data_soup(content):
+    """Reference parser that builds a full BeautifulSoup tree (the original implementation)."""
+    soup = BeautifulSoup(content, 'html.parser')
+    world_rows = []
+
+    # Find all rows with class 'server-list__row'
+    rows = soup.find_all('tr', class_='server-list__row')
+
+    for row in rows:
+        cells = row.find_all('td')
+        if len(cells) < 5:
+            continue
+
+        # 1. World Number
+        world_link = cells[0].find('a', class_='server-list__world-link')
+        if not world_link:
+            continue
+        world_text = world_link.get_text(strip=True) # e.g., "Old School 93"
+        # Extract number
+        world_match = WORLD_RE.search(world_text)
+        if not world_match:
+            continue
+        world_number = int(world_match.group(1))
+
+        # 2. Player Count
+        players_text = cells[1].get_text(strip=True) # e.g., "48 players"
+        player_match = COUNT_RE.search(players_text)
+
+        if player_match:
+            player_count = int(player_match.group(1).replace(',', ''))
+        else:
+            # If no number is found, it means the world is full (2000 players)
+            player_count = 2000
+
+        # 3. Location
+        location = cells[2].get_text(strip=True)
+
+        # 4. Type
+        type_text = cells[3].get_text(strip=True).lower()
+        is_f2p = 'free' in type_text
+
+        # 5. Activity
+        activity = cells[4].get_text(strip=True)
+
+        world_rows.append({
+            'world_number': world_number,
+            'player_count': player_count,
+            'location': location,
+            'is_f2p': is_f2p,
+            'activity': activity
+        })
+
+    return world_rows
+
+def parse_osrs_count(content):
+    """Extracts the global player count from the homepage HTML (bytes or str)."""
+    text = content.decode('utf-8', errors='replace') if isinstance(content, bytes) else content
+    # Find the number in the HTML
+    match = ONLINE_RE.search(text)
+    if match:
+        return int(match.group(1).replace(',', ''))
+    return None
+
+# Fastest available backend
+parse_world_data = parse_world_data_lxml if etree is not None else parse_world_data_stdlib
@@ -1,5 +1,6 @@
 // Configuration
 const API_BASE = '';
+const MAX_CHART_POINTS = 2000; // Server-side downsampling cap for history requests
 
 // Collapsible About section
 document.addEventListener('DOMContentLoaded', function() {
@@ -16,7 +17,12 @@ document.addEventListener('DOMContentLoaded', function() {
 // Globals
 let populationChart = null;
 let rawHistory = []; // cache of last fetched raw points
+let chartState = null; // {signature, series: [{key, label, data}]} of the rendered chart, for incremental refreshes
+let liveStream = null; // EventSource on /api/stream while the server pushes updates
+let liveRefreshTimer = null;
 let globalMetadata = { locations: [], worlds: [] }; // Store metadata for comparison logic
+let historyChunkVersion = null; // history_chunk_version from /api/metadata; chunked loading is off until it is known
+let chartEvents = []; // /api/events anomalies overlaid on the rendered chart
 
 // Utility: format JS Date -> ISO used by datetime-local (without seconds)
 function toLocalInputISO(date) {
@@ -30,6 +36,10 @@ async function fetchMetadata() {
         const response = await fetch(`${API_BASE}/api/metadata`);
         const data = await response.json();
         globalMetadata = data; // Save for later use
+        if (data.history_chunk_version !== undefined) {
+            historyChunkVersion = data.history_chunk_version;
+            pruneChunkCache(historyChunkVersion);
+        }
         
         // Populate Worlds
         const worldSelect = document.getElementById('worldSelect');
@@ -59,97 +69,353 @@ async function fetchMetadata() {
 async function fetchLatest() {
     try {
         const response = await fetch(`${API_BASE}/api/latest`);
-        const data = await response.json();
-        document.getElementById('player-count').innerText = data.count.toLocaleString();
-        
-        // Update breakdown if available
-        if (data.f2p_count !== undefined && data.members_count !== undefined) {
-            document.getElementById('f2p-count').innerText = data.f2p_count.toLocaleString();
-            document.getElementById('members-count').innerText = data.members_count.toLocaleString();
-            document.getElementById('player-breakdown').style.display = 'block';
-
-            // Update breakdown timestamp
-            if (data.breakdown_timestamp) {
-                try {
-                    const bdDate = new Date(data.breakdown_timestamp);
-                    const bdStr = bdDate.toLocaleString([], { year: 'numeric', month: 'short', day: 'numeric', hour: '2-digit', minute: '2-digit', second: '2-digit', timeZoneName: 'short' });
-                    const bdEl = document.getElementById('breakdown-updated');
-                    bdEl.innerText = `(Breakdown updated: ${bdStr})`;
-                    bdEl.style.display = 'block';
-                } catch (e) {
-                    console.error("Error parsing breakdown timestamp", e);
-                }
+        renderLatest(await response.json());
+    } catch (error) {
+        console.error('Error fetching latest:', error);
+        document.getElementById('player-count').innerText = "Offline";
+    }
+}
+
+// Show an /api/latest payload (fetched, or pushed by /api/stream)
+function renderLatest(data) {
+    document.getElementById('player-count').innerText = data.count.toLocaleString();
+
+    // Update breakdown if available
+    if (data.f2p_count !== undefined && data.members_count !== undefined) {
+        document.getElementById('f2p-count').innerText = data.f2p_count.toLocaleString();
+        document.getElementById('members-count').innerText = data.members_count.toLocaleString();
+        document.getElementById('player-breakdown').style.display = 'block';
+
+        // Update breakdown timestamp
+        if (data.breakdown_timestamp) {
+            try {
+                const bdDate = new Date(data.breakdown_timestamp);
+                const bdStr = bdDate.toLocaleString([], { year: 'numeric', month: 'short', day: 'numeric', hour: '2-digit', minute: '2-digit', second: '2-digit', timeZoneName: 'short' });
+                const bdEl = document.getElementById('breakdown-updated');
+                bdEl.innerText = `(Breakdown updated: ${bdStr})`;
+                bdEl.style.display = 'block';
+            } catch (e) {
+                console.error("Error parsing breakdown timestamp", e);
             }
         }
+    }
+
+    // Parse the timestamp returned by the API (UTC ISO 8601) and
+    // display it in the viewer's local timezone.
+    try {
+        const lastDate = new Date(data.timestamp);
+        const lastUpdatedStr = lastDate.toLocaleString([], { year: 'numeric', month: 'short', day: 'numeric', hour: '2-digit', minute: '2-digit', second: '2-digit', timeZoneName: 'short' });
+        document.getElementById('last-updated').innerText = `Last updated: ${lastUpdatedStr}`;
+    } catch (e) {
+        document.getElementById('last-updated').innerText = `Last updated: ${data.timestamp}`;
+    }
+}
+
+// Decode the binary /api/history format: little-endian uint32 n, n uint32 epoch seconds, n int32 counts (-1 = missing)
+function decodeHistoryBinary(buffer) {
+    const view = new DataView(buffer);
+    const n = view.getUint32(0, true);
+    const countsOffset = 4 + 4 * n;
+    const points = new Array(n);
+    for (let i = 0; i < n; i++) {
+        const count = view.getInt32(countsOffset + 4 * i, true);
+        points[i] = { timestamp: view.getUint32(4 + 4 * i, true) * 1000, count: count === -1 ? null : count };
+    }
+    return points;
+}
 
-        // Parse the timestamp returned by the API (UTC ISO 8601) and
-        // display it in the viewer's local timezone.
-        try {
-            const lastDate = new Date(data.timestamp);
-            const lastUpdatedStr = lastDate.toLocaleString([], { year: 'numeric', month: 'short', day: 'numeric', hour: '2-digit', minute: '2-digit', second: '2-digit', timeZoneName: 'short' });
-            document.getElementById('last-updated').innerText = `Last updated: ${lastUpdatedStr}`;
-        } catch (e) {
-            document.getElementById('last-updated').innerText = `Last updated: ${data.timestamp}`;
+// Request an /api/history URL in the packed binary format and decode it to
+// [{timestamp: epoch ms or ISO, count: number}, ...]; also returns the response
+async function requestHistory(params) {
+    // Ask for the packed binary format (see decodeHistoryBinary)
+    const response = await fetch(`${API_BASE}/api/history?${params.toString()}`, {
+        headers: { 'Accept': 'application/octet-stream' }
+    });
+    const contentType = response.headers.get('content-type') || '';
+    // If server returned non-OK (e.g., 400), try to show the server message
+    if (!response.ok) {
+        if (contentType.includes('application/json')) {
+            const err = await response.json();
+            throw new Error(err.error || err.message || `Server responded ${response.status}`);
+        } else {
+            const txt = await response.text();
+            throw new Error(txt || `Server responded ${response.status}`);
         }
-    } catch (error) {
-        console.error('Error fetching latest:', error);
-        document.getElementById('player-count').innerText = "Offline";
     }
+    const data = contentType.includes('application/octet-stream')
+        ? decodeHistoryBinary(await response.arrayBuffer())
+        : await response.json();
+    return { response, data };
+}
+
+// Set the aggregation and filter parameters shared by range and chunk requests
+function setHistoryParams(params, {unit=null, step=null, agg=null, world_id=null, location_id=null, is_f2p=null, max_points=MAX_CHART_POINTS} = {}) {
+    if (unit) params.set('unit', unit);
+    if (step) params.set('step', step);
+    if (agg) params.set('agg', agg);
+    if (max_points) params.set('max_points', max_points);
+
+    if (world_id) params.set('world_id', world_id);
+    if (location_id) params.set('location_id', location_id);
+    if (is_f2p !== null && is_f2p !== "") params.set('is_f2p', is_f2p);
 }
 
 // Fetch history from API with optional start/end (ISO) and unit/step for server-side aggregation
-async function fetchHistory({start=null, end=null, unit=null, step=null, limit=null, agg=null, world_id=null, location_id=null, is_f2p=null} = {}) {
+// `since` asks only for points at or after that time (see mergePoints)
+async function fetchHistory({start=null, end=null, limit=null, since=null, ...options} = {}) {
     try {
         const params = new URLSearchParams();
         if (start) params.set('start', start);
         if (end) params.set('end', end);
-        if (unit) params.set('unit', unit);
-        if (step) params.set('step', step);
+        if (since) params.set('since', since);
         if (limit) params.set('limit', limit);
-        if (agg) params.set('agg', agg);
-        
-        if (world_id) params.set('world_id', world_id);
-        if (location_id) params.set('location_id', location_id);
-        if (is_f2p !== null && is_f2p !== "") params.set('is_f2p', is_f2p);
-
-        const response = await fetch(`${API_BASE}/api/history?${params.toString()}`);
-        const contentType = response.headers.get('content-type') || '';
-        // If server returned non-OK (e.g., 400), try to show the server message
-        if (!response.ok) {
-            if (contentType.includes('application/json')) {
-                const err = await response.json();
-                throw new Error(err.error || err.message || `Server responded ${response.status}`);
+        setHistoryParams(params, options);
+
+        const { data } = await requestHistory(params);
+        if (!since) rawHistory = data;
+        return data;
+    } catch (err) {
+        console.error('Error fetching history:', err);
+        throw err;
+    }
+}
+
+// Chunk kind per granularity, as in HISTORY_CHUNKS in osrs_api.py. Every chunk is aligned
+// to its unit's buckets (UTC); 'isoyear' is an ISO week-numbering year, starting on a Monday.
+const HISTORY_CHUNKS = { raw: 'day', minute: 'day', hour: 'month', day: 'year', week: 'isoyear', month: 'year' };
+
+// Closed chunks never change, so they are kept in IndexedDB across visits
+const CHUNK_DB_NAME = 'osrs-history';
+const CHUNK_STORE = 'chunks';
+const CHUNK_CACHE_MAX = 2000; // Chunks kept; the least recently stored are dropped beyond this
+let chunkDbPromise = null;
+
+// Resolves to the chunk database, or null when IndexedDB is unavailable (e.g. some private modes)
+function openChunkDb() {
+    if (!chunkDbPromise) {
+        chunkDbPromise = new Promise(resolve => {
+            if (!window.indexedDB) return resolve(null);
+            const request = indexedDB.open(CHUNK_DB_NAME, 1);
+            request.onupgradeneeded = () => request.result.createObjectStore(CHUNK_STORE);
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null);
+            request.onblocked = () => resolve(null);
+        });
+    }
+    return chunkDbPromise;
+}
+
+// The cached points of a chunk (keyed by its request parameters), or undefined
+async function getCachedChunk(key) {
+    const db = await openChunkDb();
+    if (!db) return undefined;
+    return new Promise(resolve => {
+        const request = db.transaction(CHUNK_STORE).objectStore(CHUNK_STORE).get(key);
+        request.onsuccess = () => resolve(request.result ? request.result.points : undefined);
+        request.onerror = () => resolve(undefined);
+    });
+}
+
+async function putCachedChunk(key, points) {
+    const db = await openChunkDb();
+    if (!db) return;
+    try {
+        db.transaction(CHUNK_STORE, 'readwrite').objectStore(CHUNK_STORE).put({ stored: Date.now(), points }, key);
+    } catch (err) {
+        console.error('Error caching history chunk:', err);
+    }
+}
+
+// Drop chunks cached under another history_chunk_version, then the oldest beyond CHUNK_CACHE_MAX
+async function pruneChunkCache(version) {
+    const db = await openChunkDb();
+    if (!db) return;
+    const kept = [];
+    const store = db.transaction(CHUNK_STORE, 'readwrite').objectStore(CHUNK_STORE);
+    store.openCursor().onsuccess = e => {
+        const cursor = e.target.result;
+        if (cursor) {
+            if (new URLSearchParams(cursor.key).get('v') !== String(version)) {
+                cursor.delete();
             } else {
-                const txt = await response.text();
-                throw new Error(txt || `Server responded ${response.status}`);
+                kept.push({ key: cursor.key, stored: cursor.value.stored });
             }
+            cursor.continue();
+        } else if (kept.length > CHUNK_CACHE_MAX) {
+            kept.sort((a, b) => a.stored - b.stored);
+            kept.slice(0, kept.length - CHUNK_CACHE_MAX).forEach(entry => store.delete(entry.key));
         }
-        const data = await response.json();
-        // Expecting [{timestamp: ISO, count: number}, ...]
+    };
+}
+
+// ISO week-numbering year of a date: the year of the Thursday in its (Monday-based) week
+function isoWeekYear(ms) {
+    const d = new Date(ms);
+    const thursday = Date.UTC(d.getUTCFullYear(), d.getUTCMonth(), d.getUTCDate() + 3 - (d.getUTCDay() + 6) % 7);
+    return new Date(thursday).getUTCFullYear();
+}
+
+// Names of the chunks of `unit` covering [startMs, endMs], oldest first
+function chunkNames(unit, startMs, endMs) {
+    const kind = HISTORY_CHUNKS[unit || 'raw'];
+    const names = [];
+    if (kind === 'year' || kind === 'isoyear') {
+        const year = kind === 'year' ? ms => new Date(ms).getUTCFullYear() : isoWeekYear;
+        for (let y = year(startMs); y <= year(endMs); y++) names.push(String(y));
+    } else if (kind === 'month') {
+        const monthIndex = ms => new Date(ms).getUTCFullYear() * 12 + new Date(ms).getUTCMonth();
+        for (let m = monthIndex(startMs); m <= monthIndex(endMs); m++) {
+            names.push(`${Math.floor(m / 12)}-${String(m % 12 + 1).padStart(2, '0')}`);
+        }
+    } else {
+        for (let day = Math.floor(startMs / 86400000); day <= Math.floor(endMs / 86400000); day++) {
+            names.push(new Date(day * 86400000).toISOString().slice(0, 10));
+        }
+    }
+    return names;
+}
+
+// Start of the UTC bucket of `unit` holding `ms` (the server returns buckets overlapping `start` whole)
+function bucketStart(unit, step, ms) {
+    const d = new Date(ms);
+    switch (unit) {
+        case 'minute': { const size = (step || 5) * 60000; return Math.floor(ms / size) * size; }
+        case 'hour': return Math.floor(ms / 3600000) * 3600000;
+        case 'day': return Math.floor(ms / 86400000) * 86400000;
+        case 'week': return (Math.floor((Math.floor(ms / 86400000) + 3) / 7) * 7 - 3) * 86400000;
+        case 'month': return Date.UTC(d.getUTCFullYear(), d.getUTCMonth(), 1);
+        default: return ms;
+    }
+}
+
+// Keep the lowest and highest point of each of max_points / 2 equal buckets, like the server's 'minmax'
+function downsamplePoints(points, maxPoints) {
+    if (!maxPoints || points.length <= maxPoints) return points;
+    const size = Math.ceil(points.length / Math.max(1, Math.floor(maxPoints / 2)));
+    const value = p => p.count === null ? 0 : p.count;
+    const kept = [];
+    for (let from = 0; from < points.length; from += size) {
+        let low = from, high = from;
+        for (let i = from + 1; i < Math.min(from + size, points.length); i++) {
+            if (value(points[i]) < value(points[low])) low = i;
+            if (value(points[i]) > value(points[high])) high = i;
+        }
+        kept.push(points[Math.min(low, high)]);
+        if (low !== high) kept.push(points[Math.max(low, high)]);
+    }
+    return kept;
+}
+
+// Fetch [start, end] (ISO) as aligned /api/history chunks and stitch them together. Closed
+// chunks come from IndexedDB when cached and are stored there once fetched, so switching
+// ranges or reloading only requests the chunks that are missing or still open.
+async function fetchHistoryChunks({start, end, max_points=MAX_CHART_POINTS, ...options}) {
+    try {
+        const startMs = new Date(start).getTime();
+        const endMs = new Date(end).getTime();
+        const chunks = await Promise.all(chunkNames(options.unit, startMs, endMs).map(async name => {
+            const params = new URLSearchParams();
+            params.set('chunk', name);
+            params.set('v', historyChunkVersion);
+            setHistoryParams(params, { ...options, max_points });
+            const key = params.toString();
+            const cached = await getCachedChunk(key);
+            if (cached) return cached;
+            const { response, data } = await requestHistory(params);
+            if ((response.headers.get('cache-control') || '').includes('immutable')) putCachedChunk(key, data);
+            return data;
+        }));
+
+        // World filters return raw scrapes, otherwise buckets overlapping `start` are kept whole
+        const filtered = options.world_id || options.location_id || (options.is_f2p ?? "") !== "";
+        const fromMs = filtered ? startMs : bucketStart(options.unit, options.step, startMs);
+        const time = p => new Date(p.timestamp).getTime();
+        const data = downsamplePoints(chunks.flat().filter(p => time(p) >= fromMs && time(p) <= endMs), max_points);
         rawHistory = data;
         return data;
     } catch (err) {
-        console.error('Error fetching history:', err);
+        console.error('Error fetching history chunks:', err);
         throw err;
     }
 }
 
-function buildChart(datasets, granularityInfo) {
-    const ctx = document.getElementById('populationChart').getContext('2d');
-    const viewerTimeZone = Intl.DateTimeFormat().resolvedOptions().timeZone || 'Local';
-    document.getElementById('chart-timezone').innerText = `Times shown in: ${viewerTimeZone}`;
+// Fetch every series of a world_data dimension (world, location, f2p, activity) in one request.
+// Returns [{key, label, data: [{timestamp, count}, ...]}, ...] with gaps dropped.
+async function fetchSeries({groupBy, start=null, end=null, limit=null, world_id=null, location_id=null, is_f2p=null, since=null} = {}) {
+    const params = new URLSearchParams();
+    params.set('group_by', groupBy);
+    if (start) params.set('start', start);
+    if (since) params.set('since', since);
+    if (end) params.set('end', end);
+    if (limit) params.set('limit', limit);
 
-    // If we receive a single array of points (legacy call), wrap it
-    if (Array.isArray(datasets) && datasets.length > 0 && datasets[0].timestamp) {
-        datasets = [{
-            label: 'Online Players',
-            data: datasets.map(p => ({ x: new Date(p.timestamp), y: p.count })),
-            borderColor: '#ffff00',
-            backgroundColor: 'rgba(255, 255, 0, 0.1)'
-        }];
+    if (world_id) params.set('world_id', world_id);
+    if (location_id) params.set('location_id', location_id);
+    if (is_f2p !== null && is_f2p !== "") params.set('is_f2p', is_f2p);
+
+    const response = await fetch(`${API_BASE}/api/history/series?${params.toString()}`);
+    const contentType = response.headers.get('content-type') || '';
+    if (!response.ok) {
+        if (contentType.includes('application/json')) {
+            const err = await response.json();
+            throw new Error(err.error || err.message || `Server responded ${response.status}`);
+        }
+        const txt = await response.text();
+        throw new Error(txt || `Server responded ${response.status}`);
+    }
+    // Columnar: {timestamps: [...], series: [{key, label, counts: [...]}, ...]}
+    const body = await response.json();
+    return body.series.map(s => ({
+        key: s.key,
+        label: s.label,
+        data: s.counts
+            .map((count, i) => ({ timestamp: body.timestamps[i], count }))
+            .filter(p => p.count !== null)
+    }));
+}
+
+// Fetch the anomalies the tracker detected on a series (dimension 'global', 'world' or 'location',
+// with `key` for one world or location) overlapping the range. The chart renders without them on failure.
+async function fetchEvents({dimension, key=null, start=null, end=null}) {
+    const params = new URLSearchParams();
+    params.set('dimension', dimension);
+    if (key) params.set('key', key);
+    if (start) params.set('start', start);
+    if (end) params.set('end', end);
+    try {
+        const response = await fetch(`${API_BASE}/api/events?${params.toString()}`);
+        if (!response.ok) return [];
+        return (await response.json()).events;
+    } catch (err) {
+        console.warn('Failed to load events:', err);
+        return [];
     }
+}
+
+// Incremental refresh: keep the points before `sinceMs` (and not before `startMs`), then append the new ones.
+// The server re-sends everything at or after `since`, including a partially filled last bucket.
+function mergePoints(points, newPoints, sinceMs, startMs) {
+    const time = p => new Date(p.timestamp).getTime();
+    return points
+        .filter(p => time(p) < sinceMs && (startMs === null || time(p) >= startMs))
+        .concat(newPoints);
+}
+
+// Merge a `since` response ([{key, label, data}]) into the series of the rendered chart
+function mergeSeries(previous, fresh, sinceMs, startMs) {
+    const freshByKey = new Map(fresh.map(s => [s.key, s]));
+    const merged = previous.map(s => ({
+        key: s.key,
+        label: s.label,
+        data: mergePoints(s.data, freshByKey.has(s.key) ? freshByKey.get(s.key).data : [], sinceMs, startMs)
+    }));
+    const known = new Set(previous.map(s => s.key));
+    fresh.filter(s => !known.has(s.key)).forEach(s => merged.push(s));
+    return merged;
+}
 
-    // Calculate global peak across all datasets
+// Annotation marking the global peak across all datasets ({x: Date, y} points)
+function peakAnnotations(datasets) {
     let peak = null;
     let peakTime = null;
     let peakValue = -1;
@@ -165,6 +431,77 @@ function buildChart(datasets, granularityInfo) {
         }
     });
 
+    return peak ? {
+        peakLine: {
+            type: 'line',
+            xMin: peakTime,
+            xMax: peakTime,
+            borderColor: 'rgba(255, 0, 0, 0.8)', // Red for peak
+            borderWidth: 2,
+            borderDash: [5, 5],
+            label: {
+                display: true,
+                content: `Peak: ${peakValue.toLocaleString()}`,
+                position: '20%',
+                backgroundColor: 'rgba(255, 0, 0, 0.8)',
+                color: 'white',
+                font: {
+                    size: 12,
+                    family: 'RuneScape'
+                }
+            }
+        }
+    } : {};
+}
+
+// Shaded boxes over detected drops (red) and spikes (green); open events run to now.
+// An event's details are shown while the pointer is over it.
+function eventAnnotations(events) {
+    const annotations = {};
+    events.forEach((ev, idx) => {
+        const drop = ev.kind === 'drop';
+        annotations[`event${idx}`] = {
+            type: 'box',
+            xMin: new Date(ev.start).getTime(),
+            xMax: ev.end ? new Date(ev.end).getTime() : Date.now(),
+            backgroundColor: drop ? 'rgba(255, 0, 0, 0.15)' : 'rgba(0, 255, 0, 0.12)',
+            borderWidth: 0,
+            label: {
+                display: false,
+                content: [`${ev.label}: ${drop ? 'drop' : 'spike'}`, `${ev.observed.toLocaleString()} (expected ${ev.expected.toLocaleString()})`],
+                position: { x: 'center', y: 'start' },
+                backgroundColor: drop ? 'rgba(255, 0, 0, 0.8)' : 'rgba(0, 160, 0, 0.8)',
+                color: 'white',
+                font: { size: 12, family: 'RuneScape' }
+            },
+            enter({ element }) {
+                element.label.options.display = true;
+                return true;
+            },
+            leave({ element }) {
+                element.label.options.display = false;
+                return true;
+            }
+        };
+    });
+    return annotations;
+}
+
+function buildChart(datasets, granularityInfo) {
+    const ctx = document.getElementById('populationChart').getContext('2d');
+    const viewerTimeZone = Intl.DateTimeFormat().resolvedOptions().timeZone || 'Local';
+    document.getElementById('chart-timezone').innerText = `Times shown in: ${viewerTimeZone}`;
+
+    // If we receive a single array of points (legacy call), wrap it
+    if (Array.isArray(datasets) && datasets.length > 0 && datasets[0].timestamp) {
+        datasets = [{
+            label: 'Online Players',
+            data: datasets.map(p => ({ x: new Date(p.timestamp), y: p.count })),
+            borderColor: '#ffff00',
+            backgroundColor: 'rgba(255, 255, 0, 0.1)'
+        }];
+    }
+
     // Chart.js config with annotation for peak
     const cfg = {
         type: 'line',
@@ -190,27 +527,7 @@ function buildChart(datasets, granularityInfo) {
                     zoom: { wheel: { enabled: true }, pinch: { enabled: true }, mode: 'x' }
                 },
                 annotation: {
-                    annotations: peak ? {
-                        peakLine: {
-                            type: 'line',
-                            xMin: peakTime,
-                            xMax: peakTime,
-                            borderColor: 'rgba(255, 0, 0, 0.8)', // Red for peak
-                            borderWidth: 2,
-                            borderDash: [5, 5],
-                            label: {
-                                display: true,
-                                content: `Peak: ${peakValue.toLocaleString()}`,
-                                position: '20%',
-                                backgroundColor: 'rgba(255, 0, 0, 0.8)',
-                                color: 'white',
-                                font: {
-                                    size: 12,
-                                    family: 'RuneScape'
-                                }
-                            }
-                        }
-                    } : {}
+                    annotations: { ...eventAnnotations(chartEvents), ...peakAnnotations(datasets) }
                 },
                 tooltip: {
                     backgroundColor: '#5b4a3c',
@@ -328,8 +645,9 @@ function updateGranularityAvailability() {
     }
 }
 
-// Update chart using inputs (gracefully handle 400 responses from server)
-async function updateFromInputs() {
+// Update chart using inputs (gracefully handle 400 responses from server).
+// With {incremental: true} and unchanged settings, only points since the newest rendered one are fetched.
+async function updateFromInputs(options = {}) {
     const gran = document.getElementById('granularitySelect').value;
     const agg = document.getElementById('aggregationSelect').value;
     const startVal = document.getElementById('startInput').value;
@@ -343,6 +661,23 @@ async function updateFromInputs() {
     const startISO = startVal ? new Date(startVal).toISOString() : null;
     const endISO = endVal ? new Date(endVal).toISOString() : null;
 
+    const signature = JSON.stringify({ gran, agg, worldId, locationId, isF2p, compareMode });
+    const previous = options.incremental && chartState && chartState.signature === signature ? chartState : null;
+    let since = null;
+    let sinceMs = null;
+    if (previous) {
+        const newest = previous.series.reduce((max, s) => s.data.length > 0
+            ? Math.max(max, new Date(s.data[s.data.length - 1].timestamp).getTime()) : max, -Infinity);
+        if (newest !== -Infinity) {
+            sinceMs = newest;
+            since = Math.floor(sinceMs / 1000);
+        }
+    }
+    const startMs = startISO ? new Date(startISO).getTime() : null;
+    // Fetch a series list (or just its new tail) and merge it into the rendered one
+    const withPrevious = fresh => since ? mergeSeries(previous.series, fresh, sinceMs, startMs) : fresh;
+    let renderedSeries = [];
+
     // Map granularity string to Chart.js unit + optional step (for minute intervals)
     let unit = gran;
     let step = null;
@@ -355,22 +690,42 @@ async function updateFromInputs() {
     showChartError('');
     showSpinner();
     
+    // Anomalies detected on the charted series: the global count, one world or one region
+    let eventQuery = null;
+    if (compareMode === 'none' && worldId) {
+        eventQuery = { dimension: 'world', key: worldId };
+    } else if (compareMode === 'none' && locationId && !isF2p) {
+        eventQuery = { dimension: 'location', key: locationId };
+    } else if (compareMode === 'none' && !locationId && !isF2p) {
+        eventQuery = { dimension: 'global' };
+    } else if (compareMode === 'location' && !worldId && !isF2p) {
+        eventQuery = { dimension: 'location' };
+    }
+    const eventsRequest = eventQuery ? fetchEvents({ ...eventQuery, start: startISO, end: endISO }) : Promise.resolve([]);
+
     try {
         let datasets = [];
         const colors = ['#ffff00', '#00ff00', '#00ffff', '#ff00ff', '#ff981f', '#ff0000', '#ffffff', '#aaaaaa'];
 
         if (compareMode === 'none') {
             // Standard single series fetch
-            const history = await fetchHistory({ 
-                start: startISO, 
-                end: endISO, 
-                unit: unit, 
-                step: step, 
+            const query = {
+                start: startISO,
+                end: endISO,
+                unit: unit,
+                step: step,
                 agg: agg,
                 world_id: worldId,
                 location_id: locationId,
                 is_f2p: isF2p
-            });
+            };
+            // Full loads of a range are stitched from cached and fetched chunks; refreshes fetch just the new tail
+            const fetched = !since && startISO && endISO && historyChunkVersion !== null
+                ? await fetchHistoryChunks(query)
+                : await fetchHistory({ ...query, since: since });
+            renderedSeries = withPrevious([{ key: null, label: 'Online Players', data: fetched }]);
+            const history = renderedSeries[0].data;
+            rawHistory = history;
             
             datasets = [{
                 label: 'Online Players',
@@ -383,21 +738,20 @@ async function updateFromInputs() {
             // We ignore the 'is_f2p' filter from the dropdown if it's set, as we are splitting by it.
             // We keep world/location filters if set.
             
-            const [f2pData, memData] = await Promise.all([
-                fetchHistory({ start: startISO, end: endISO, unit, step, agg, world_id: worldId, location_id: locationId, is_f2p: 1 }),
-                fetchHistory({ start: startISO, end: endISO, unit, step, agg, world_id: worldId, location_id: locationId, is_f2p: 0 })
-            ]);
+            const series = renderedSeries = withPrevious(await fetchSeries({ groupBy: 'f2p', start: startISO, end: endISO, world_id: worldId, location_id: locationId, since: since }));
+            const byKey = {};
+            series.forEach(s => { byKey[Number(s.key)] = s.data; });
 
             datasets = [
                 {
                     label: 'Free-to-Play',
-                    data: f2pData.map(p => ({ x: new Date(p.timestamp), y: p.count })),
+                    data: (byKey[1] || []).map(p => ({ x: new Date(p.timestamp), y: p.count })),
                     borderColor: '#aaaaaa', // Silver/Grey for F2P
                     backgroundColor: 'rgba(170, 170, 170, 0.1)'
                 },
                 {
                     label: 'Members',
-                    data: memData.map(p => ({ x: new Date(p.timestamp), y: p.count })),
+                    data: (byKey[0] || []).map(p => ({ x: new Date(p.timestamp), y: p.count })),
                     borderColor: '#ffff00', // Gold for Members
                     backgroundColor: 'rgba(255, 255, 0, 0.1)'
                 }
@@ -406,46 +760,23 @@ async function updateFromInputs() {
             // Compare Regions
             // We ignore 'location_id' filter.
             // We keep world/f2p filters if set (though world implies location, so usually world filter should be empty)
-            
-            // Use globalMetadata.locations to get list
-            const locs = globalMetadata.locations;
-            const requests = locs.map(loc => 
-                fetchHistory({ start: startISO, end: endISO, unit, step, agg, world_id: worldId, is_f2p: isF2p, location_id: loc.id })
-                    .then(data => ({ loc, data }))
-            );
-            
-            const results = await Promise.all(requests);
-            
-            datasets = results.map((res, idx) => ({
-                label: res.loc.name,
+            const series = renderedSeries = withPrevious(await fetchSeries({ groupBy: 'location', start: startISO, end: endISO, world_id: worldId, is_f2p: isF2p, since: since }));
+
+            datasets = series.map((res, idx) => ({
+                label: res.label,
                 data: res.data.map(p => ({ x: new Date(p.timestamp), y: p.count })),
                 borderColor: colors[idx % colors.length],
                 backgroundColor: null // No fill for many lines to avoid clutter
             }));
         } else if (compareMode === 'worlds') {
             // Compare All Worlds (Filtered by other selections)
-            // We iterate all known worlds and fetch data for each, respecting location/f2p filters.
-            // If a world doesn't match the filters, the API returns empty data, and we skip it.
-            
-            const worlds = globalMetadata.worlds;
-            // Create a promise for each world
-            const requests = worlds.map(w => 
-                fetchHistory({ 
-                    start: startISO, end: endISO, unit, step, agg, 
-                    world_id: w, 
-                    location_id: locationId, 
-                    is_f2p: isF2p 
-                })
-                .then(data => ({ world: w, data }))
-                .catch(e => null)
-            );
-            
-            const results = await Promise.all(requests);
-            
-            datasets = results
-                .filter(r => r && r.data && r.data.length > 0)
+            // One request returns every world's series, respecting location/f2p filters.
+            const series = renderedSeries = withPrevious(await fetchSeries({ groupBy: 'world', start: startISO, end: endISO, location_id: locationId, is_f2p: isF2p, since: since }));
+
+            datasets = series
+                .filter(res => res.data.length > 0)
                 .map((res, idx) => ({
-                    label: `World ${parseInt(res.world) + 300}`,
+                    label: res.label,
                     data: res.data.map(p => ({ x: new Date(p.timestamp), y: p.count })),
                     borderColor: colors[idx % colors.length],
                     backgroundColor: null,
@@ -454,7 +785,9 @@ async function updateFromInputs() {
                 }));
         }
 
+        chartEvents = await eventsRequest;
         buildChart(datasets, { unit, step });
+        chartState = { signature, series: renderedSeries };
     } catch (err) {
         console.error('Update failed:', err);
         showChartError(err.message || 'Failed to load data');
@@ -487,7 +820,7 @@ function setPresetYears(years) {
     document.getElementById('endInput').value = toLocalInputISO(end);
 }
 
-function applyPreset(v) {
+function setPresetRange(v) {
     switch (v) {
         case '3h': setPresetHours(3); break;
         case '6h': setPresetHours(6); break;
@@ -500,8 +833,69 @@ function applyPreset(v) {
         case '5y': setPresetYears(5); break;
         case '10y': setPresetYears(10); break;
     }
+}
+
+function applyPreset(v, options = {}) {
+    setPresetRange(v);
     updateGranularityAvailability();
-    updateFromInputs();
+    updateFromInputs(options);
+}
+
+// Live updates pushed by /api/stream. Returns false when the browser has no EventSource.
+function connectStream() {
+    if (!window.EventSource) return false;
+    liveStream = new EventSource(`${API_BASE}/api/stream`);
+    liveStream.addEventListener('latest', e => renderLatest(JSON.parse(e.data)));
+    liveStream.addEventListener('point', e => {
+        if (!appendLivePoint(JSON.parse(e.data))) scheduleLiveRefresh();
+    });
+    liveStream.addEventListener('scrape', () => scheduleLiveRefresh());
+    return true;
+}
+
+function streamConnected() {
+    return liveStream !== null && liveStream.readyState !== EventSource.CLOSED;
+}
+
+function isLivePreset() {
+    const presetEl = document.getElementById('presetSelect');
+    return presetEl && presetEl.value !== 'custom';
+}
+
+// Slide the chart on a preset range and fetch only what is new. Debounced, since
+// one tracker commit pushes a point and a scrape together.
+function scheduleLiveRefresh() {
+    if (!isLivePreset()) return;
+    clearTimeout(liveRefreshTimer);
+    liveRefreshTimer = setTimeout(() => {
+        applyPreset(document.getElementById('presetSelect').value, { incremental: true });
+    }, 2000);
+}
+
+// Append a pushed global sample to the unfiltered 5-minute chart in place, without a
+// request or a rebuild. Returns false when the rendered chart needs a refresh instead.
+function appendLivePoint(point) {
+    if (!isLivePreset() || !chartState || !populationChart) return false;
+    const settings = JSON.parse(chartState.signature);
+    if (settings.gran !== '5m' || settings.compareMode !== 'none' || settings.worldId || settings.locationId || settings.isF2p) return false;
+
+    const series = chartState.series[0];
+    const pointMs = new Date(point.timestamp).getTime();
+    const last = series.data[series.data.length - 1];
+    if (last && new Date(last.timestamp).getTime() >= pointMs) return true;
+
+    setPresetRange(document.getElementById('presetSelect').value);
+    const startMs = new Date(document.getElementById('startInput').value).getTime();
+    series.data = series.data.filter(p => new Date(p.timestamp).getTime() >= startMs).concat([point]);
+    rawHistory = series.data;
+
+    const dataset = populationChart.data.datasets[0];
+    dataset.data = series.data.map(p => ({ x: new Date(p.timestamp), y: p.count }));
+    populationChart.options.plugins.annotation.annotations = {
+        ...eventAnnotations(chartEvents), ...peakAnnotations(populationChart.data.datasets)
+    };
+    populationChart.update('none');
+    return true;
 }
 
 // Initialize page: set default inputs and render
@@ -553,12 +947,16 @@ async function initializePage() {
     await fetchLatest();
     await updateFromInputs();
 
-    // Auto-refresh every 2 minutes
+    // Live updates are pushed by the server; polling every 2 minutes is the fallback
+    // for browsers without EventSource or when the stream is refused
+    connectStream();
     setInterval(async () => {
+        if (streamConnected()) return;
         await fetchLatest();
-        // If we are on a preset (not custom), refresh the chart range to keep it "live"
+        // If we are on a preset (not custom), slide the chart range to keep it "live",
+        // fetching only the points added since the last refresh
         if (presetEl && presetEl.value !== 'custom') {
-            applyPreset(presetEl.value);
+            applyPreset(presetEl.value, { incremental: true });
         }
     }, 2 * 60 * 1000);
 }